@@ -0,0 +1,265 @@
+"""
+BCI COMMAND DISPATCH
+====================
+Turns decoded BCI commands into robot actions on the control stage.
+
+Commands (text, case-insensitive):
+    stop               - stopl immediately, abort the running sequence, disable auto mode
+    home               - return to the home pose
+    pick               - pick the current target
+    place              - place the held object at its bin
+    select <object>    - restrict detection to one object class
+
+Dispatch rules:
+- every intent has a priority (lower = more urgent)
+- 'stop' is never queued: it is executed on the thread that receives it
+- duplicates of an intent that is still pending are coalesced into one
+- a motion intent more urgent than the activity currently running preempts
+  it (stopl + abort, the control stage then runs the new intent) - but only
+  while that activity moves the arm (a move, a pick/place sequence or the
+  servo); an idle activity is left alone, and a running search is stopped
+  by begin() once the intent runs. 'select' never preempts, it is applied
+  once the running activity has finished
+- the abort set by a stop or preemption only applies to the activity that
+  was running: begin() / begin_activity() clear it when a different activity
+  begins (not when the same one resumes on the next frame)
+
+Latency is measured from the moment the listener received a command:
+- dispatch: until the control stage starts executing the intent
+- reaction: until the streamed robot state shows the arm responding
+  (TCP starts moving from rest, or has stopped for 'stop' - measured only
+  if the arm was moving when the stop arrived). Motion intents are measured
+  once the control stage reports motion_started(), so an intent that turns
+  out not to move the arm leaves no reaction sample
+"""
+
+import itertools
+import threading
+import time
+from collections import defaultdict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from robot_state import tcp_speed_norm
+
+PRIORITIES = {
+    'stop': 0,
+    'home': 1,
+    'pick': 2,
+    'place': 2,
+    'select': 3,
+}
+MANUAL_PRIORITY = 3  # Keyboard actions
+AUTO_PRIORITY = 4    # Automatic centering / pick cycle
+
+# Intents that move the arm (reaction latency is measured for these)
+MOTION_INTENTS = ('home', 'pick', 'place')
+
+
+def parse_command(text: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Parse a BCI command string
+    Returns:
+        (intent, argument) or None if the command is unknown
+    """
+    words = text.replace(':', ' ').strip().split(maxsplit=1)
+    if not words:
+        return None
+    intent = words[0].lower()
+    if intent not in PRIORITIES:
+        return None
+    argument = words[1].strip().lower() if len(words) > 1 else None
+    return intent, argument
+
+
+class CommandDispatcher:
+    """Priority queue of BCI intents with coalescing and preemption"""
+
+    def __init__(self, robot, on_stop=None, speed_epsilon: float = 0.002,
+                 reaction_timeout: float = 5.0, motion_active=None):
+        self.robot = robot
+        self.on_stop = on_stop  # Called after a stop (e.g. disable auto mode)
+        self.motion_active = motion_active  # () -> True while e.g. the servo drives the arm
+        self.speed_epsilon = speed_epsilon  # TCP speed (m/s) counted as moving
+        self.reaction_timeout = reaction_timeout
+
+        self._lock = threading.Lock()
+        self._pending = {}  # (intent, argument) -> intent dict
+        self._order = itertools.count()
+        self.running = None  # Intent dict of the activity on the control stage
+        self._activity = None  # (name, priority) of the last activity begun (kept after end())
+
+        # Statistics
+        self.received = 0
+        self.coalesced = 0
+        self.preemptions = 0
+        self.unknown = 0
+        self.dispatch_ms = defaultdict(list)
+        self.reaction_ms = defaultdict(list)
+
+    def submit(self, command: dict) -> bool:
+        """
+        Accept a command from CommandListener
+        Args:
+            command: {'command': str, 'received_at': monotonic time, ...}
+        Returns:
+            False if the command is unknown
+        """
+        parsed = parse_command(command.get('command', ''))
+        if parsed is None:
+            self.unknown += 1
+            print(f"⚠️ Unknown BCI command: '{command.get('command')}'")
+            return False
+
+        intent, argument = parsed
+        received_at = command.get('received_at', time.monotonic())
+        self.received += 1
+
+        if intent == 'stop':
+            with self._lock:
+                self._pending.clear()
+            self.robot.stop_motion()
+            if self.on_stop:
+                self.on_stop()
+            self._record_dispatch('stop', received_at)
+            self._measure_reaction('stop', received_at, moving=False)
+            return True
+
+        priority = PRIORITIES[intent]
+        key = (intent, argument)
+        with self._lock:
+            if key in self._pending:
+                # Keep the earliest arrival so latency reflects the first request
+                self.coalesced += 1
+                return True
+            self._pending[key] = {
+                'intent': intent,
+                'argument': argument,
+                'priority': priority,
+                'received_at': received_at,
+                'order': next(self._order),
+            }
+            running = self.running
+
+        label = f"{intent} {argument}" if argument else intent
+        print(f"🧠 BCI '{label}' queued (priority {priority})")
+        if (intent in MOTION_INTENTS and running is not None and priority < running['priority']
+                and self._running_moves_arm()):
+            self.preemptions += 1
+            print(f"⏭️ Preempting '{running['intent']}' for '{label}'")
+            self.robot.stop_motion()
+        return True
+
+    def _running_moves_arm(self) -> bool:
+        """True if the running activity owns an arm motion worth preempting"""
+        robot = self.robot
+        if getattr(robot, 'search_in_progress', False):
+            return False  # begin() stops the search; its result may be what the intent needs
+        if getattr(robot, 'is_moving', False) or getattr(robot, 'active_sequence', None):
+            return True
+        return bool(self.motion_active and self.motion_active())
+
+    def next_intent(self) -> Optional[dict]:
+        """Remove and return the most urgent pending intent (oldest first on ties)"""
+        with self._lock:
+            if not self._pending:
+                return None
+            key = min(self._pending, key=lambda k: (self._pending[k]['priority'],
+                                                    self._pending[k]['order']))
+            return self._pending.pop(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def begin(self, intent: dict):
+        """Mark an intent as running on the control stage (clears a previous abort)"""
+        if intent['intent'] in MOTION_INTENTS and getattr(self.robot, 'search_in_progress', False):
+            # The search thread owns the arm - stop it before moving
+            if not self.robot.end_search():
+                print(f"⚠️ BCI '{intent['intent']}': search did not stop in time")
+        self.robot.abort_event.clear()
+        with self._lock:
+            self.running = intent
+            self._activity = (intent['intent'], intent['priority'])
+        if 'received_at' in intent:
+            self._record_dispatch(intent['intent'], intent['received_at'])
+
+    def motion_started(self, intent: dict):
+        """
+        Called by the control stage right before it commands the arm for intent
+        (starts the reaction measurement - intents that end up not moving the
+        arm, e.g. a pick with nothing in view, are not measured)
+        """
+        if 'received_at' in intent:
+            self._measure_reaction(intent['intent'], intent['received_at'], moving=True)
+
+    def end(self):
+        with self._lock:
+            self.running = None
+
+    def begin_activity(self, name: str, priority: int):
+        """
+        Mark a non-BCI activity (auto cycle, keyboard action) as running
+        (clears a previous abort only if a different activity begins - the auto
+        cycle is re-begun on every frame and must not wipe an abort that is
+        still stopping its own background search)
+        """
+        with self._lock:
+            if self._activity != (name, priority):
+                self.robot.abort_event.clear()
+            self.running = {'intent': name, 'priority': priority}
+            self._activity = (name, priority)
+
+    def _record_dispatch(self, intent: str, received_at: float):
+        self.dispatch_ms[intent].append((time.monotonic() - received_at) * 1000)
+
+    def _measure_reaction(self, intent: str, received_at: float, moving: bool):
+        """
+        Time from received_at until the arm responds, on a watcher thread
+        Args:
+            moving: True = wait for the arm to start moving from rest (motion intents:
+                    a preempted move or stopped search is still decelerating, so the
+                    arm must come to rest first); False = wait for it to stop
+                    ('stop' is only measured if the arm was moving when received)
+        """
+        reader = getattr(self.robot, 'state_reader', None)
+        if reader is None:
+            return
+        if not moving:
+            before = reader.state_at(received_at) or reader.latest()
+            if before is None or tcp_speed_norm(before) <= self.speed_epsilon:
+                return  # Arm was already still - nothing to react to
+        phase = {'rested': not moving}
+
+        def _reacted(state):
+            if state['timestamp'] < received_at:
+                return False
+            is_moving = tcp_speed_norm(state) > self.speed_epsilon
+            if not phase['rested']:
+                phase['rested'] = not is_moving
+                return False
+            return is_moving == moving
+
+        def _watch():
+            state = reader.wait_for(_reacted, timeout=self.reaction_timeout)
+            if state is None:
+                print(f"⚠️ BCI '{intent}': no robot reaction within {self.reaction_timeout:.0f}s")
+                return
+            latency = (state['timestamp'] - received_at) * 1000
+            self.reaction_ms[intent].append(latency)
+            print(f"⚡ BCI '{intent}' -> robot reaction in {latency:.0f}ms")
+
+        threading.Thread(target=_watch, daemon=True).start()
+
+    def report(self) -> str:
+        """Latency summary per intent (mean / p95 / max)"""
+        lines = [f"   received={self.received} coalesced={self.coalesced} "
+                 f"preempted={self.preemptions} unknown={self.unknown}"]
+        for label, table in (('dispatch', self.dispatch_ms), ('reaction', self.reaction_ms)):
+            for intent, values in sorted(table.items()):
+                v = np.array(values)
+                lines.append(f"   {label:<8} {intent:<7} n={len(v):<4} mean={v.mean():7.1f}ms  "
+                             f"p95={np.percentile(v, 95):7.1f}ms  max={v.max():7.1f}ms")
+        return "\n".join(lines)
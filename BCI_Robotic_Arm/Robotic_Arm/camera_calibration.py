@@ -0,0 +1,378 @@
+"""
+CAMERA CALIBRATION
+==================
+Pinhole camera model for the gripper-mounted camera, used to convert
+pixel coordinates into table coordinates for any TCP pose.
+
+Model:
+- intrinsics K (+ optional distortion) of the camera
+- camera pose in the TCP frame (translation + rotation vector)
+- table plane at z = table_z in the robot base frame
+
+For a TCP at height z with orientation r, the table plane maps to the image
+through a homography. Expressed relative to the TCP's XY position it does
+not depend on TCP X/Y, so it is computed once per (Z level, orientation)
+and cached. Arrays of pixels are converted in one vectorized call.
+
+Calibration files are JSON (see CameraCalibration.save / load) and are
+produced by fit_calibration() from pixel/pose pairs of one stationary
+object (see hand_eye_calibration.py).
+"""
+
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def rotvec_to_matrix(rotvec: Sequence[float]) -> np.ndarray:
+    """Rotation vector (axis * angle, as used by URScript poses) to 3x3 matrix"""
+    r = np.asarray(rotvec, dtype=np.float64)
+    angle = np.linalg.norm(r)
+    if angle < 1e-12:
+        return np.eye(3)
+    k = r / angle
+    kx = np.array([[0, -k[2], k[1]],
+                   [k[2], 0, -k[0]],
+                   [-k[1], k[0], 0]])
+    return np.eye(3) + math.sin(angle) * kx + (1 - math.cos(angle)) * kx @ kx
+
+
+def matrix_to_rotvec(matrix: np.ndarray) -> np.ndarray:
+    """3x3 rotation matrix to rotation vector (axis * angle)"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    cos_angle = np.clip((np.trace(matrix) - 1) / 2, -1.0, 1.0)
+    angle = math.acos(cos_angle)
+    if angle < 1e-9:
+        return np.zeros(3)
+    if math.pi - angle < 1e-6:
+        # 180 degrees: axis from the diagonal of (R + I) / 2
+        axis = np.sqrt(np.clip((np.diag(matrix) + 1) / 2, 0, None))
+        i = int(np.argmax(axis))
+        for j in range(3):
+            if j != i and matrix[i, j] + matrix[j, i] < 0:
+                axis[j] = -axis[j]
+        return axis / np.linalg.norm(axis) * angle
+    axis = np.array([matrix[2, 1] - matrix[1, 2],
+                     matrix[0, 2] - matrix[2, 0],
+                     matrix[1, 0] - matrix[0, 1]]) / (2 * math.sin(angle))
+    return axis * angle
+
+
+def nominal_camera_matrix(width: int, height: int, horizontal_fov_deg: float = 70.0) -> np.ndarray:
+    """Camera matrix estimated from the horizontal field of view"""
+    f = (width / 2) / math.tan(math.radians(horizontal_fov_deg) / 2)
+    return np.array([[f, 0, width / 2],
+                     [0, f, height / 2],
+                     [0, 0, 1]], dtype=np.float64)
+
+
+def _positive_focal(camera_matrix, rotvec):
+    """
+    Fold a negative focal length into the camera rotation
+    fx, fy < 0 images the scene like a camera turned 180 degrees about its
+    optical axis, which undistortPoints and the homography do not expect
+    Returns:
+        (camera_matrix with fx, fy > 0, tcp_to_camera rotation vector)
+    """
+    camera_matrix = np.array(camera_matrix, dtype=np.float64)
+    rotvec = np.asarray(rotvec, dtype=np.float64)
+    if camera_matrix[0, 0] < 0 and camera_matrix[1, 1] < 0:
+        camera_matrix[:2, :2] *= -1
+        rotvec = matrix_to_rotvec(rotvec_to_matrix(rotvec) @ rotvec_to_matrix([0.0, 0.0, math.pi]))
+    return camera_matrix, rotvec
+
+
+class CameraCalibration:
+    """Pixel <-> table transform for a camera rigidly mounted on the TCP"""
+
+    def __init__(self, camera_matrix: np.ndarray, image_size: Sequence[int],
+                 tcp_to_camera_translation: Sequence[float] = (0.0, 0.0, 0.0),
+                 tcp_to_camera_rotvec: Sequence[float] = (0.0, 0.0, 0.0),
+                 dist_coeffs: Optional[Sequence[float]] = None, table_z: float = 0.0):
+        self.camera_matrix, self.tcp_to_camera_rotvec = _positive_focal(camera_matrix,
+                                                                        tcp_to_camera_rotvec)
+        self.image_size = tuple(int(v) for v in image_size)
+        self.tcp_to_camera_translation = np.asarray(tcp_to_camera_translation, dtype=np.float64)
+        self.dist_coeffs = None
+        if dist_coeffs is not None and np.any(np.asarray(dist_coeffs) != 0):
+            self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64)
+        self.table_z = float(table_z)
+
+        # Fit quality (filled in by the calibration routine)
+        self.residual_rms_mm = None
+        self.residual_max_mm = None
+        self.residual_rms_px = None
+        self.object_xy_mm = None
+        self.samples = 0
+
+        self._cache = {}
+        self._cache_size = 64
+
+    # ------------------------------------------------------------------
+    # Transform
+    # ------------------------------------------------------------------
+    def _camera_in_base(self, tcp_pose: Sequence[float]):
+        """Camera rotation and position in the base frame for a TCP pose"""
+        r_base_tcp = rotvec_to_matrix(tcp_pose[3:6])
+        r_base_cam = r_base_tcp @ rotvec_to_matrix(self.tcp_to_camera_rotvec)
+        t_base_cam = np.asarray(tcp_pose[:3], dtype=np.float64) + r_base_tcp @ self.tcp_to_camera_translation
+        return r_base_cam, t_base_cam
+
+    def table_homography(self, z: float, orientation: Sequence[float]) -> np.ndarray:
+        """
+        Homography mapping undistorted pixels to table XY (m) relative to the TCP XY
+        Cached per Z level (0.1 mm) and orientation (0.001 rad)
+        """
+        key = (round(z * 10000), tuple(round(float(v), 3) for v in orientation))
+        homography = self._cache.get(key)
+        if homography is not None:
+            return homography
+
+        # TCP placed at (0, 0, z): table coordinates come out relative to TCP XY
+        r_base_cam, t_base_cam = self._camera_in_base([0.0, 0.0, z, *orientation])
+        r_cam_base = r_base_cam.T
+        t_cam_base = -r_cam_base @ t_base_cam
+
+        # Plane z = table_z: pixel ~ K [r1 r2 (r3 * table_z + t)] [X Y 1]^T
+        table_to_pixel = self.camera_matrix @ np.column_stack([
+            r_cam_base[:, 0], r_cam_base[:, 1], r_cam_base[:, 2] * self.table_z + t_cam_base])
+        homography = np.linalg.inv(table_to_pixel)
+
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[key] = homography
+        return homography
+
+    def undistort(self, pixels: np.ndarray) -> np.ndarray:
+        """Remove lens distortion from (N, 2) pixel coordinates"""
+        if self.dist_coeffs is None:
+            return pixels
+        import cv2
+        points = cv2.undistortPoints(pixels.reshape(-1, 1, 2), self.camera_matrix,
+                                     self.dist_coeffs, P=self.camera_matrix)
+        return points.reshape(-1, 2)
+
+    def pixels_to_table(self, pixels, tcp_pose: Sequence[float]) -> np.ndarray:
+        """
+        Convert pixels to table coordinates in the robot base frame
+        Args:
+            pixels: (N, 2) array-like of pixel coordinates
+            tcp_pose: TCP pose [X, Y, Z, RX, RY, RZ] (m, rad) when the image was taken
+        Returns:
+            (N, 2) array of table X/Y in millimeters
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        if len(pixels) == 0:
+            return np.empty((0, 2))
+        pixels = self.undistort(pixels)
+
+        homography = self.table_homography(tcp_pose[2], tcp_pose[3:6])
+        homogeneous = np.column_stack([pixels, np.ones(len(pixels))]) @ homography.T
+        relative = homogeneous[:, :2] / homogeneous[:, 2:3]
+        return (relative + np.asarray(tcp_pose[:2], dtype=np.float64)) * 1000.0
+
+    def table_to_pixels(self, points_mm, tcp_pose: Sequence[float]) -> np.ndarray:
+        """Project table points (N, 2) in mm into undistorted pixels"""
+        points = np.asarray(points_mm, dtype=np.float64).reshape(-1, 2) / 1000.0
+        relative = points - np.asarray(tcp_pose[:2], dtype=np.float64)
+        table_to_pixel = np.linalg.inv(self.table_homography(tcp_pose[2], tcp_pose[3:6]))
+        homogeneous = np.column_stack([relative, np.ones(len(relative))]) @ table_to_pixel.T
+        return homogeneous[:, :2] / homogeneous[:, 2:3]
+
+    def mm_per_pixel(self, tcp_pose: Sequence[float]) -> float:
+        """Approximate table scale at the image center for a TCP pose"""
+        cx, cy = self.camera_matrix[0, 2], self.camera_matrix[1, 2]
+        corners = self.pixels_to_table([[cx, cy], [cx + 1, cy]], tcp_pose)
+        return float(np.linalg.norm(corners[1] - corners[0]))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {
+            'image_size': list(self.image_size),
+            'camera_matrix': self.camera_matrix.tolist(),
+            'dist_coeffs': self.dist_coeffs.tolist() if self.dist_coeffs is not None else [],
+            'tcp_to_camera': {
+                'translation': self.tcp_to_camera_translation.tolist(),
+                'rotation_vector': self.tcp_to_camera_rotvec.tolist(),
+            },
+            'table_z': self.table_z,
+            'residual_rms_mm': self.residual_rms_mm,
+            'residual_max_mm': self.residual_max_mm,
+            'residual_rms_px': self.residual_rms_px,
+            'samples': self.samples,
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CameraCalibration":
+        tcp_to_camera = data.get('tcp_to_camera', {})
+        calibration = cls(
+            camera_matrix=data['camera_matrix'],
+            image_size=data['image_size'],
+            tcp_to_camera_translation=tcp_to_camera.get('translation', (0.0, 0.0, 0.0)),
+            tcp_to_camera_rotvec=tcp_to_camera.get('rotation_vector', (0.0, 0.0, 0.0)),
+            dist_coeffs=data.get('dist_coeffs') or None,
+            table_z=data.get('table_z', 0.0),
+        )
+        calibration.residual_rms_mm = data.get('residual_rms_mm')
+        calibration.residual_max_mm = data.get('residual_max_mm')
+        calibration.residual_rms_px = data.get('residual_rms_px')
+        calibration.samples = data.get('samples', 0)
+        return calibration
+
+    def save(self, path):
+        path = Path(path)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, path) -> Optional["CameraCalibration"]:
+        """Load a calibration file (None if it does not exist)"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        return cls.from_dict(json.loads(path.read_text()))
+
+
+# ----------------------------------------------------------------------
+# Fitting
+# ----------------------------------------------------------------------
+def _focal_scale(log_scale: float) -> float:
+    """Focal scale factor from its fitted logarithm (clamped to 1/100..100)"""
+    return math.exp(min(max(log_scale, -4.6), 4.6))
+
+
+def _project(params: np.ndarray, poses: np.ndarray, base_matrix: np.ndarray,
+             table_z: float, fit_focal: bool) -> np.ndarray:
+    """Project the object (params[6:8]) into the image for every TCP pose
+    (params[8] = log of the focal scale, so the focal length stays positive)"""
+    rotvec, translation = params[0:3], params[3:6]
+    object_point = np.array([params[6], params[7], table_z])
+    camera_matrix = base_matrix.copy()
+    if fit_focal:
+        camera_matrix[0, 0] *= _focal_scale(params[8])
+        camera_matrix[1, 1] *= _focal_scale(params[8])
+
+    r_tcp_cam = rotvec_to_matrix(rotvec)
+    projected = np.empty((len(poses), 2))
+    for i, pose in enumerate(poses):
+        r_base_tcp = rotvec_to_matrix(pose[3:6])
+        r_base_cam = r_base_tcp @ r_tcp_cam
+        t_base_cam = pose[:3] + r_base_tcp @ translation
+        point_cam = r_base_cam.T @ (object_point - t_base_cam)
+        if point_cam[2] <= 1e-6:
+            projected[i] = 1e6  # Behind the camera
+            continue
+        uvw = camera_matrix @ point_cam
+        projected[i] = uvw[:2] / uvw[2]
+    return projected
+
+
+def _levenberg_marquardt(residual_fn, params: np.ndarray, iterations: int = 200):
+    """Minimize ||residual_fn(params)||^2 with a numerical Jacobian"""
+    damping = 1e-3
+    residual = residual_fn(params)
+    cost = float(residual @ residual)
+
+    for _ in range(iterations):
+        jacobian = np.empty((len(residual), len(params)))
+        for j in range(len(params)):
+            step = 1e-6 * max(1.0, abs(params[j]))
+            shifted = params.copy()
+            shifted[j] += step
+            jacobian[:, j] = (residual_fn(shifted) - residual) / step
+
+        normal = jacobian.T @ jacobian
+        gradient = jacobian.T @ residual
+        improved = False
+        while damping < 1e10:
+            lhs = normal + damping * np.diag(np.diag(normal) + 1e-9)
+            try:
+                delta = np.linalg.solve(lhs, -gradient)
+            except np.linalg.LinAlgError:
+                damping *= 10
+                continue
+            candidate = params + delta
+            candidate_residual = residual_fn(candidate)
+            candidate_cost = float(candidate_residual @ candidate_residual)
+            if candidate_cost < cost:
+                params, residual = candidate, candidate_residual
+                converged = cost - candidate_cost < 1e-10 * max(cost, 1e-12)
+                cost = candidate_cost
+                damping = max(damping / 10, 1e-12)
+                improved = True
+                break
+            damping *= 10
+        if not improved or converged:
+            break
+
+    return params, cost
+
+
+def fit_calibration(samples: list, image_size: Sequence[int],
+                    camera_matrix: Optional[np.ndarray] = None, table_z: float = 0.0,
+                    fit_focal: bool = True) -> Optional[CameraCalibration]:
+    """
+    Fit the camera pose on the TCP from observations of one stationary object
+    Args:
+        samples: List of {'pixel': (u, v), 'pose': [X, Y, Z, RX, RY, RZ]} taken
+                 with the object at a fixed (unknown) spot on the table.
+                 Include a few TCP heights and tool rotations so the camera
+                 offset and focal length are observable.
+        image_size: (width, height) of the camera image
+        camera_matrix: Known intrinsics (None = nominal from a 70 degree FOV)
+        table_z: Table height in the base frame (m)
+        fit_focal: Also refine the focal length (scale factor on camera_matrix)
+    Returns:
+        CameraCalibration with residual_rms_mm / residual_max_mm filled in,
+        or None if there are too few samples
+    """
+    if len(samples) < 5:
+        return None
+
+    if camera_matrix is not None:
+        # The rotation is refit below, only the positive intrinsics are kept
+        base_matrix = _positive_focal(camera_matrix, (0.0, 0.0, 0.0))[0]
+    else:
+        base_matrix = nominal_camera_matrix(*image_size)
+    pixels = np.array([s['pixel'] for s in samples], dtype=np.float64)
+    poses = np.array([s['pose'] for s in samples], dtype=np.float64)
+
+    def residual_fn(params):
+        return (_project(params, poses, base_matrix, table_z, fit_focal) - pixels).ravel()
+
+    # Camera looking along the tool Z axis; the in-plane rotation is unknown,
+    # so start from all four quarter turns and keep the best fit
+    best = None
+    for yaw in (0.0, math.pi / 2, math.pi, -math.pi / 2):
+        initial = [0.0, 0.0, yaw, 0.0, 0.0, 0.0, poses[0][0], poses[0][1]]
+        if fit_focal:
+            initial.append(0.0)
+        params, cost = _levenberg_marquardt(residual_fn, np.array(initial))
+        if best is None or cost < best[1]:
+            best = (params, cost)
+    params = best[0]
+
+    fitted_matrix = base_matrix.copy()
+    if fit_focal:
+        fitted_matrix[0, 0] *= _focal_scale(params[8])
+        fitted_matrix[1, 1] *= _focal_scale(params[8])
+    calibration = CameraCalibration(fitted_matrix, image_size,
+                                    tcp_to_camera_translation=params[3:6],
+                                    tcp_to_camera_rotvec=params[0:3], table_z=table_z)
+
+    # Residuals in table millimeters: where each observation says the object is
+    object_mm = params[6:8] * 1000.0
+    errors = np.array([np.linalg.norm(calibration.pixels_to_table([pixel], pose)[0] - object_mm)
+                       for pixel, pose in zip(pixels, poses)])
+    calibration.residual_rms_mm = float(np.sqrt(np.mean(errors ** 2)))
+    calibration.residual_max_mm = float(errors.max())
+    calibration.residual_rms_px = float(np.sqrt(best[1] / len(samples)))
+    calibration.object_xy_mm = tuple(object_mm.tolist())
+    calibration.samples = len(samples)
+    return calibration
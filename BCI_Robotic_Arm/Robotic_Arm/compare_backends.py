@@ -0,0 +1,192 @@
+"""
+DETECTOR BACKEND COMPARISON
+===========================
+Runs VisionSystem.detect_objects() on the same frames with every
+inference backend / precision and compares each one against the PyTorch
+(ultralytics FP32) reference:
+
+- latency: mean / p95 per frame and FPS (pre- and post-processing included)
+- accuracy: detections matched to the reference (same class, IoU >= 0.5)
+  -> precision, recall, mean IoU, mean center offset (px) and mean
+  confidence difference
+
+Frames come from a recorded video or an image directory (the INT8
+calibration frames work). Missing exports are created on the way.
+
+Usage:
+    python compare_backends.py --video recording.mp4
+    python compare_backends.py --images calibration_images --backends openvino --precisions int8
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from complete_pick_and_place_system import VisionSystem
+from inference_backends import BACKENDS, PRECISIONS, create_backend, letterbox_shape
+from pick_benchmark import RESULTS_DIR, _stats
+
+
+def load_frames(video: str = None, images: str = None, limit: int = 200) -> list:
+    """Frames from a video file or an image directory"""
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    elif images:
+        for path in sorted(Path(images).iterdir()):
+            if path.suffix.lower() in ('.jpg', '.jpeg', '.png') and len(frames) < limit:
+                frame = cv2.imread(str(path))
+                if frame is not None:
+                    frames.append(frame)
+    return frames
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(reference: list, candidate: list, min_iou: float = 0.5) -> list:
+    """Greedy (highest IoU first) one-to-one matches of the same class: (ref, cand, iou)"""
+    pairs = []
+    for i, ref in enumerate(reference):
+        for j, det in enumerate(candidate):
+            if ref['class'] == det['class']:
+                iou = _iou(ref['bbox'], det['bbox'])
+                if iou >= min_iou:
+                    pairs.append((iou, i, j))
+    matches, used_ref, used_det = [], set(), set()
+    for iou, i, j in sorted(pairs, reverse=True):
+        if i not in used_ref and j not in used_det:
+            used_ref.add(i)
+            used_det.add(j)
+            matches.append((reference[i], candidate[j], iou))
+    return matches
+
+
+def run_detector(vision: VisionSystem, frames: list, warmup: int = 5):
+    """detect_objects() output and latency for every frame"""
+    for frame in frames[:warmup]:
+        vision.detect_objects(frame)
+    outputs, latencies = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        outputs.append(vision.detect_objects(frame))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def accuracy(reference: list, outputs: list) -> dict:
+    """Agreement of per-frame outputs with the reference outputs"""
+    n_ref = sum(len(r) for r in reference)
+    n_out = sum(len(o) for o in outputs)
+    matches = [m for ref, out in zip(reference, outputs) for m in match_detections(ref, out)]
+    offsets = [np.hypot(r['center_px'][0] - d['center_px'][0], r['center_px'][1] - d['center_px'][1])
+               for r, d, _ in matches]
+    return {
+        'detections': n_out,
+        'reference_detections': n_ref,
+        'precision': len(matches) / n_out if n_out else 1.0,
+        'recall': len(matches) / n_ref if n_ref else 1.0,
+        'mean_iou': float(np.mean([iou for _, _, iou in matches])) if matches else 0.0,
+        'mean_center_offset_px': float(np.mean(offsets)) if offsets else 0.0,
+        'mean_confidence_delta': float(np.mean([d['confidence'] - r['confidence']
+                                                for r, d, _ in matches])) if matches else 0.0,
+    }
+
+
+def print_table(results: list):
+    print("\n" + "="*86)
+    print("  DETECTOR BACKENDS")
+    print("="*86)
+    print(f"   {'backend':<24} {'FPS':>6} {'mean ms':>8} {'p95 ms':>7} {'speedup':>8} "
+          f"{'prec':>6} {'recall':>7} {'IoU':>5} {'Δpx':>5}")
+    base = results[0]['latency_s'].get('mean', 0.0) if results else 0.0
+    for row in results:
+        latency = row['latency_s']
+        acc = row['accuracy']
+        speedup = base / latency['mean'] if latency.get('mean') else 0.0
+        print(f"   {row['backend'] + ' ' + row['precision']:<24} {row['fps']:6.1f} "
+              f"{latency.get('mean', 0) * 1000:8.1f} {latency.get('p95', 0) * 1000:7.1f} "
+              f"{speedup:7.2f}x {acc['precision']:6.3f} {acc['recall']:7.3f} "
+              f"{acc['mean_iou']:5.3f} {acc['mean_center_offset_px']:5.1f}")
+    print("="*86)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector inference backends")
+    parser.add_argument('--model', default='yolov8m.pt')
+    parser.add_argument('--video', default=None, help="Recorded camera video")
+    parser.add_argument('--images', default=None, help="Directory of camera frames")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS[1:], default=list(BACKENDS[1:]))
+    parser.add_argument('--precisions', nargs='+', choices=PRECISIONS, default=list(PRECISIONS))
+    parser.add_argument('--objects', nargs='+', default=None,
+                        help="Class names to detect (default: every model class)")
+    parser.add_argument('--calibration-images', default=None,
+                        help="Frames for INT8 quantization (default: --images)")
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Result file (default: benchmark_results/)")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.images, args.frames)
+    if not frames:
+        print("❌ No frames - pass --video or --images")
+        return
+    print(f"🎞️ {len(frames)} frames")
+
+    # Reference: PyTorch FP32 through the normal VisionSystem path
+    vision = VisionSystem(model_path=args.model, backend='ultralytics')
+    vision.debug_mode = False
+    vision.set_targets(args.objects or list(vision.model.names.values()))
+    reference, latencies = run_detector(vision, frames)
+    mean = float(np.mean(latencies))
+    results = [{'backend': 'ultralytics', 'precision': 'fp32', 'fps': 1.0 / mean,
+                'latency_s': _stats(latencies), 'accuracy': accuracy(reference, reference)}]
+
+    input_shape = letterbox_shape(frames[0].shape[1], frames[0].shape[0])
+    for backend in args.backends:
+        for precision in args.precisions:
+            print(f"\n🧠 {backend} {precision.upper()}")
+            try:
+                vision.model = create_backend(args.model, backend, precision, input_shape,
+                                              args.calibration_images or args.images, args.threads)
+            except (ImportError, RuntimeError, OSError) as e:
+                print(f"   ⚠️ Skipped: {e}")
+                continue
+            outputs, latencies = run_detector(vision, frames)
+            mean = float(np.mean(latencies))
+            row = {'backend': backend, 'precision': precision, 'fps': 1.0 / mean,
+                   'model': vision.model.description, 'latency_s': _stats(latencies),
+                   'accuracy': accuracy(reference, outputs)}
+            print(f"   {row['fps']:.1f} FPS, recall {row['accuracy']['recall']:.3f}")
+            results.append(row)
+
+    print_table(results)
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"backends_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({'timestamp': datetime.now().isoformat(timespec='seconds'),
+                                  'config': vars(args), 'frames': len(frames),
+                                  'results': results}, indent=2, default=float))
+    print(f"💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
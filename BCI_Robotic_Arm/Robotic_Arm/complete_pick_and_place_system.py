@@ -16,13 +16,15 @@ Based on the camera setup images:
 
 import cv2
 import sys
+import json
+import asyncio
+import argparse
+import signal
 import time
-import socket
 import struct
 import threading
 import numpy as np
 from pathlib import Path
-from ultralytics import YOLO
 from datetime import datetime
 from typing import Optional, Tuple, Dict
 
@@ -33,46 +35,156 @@ from cobot import GripperController
 # Add config
 sys.path.append(str(Path(__file__).parent))
 import config
+from robot_state import (RobotStateReader, estimate_move_duration, tcp_speed_norm,
+                         MOTION_REACHED, MOTION_PROTECTIVE_STOP, MOTION_TIMEOUT,
+                         MOTION_CANCELLED, MOTION_PROGRAM_STOPPED)
+from motion_program import MotionProgram
+from gripper_feedback import (GripperFeedback, GRIP_CAUGHT, GRIP_REACHED,
+                              GRIP_DROPPED, GRIP_STATUS_NAMES)
+from urscript_channel import get_channel
+from frame_grabber import FrameGrabber
+from pipeline import Pipeline, PipelineStage, DropOldestQueue
+from object_tracker import ObjectTracker
+from inference_backends import create_backend, letterbox_shape, UltralyticsBackend
+from world_model import WorldModel
+from pick_scheduler import PickScheduler
+from visual_servo import VisualServo
+from bci_dispatcher import CommandDispatcher, MANUAL_PRIORITY, AUTO_PRIORITY
+from camera_calibration import CameraCalibration
+from hand_eye_calibration import run_hand_eye_calibration
+from startup import ParallelStartup
+from frame_scheduler import AdaptiveFrameScheduler
+from preview_server import PreviewServer
 
 
 class CommandListener:
-    """Listens for BCI commands via internal socket"""
-    def __init__(self, port=65432):
+    """
+    Listens for BCI commands on a local asyncio socket server
+    - many clients, persistent connections
+    - newline-delimited text, or 4-byte big-endian length-prefixed frames
+      (detected per connection: length-prefixed frames start with a 0x00 byte)
+    - a frame may be plain text ("pick") or JSON ({"command": "pick", "sent_at": ...})
+    - every command is timestamped on arrival and put on a bounded queue
+      (oldest commands are dropped under overload)
+    """
+    def __init__(self, port=65432, host='127.0.0.1', queue_size=64):
+        self.host = host
         self.port = port
-        self.cmd_queue = []
+        self.cmd_queue = DropOldestQueue(maxsize=queue_size)
         self.running = True
-        self.server_socket = None
+        self.max_frame_size = 65536
+        self._loop = None
+        self._server = None
+        self._thread = None
+        
+        # Statistics
+        self.commands_received = 0
+        self.clients_connected = 0
         
     def start(self):
-        thread = threading.Thread(target=self._run_server)
-        thread.daemon = True
-        thread.start()
+        self.running = True
+        self._thread = threading.Thread(target=self._run_server, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self.running = False
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
         
     def _run_server(self):
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.bind(('127.0.0.1', self.port))
-            self.server_socket.listen(1)
-            print(f"\n👂 BCI Command Listener active on port {self.port}")
-            
-            while self.running:
-                client, addr = self.server_socket.accept()
-                try:
-                    data = client.recv(1024).decode('utf-8')
-                    if data:
-                        print(f"\n🧠 BCI COMMAND RECEIVED: {data}")
-                        self.cmd_queue.append(data)
-                except Exception as e:
-                    print(f"Error receiving command: {e}")
-                finally:
-                    client.close()
+            asyncio.run(self._serve())
         except Exception as e:
             print(f"BCI Listener Error: {e}")
+    
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        print(f"\n👂 BCI Command Listener active on port {self.port}")
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+    
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        addr = writer.get_extra_info('peername')
+        self.clients_connected += 1
+        try:
+            first = await reader.read(1)
+            if not first:
+                return
+            if first == b'\x00':
+                await self._read_length_prefixed(reader, first, addr)
+            else:
+                await self._read_lines(reader, first, addr)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Error receiving command: {e}")
+        finally:
+            self.clients_connected -= 1
+            writer.close()
+            try:
+                # Let the transport finish closing (otherwise it leaks past loop shutdown)
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+    
+    async def _read_lines(self, reader: asyncio.StreamReader, first: bytes, addr):
+        pending = first
+        while self.running:
+            try:
+                line = await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                # Connection closed - a trailing unterminated command still counts
+                if pending + e.partial:
+                    self._enqueue(pending + e.partial, addr)
+                return
+            self._enqueue(pending + line, addr)
+            pending = b''
+    
+    async def _read_length_prefixed(self, reader: asyncio.StreamReader, first: bytes, addr):
+        header = first + await reader.readexactly(3)
+        while self.running:
+            size = struct.unpack('>I', header)[0]
+            if size > self.max_frame_size:
+                print(f"⚠️ BCI frame of {size} bytes from {addr} rejected - closing connection")
+                return
+            self._enqueue(await reader.readexactly(size), addr)
+            header = await reader.readexactly(4)
+    
+    def _enqueue(self, data: bytes, addr):
+        received_at = time.monotonic()
+        text = data.decode('utf-8', errors='replace').strip()
+        if not text:
+            return
+        
+        command = {'command': text, 'received_at': received_at, 'client': addr}
+        if text.startswith('{'):
+            try:
+                payload = json.loads(text)
+                command['command'] = str(payload.get('command', '')).strip()
+                command.update({k: v for k, v in payload.items() if k != 'command'})
+            except ValueError:
+                pass
+        
+        self.commands_received += 1
+        self.cmd_queue.put(command)
+        print(f"\n🧠 BCI COMMAND RECEIVED: {command['command']}")
 
-    def get_command(self):
-        if self.cmd_queue:
-            return self.cmd_queue.pop(0)
-        return None
+    def get_command(self) -> Optional[dict]:
+        """Oldest pending command dict ('command', 'received_at', 'client', ...) or None"""
+        return self.cmd_queue.get_nowait()
+    
+    def drain(self) -> list:
+        """All pending commands, oldest first (called by the control loop every tick)"""
+        commands = []
+        command = self.cmd_queue.get_nowait()
+        while command is not None:
+            commands.append(command)
+            command = self.cmd_queue.get_nowait()
+        return commands
 
 
 class EnhancedRobotController:
@@ -86,8 +198,21 @@ class EnhancedRobotController:
         # Current state
         self.current_pose = [0, 0, 0, 0, 0, 0]  # [X, Y, Z, RX, RY, RZ]
         self.is_moving = False
+        self.active_sequence = None  # 'pick' / 'place' while a sequence runs (incl. gripper waits)
         self.is_connected = False
         
+        # Streaming robot state (one persistent connection to port 30003)
+        self.state_reader = RobotStateReader(robot_ip, port=self.state_port)
+        self.state_max_age = 0.1  # Reject poses older than 100ms (~12 packets)
+        self._pose_stale_warned = False
+        
+        # Motion completion
+        self.position_tolerance = 0.005  # Target reached within 5mm
+        self.motion_timeout_margin = 1.0  # Extra seconds on top of profile time
+        
+        # Shared long-lived URScript channel (port 30002)
+        self.command_channel = get_channel(robot_ip, self.robot_port)
+        
         # Working heights (in meters)
         self.z_safe = 0.200      # Safe travel height (300mm)
         self.z_approach = 0.100  # Approach height (150mm) - camera view
@@ -111,6 +236,25 @@ class EnhancedRobotController:
         # Movement parameters - SLOWED for precise control
         self.acceleration = 0.3  # Reduced from 0.5
         self.velocity = 0.1      # Reduced from 0.3 - much slower movement
+        self.descent_velocity = 0.05  # Final descent to pick/place height
+        self.blend_radius = getattr(config, 'BLEND_RADIUS', 0.02)  # m, pass-through waypoints
+        
+        # Gripper inside motion programs: URScript snippets ({force} is filled in)
+        # that block until the gripper is done, e.g. the gripper URCap's script calls.
+        # Without them GripperController runs between two programs, since any
+        # script it sends on port 30002 would replace a running program.
+        self.gripper_script_open = getattr(config, 'GRIPPER_URSCRIPT_OPEN', None)
+        self.gripper_script_close = getattr(config, 'GRIPPER_URSCRIPT_CLOSE', None)
+        self.gripper_open_time = 1.5   # Fixed wait after opening when there is no feedback (s)
+        self.gripper_close_time = 2.0  # Fixed wait for closing when there is no feedback (s)
+        
+        # Gripper completion / grip status (see gripper_feedback.py)
+        self.gripper_timeout = getattr(config, 'GRIPPER_TIMEOUT', 3.0)
+        self.gripper_status = None  # Last reported grip state (None = unknown)
+        self.gripper_feedback = None
+        if self.gripper:
+            self.gripper_feedback = GripperFeedback(self.gripper, self.state_reader,
+                                                    getattr(config, 'GRIPPER_FEEDBACK', 'auto'))
         
         # Object tracking
         self.last_detected_object = None
@@ -120,6 +264,35 @@ class EnhancedRobotController:
         self.stop_search = False
         self.search_in_progress = False
         
+        # Continuous scan: serpentine sweep over the search grid area, stopped with
+        # stopl on the first detection. 0.1 m/s moves ~3 mm per frame at 30 fps
+        # (about 1 mm of blur at 10 ms exposure) - fine for YOLO at approach height.
+        # Passes 0.2 m apart like the grid rows; the image covers ~0.25 m there.
+        self.search_mode = getattr(config, 'SEARCH_MODE', 'coarse')  # 'coarse', 'scan' or 'grid'
+        self.scan_velocity = getattr(config, 'SCAN_VELOCITY', 0.1)  # m/s
+        self.scan_row_spacing = getattr(config, 'SCAN_ROW_SPACING', 0.2)  # m between passes
+        self.scan_stop = threading.Event()
+        self.search_result = None  # Last object found by a search (table coordinates)
+        self.search_phase = None  # 'overview', 'refine', 'scan' or 'grid' while searching
+        
+        # Coarse-to-fine search: detect every candidate from overview pose(s) high
+        # above the table, then visit only the candidates at approach height.
+        # The control stage feeds overview frames in via add_overview_detections();
+        # without them (no camera) the search falls back to the scan.
+        self.overview_poses = getattr(config, 'SEARCH_OVERVIEW_POSES', [(0.5, 0.4, 0.35)])
+        self.overview_frames = getattr(config, 'SEARCH_OVERVIEW_FRAMES', 2)  # Frames per pose
+        self.overview_timeout = 2.0  # s to wait for overview frames after arriving
+        self.refine_dwell = 1.0  # s at each candidate for the detector to confirm it
+        self.candidate_merge_mm = 40.0  # Candidates closer than this are one object
+        self.search_candidates = []
+        self._overview_since = None
+        self._overview_seen = 0
+        self._overview_done = threading.Event()
+        
+        # Preemption: set by stop_motion() - running moves and sequences abort
+        self.abort_event = threading.Event()
+        self.stop_deceleration = 1.2  # m/s^2 for stopl
+        
         # Table search grid (3x3 meter workspace)
         # Adjusted for typical UR robot workspace
         self.search_grid = [
@@ -137,10 +310,19 @@ class EnhancedRobotController:
             (0.7, 0.2, self.z_approach),
         ]
         
-    def connect(self) -> bool:
-        """Establish connection to robot and gripper"""
+    def connect(self, gripper: bool = True) -> bool:
+        """
+        Establish connection to robot and gripper
+        Args:
+            gripper: Also connect the gripper (False when connect_gripper()
+                     runs in parallel)
+        """
         print(f"\n🔗 Connecting to robot at {self.robot_ip}...")
         
+        # Start streaming robot state and wait for the first packet
+        self.state_reader.start()
+        self.state_reader.wait_for_state(timeout=3.0)
+        
         # Test robot connection
         pose = self.get_robot_pose()
         if pose is None or all(v == 0 for v in pose):
@@ -158,81 +340,94 @@ class EnhancedRobotController:
         # Test if robot accepts commands (send a simple command)
         print("\n🧪 Testing robot command interface...")
         test_cmd = "textmsg(\"Robot connected - remote control active\")\n"
-        if self.send_command(test_cmd):
+        if self.send_command(test_cmd, wait_sent=True):
             print("✅ Robot command interface working")
         else:
             print("⚠️ Robot command interface may not be working")
             print("   Make sure robot is in REMOTE CONTROL mode on teach pendant")
         
-        # Connect gripper if enabled
-        if self.gripper_enabled and self.gripper:
-            print("\n🤏 Connecting to gripper...")
-            if self.gripper.connect():
-                print("✅ Gripper connected!")
-            else:
-                print("⚠️ Gripper connection failed - continuing without gripper")
-                self.gripper_enabled = False
-        
+        if gripper:
+            self.connect_gripper()
         return True
     
+    def connect_gripper(self) -> bool:
+        """Connect the gripper if enabled (a failure disables it, the robot keeps running)"""
+        if not (self.gripper_enabled and self.gripper):
+            return True
+        print("\n🤏 Connecting to gripper...")
+        if self.gripper.connect():
+            print("✅ Gripper connected!")
+            return True
+        print("⚠️ Gripper connection failed - continuing without gripper")
+        self.gripper_enabled = False
+        return False
+    
     def disconnect(self):
         """Disconnect from robot and gripper"""
         if self.gripper:
             self.gripper.disconnect()
+        self.state_reader.stop()
+        self.command_channel.stop()
         print("✅ Disconnected from robot and gripper")
     
+    def pose_at(self, timestamp: float) -> Optional[list]:
+        """TCP pose [X, Y, Z, RX, RY, RZ] at a monotonic timestamp, interpolated from
+        the state stream (None if the buffered history does not cover it)"""
+        return self.state_reader.pose_at(timestamp)
+    
     def get_robot_pose(self) -> Optional[list]:
-        """Get current robot TCP pose from robot state server"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(1.0)
-            s.connect((self.robot_ip, self.state_port))
-            data = s.recv(1060)
-            s.close()
-            
-            if len(data) >= 1060:
-                # TCP pose starts at byte 444, 6 doubles (48 bytes)
-                pose = struct.unpack('>6d', data[444:444+48])
-                return list(pose)
-            return None
-        except Exception as e:
-            print(f"⚠️ Failed to get robot pose: {e}")
+        """Get current robot TCP pose from the streamed robot state"""
+        if not self.state_reader.running:
+            self.state_reader.start()
+            self.state_reader.wait_for_state(timeout=1.0)
+        
+        pose = self.state_reader.get_pose(max_age=self.state_max_age)
+        if pose is None:
+            # Warn once per outage - the reader reconnects by itself
+            if not self._pose_stale_warned:
+                age = self.state_reader.state_age()
+                reason = "no state received" if age is None else f"state is {age*1000:.0f}ms old"
+                print(f"⚠️ Failed to get robot pose: {reason}")
+                self._pose_stale_warned = True
             return None
+        
+        self._pose_stale_warned = False
+        return pose
     
-    def send_command(self, command: str, wait_time: float = 0) -> bool:
-        """Send URScript command to robot"""
-        try:
-            print(f"🔌 Connecting to robot at {self.robot_ip}:{self.robot_port}...")
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5.0)
-            s.connect((self.robot_ip, self.robot_port))
-            print(f"✅ Connected to robot command port")
-            
-            print(f"📤 Sending: {repr(command)}")
-            bytes_sent = s.send(command.encode('utf-8'))
-            print(f"✅ Sent {bytes_sent} bytes to robot")
-            
-            # Read response to confirm command received
-            try:
-                s.settimeout(0.5)
-                response = s.recv(1024)
-                if response:
-                    print(f"📥 Robot response: {response.decode('utf-8', errors='ignore')[:100]}")
-            except socket.timeout:
-                print(f"⚠️ No immediate response from robot (timeout)")
-            except Exception as e:
-                print(f"⚠️ Could not read response: {e}")
-            
-            s.close()
-            print(f"🔌 Connection closed")
-            
-            if wait_time > 0:
-                time.sleep(wait_time)
-            
-            return True
-        except Exception as e:
-            print(f"❌ Command failed: {e}")
+    def send_command(self, command: str, wait_time: float = 0,
+                     wait_sent: bool = False, timeout: float = 1.0) -> bool:
+        """
+        Send URScript command to robot over the shared command channel
+        Args:
+            command: URScript text (newline-terminated)
+            wait_time: Extra delay after sending (seconds)
+            wait_sent: Block until the command is written to the socket
+            timeout: Maximum time to wait for queue space / the write
+        """
+        print(f"📤 Sending: {repr(command)}")
+        if not self.command_channel.send(command, timeout=timeout, wait_sent=wait_sent):
+            print(f"❌ Command failed: not sent to {self.robot_ip}:{self.robot_port}")
             return False
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
+        
+        return True
+    
+    def stop_motion(self) -> bool:
+        """
+        Stop the arm immediately (stopl) and abort any running move or sequence
+        Queued URScript commands are discarded so the stop is written next
+        """
+        self.abort_event.set()
+        self.stop_search = True
+        self.scan_stop.set()
+        print("🛑 STOP - sending stopl")
+        return self.command_channel.send_urgent(f"stopl({self.stop_deceleration})\n")
+    
+    def _pause(self, seconds: float) -> bool:
+        """Sleep that ends early on stop_motion(); returns False if aborted"""
+        return not self.abort_event.wait(seconds)
     
     def move_to_pose(self, x: float, y: float, z: float, 
                      rx: float = None, ry: float = None, rz: float = None,
@@ -256,6 +451,10 @@ class EnhancedRobotController:
             f"a={self.acceleration}, v={self.velocity})\n"
         )
         
+        if self.abort_event.is_set():
+            print(f"⏹️ Move skipped (stop requested): X={x:.4f}m, Y={y:.4f}m, Z={z:.4f}m")
+            return False
+        
         print(f"🤖 Sending command: {command.strip()}")
         print(f"   Target position: X={x:.4f}m, Y={y:.4f}m, Z={z:.4f}m")
         self.is_moving = True
@@ -270,66 +469,46 @@ class EnhancedRobotController:
         
         movement_success = False
         if wait and result:
-            # Wait a bit for movement to start
-            time.sleep(0.5)
-            
-            # Check if movement started by monitoring position
-            start_time = time.time()
-            moved = False
-            poll_count = 0
-            while time.time() - start_time < 5.0:  # Wait up to 5 seconds
-                current = self.get_robot_pose()
-                poll_count += 1
-                if current:
-                    distance = np.sqrt((x - current[0])**2 + (y - current[1])**2 + (z - current[2])**2)
-                    if distance < 0.005:  # Within 5mm of target
-                        print(f"   ✅ Reached target position (error: {distance*1000:.1f}mm)")
-                        moved = True
-                        movement_success = True
-                        # Update current pose to target
-                        self.current_pose = [x, y, z, rx, ry, rz]
-                        break
-                    elif poll_count == 1:
-                        print(f"   Position poll #{poll_count}: X={current[0]:.4f}m, Y={current[1]:.4f}m, distance to target={distance*1000:.1f}mm")
-                    elif pose_before and np.sqrt((current[0] - pose_before[0])**2 + (current[1] - pose_before[1])**2) > 0.001:
-                        # Moved at least 1mm from starting position
-                        moved = True
-                        move_dist = np.sqrt((current[0] - pose_before[0])**2 + (current[1] - pose_before[1])**2) * 1000
-                        print(f"   🔄 Movement detected after {poll_count} polls ({move_dist:.1f}mm moved): now at X={current[0]:.4f}m, Y={current[1]:.4f}m")
-                        movement_success = True
-                        break
-                time.sleep(0.1)
-            
-            if not moved:
-                print(f"   ❌ Movement NOT detected after {poll_count} polls (5 seconds)!")
+            timeout = self._motion_timeout(pose_before, [x, y, z], linear)
+            outcome, state = self.state_reader.wait_for_motion(
+                target=[x, y, z], tolerance=self.position_tolerance, timeout=timeout,
+                cancel_event=self.abort_event)
+            final_pose = state['pose'] if state else None
+            error = None
+            if final_pose:
+                error = np.sqrt((x - final_pose[0])**2 + (y - final_pose[1])**2 + (z - final_pose[2])**2)
+            
+            if outcome == MOTION_REACHED or (error is not None and error < self.position_tolerance):
+                print(f"   ✅ Reached target position (error: {error*1000:.1f}mm)")
+                movement_success = True
+            elif outcome == MOTION_CANCELLED:
+                print(f"   ⏹️ Move cancelled (stop requested)")
+            elif outcome == MOTION_PROTECTIVE_STOP:
+                print(f"   ❌ Robot entered a protective/safety stop during the move!")
+                print(f"      Clear the stop on the teach pendant before continuing")
+            elif outcome == MOTION_TIMEOUT:
+                print(f"   ❌ Target NOT reached within {timeout:.1f}s!")
                 print(f"   Robot may NOT be executing commands - check:")
                 print(f"      1. Is robot in REMOTE CONTROL mode on teach pendant?")
                 print(f"      2. Is robot powered on?")
                 print(f"      3. Is there an error on the robot screen?")
                 print(f"      4. Try pressing EMERGENCY STOP and releasing it")
-                # Try to get current position for debugging
-                final_pose = self.get_robot_pose()
-                if final_pose:
-                    print(f"   Final position: X={final_pose[0]:.4f}m, Y={final_pose[1]:.4f}m, Z={final_pose[2]:.4f}m")
-                    if pose_before:
-                        diff_x = (final_pose[0] - pose_before[0]) * 1000
-                        diff_y = (final_pose[1] - pose_before[1]) * 1000
-                        print(f"   Total position change: X={diff_x:+.1f}mm, Y={diff_y:+.1f}mm")
-                        if diff_x == 0 and diff_y == 0:
-                            print(f"   ⚠️  CRITICAL: Position hasn't changed AT ALL - robot not moving!")
-                    # Even if movement wasn't detected, update pose from robot
-                    self.current_pose = final_pose
-                movement_success = False
             else:
-                # Update current pose for successful movements
-                new_pose = self.get_robot_pose()
-                if new_pose:
-                    self.current_pose = new_pose
-                    print(f"📍 Final pose: {[f'{p:.3f}' for p in new_pose]}")
-                else:
-                    # Use target as fallback
-                    self.current_pose = [x, y, z, rx, ry, rz]
-                    print(f"⚠️ Could not verify updated pose, using target as current")
+                print(f"   ❌ Robot stopped ({outcome}) short of target"
+                      + (f" (error: {error*1000:.1f}mm)" if error is not None else ""))
+            
+            if final_pose:
+                print(f"   Final position: X={final_pose[0]:.4f}m, Y={final_pose[1]:.4f}m, Z={final_pose[2]:.4f}m")
+                if not movement_success and pose_before:
+                    diff_x = (final_pose[0] - pose_before[0]) * 1000
+                    diff_y = (final_pose[1] - pose_before[1]) * 1000
+                    print(f"   Total position change: X={diff_x:+.1f}mm, Y={diff_y:+.1f}mm")
+                    if diff_x == 0 and diff_y == 0:
+                        print(f"   ⚠️  CRITICAL: Position hasn't changed AT ALL - robot not moving!")
+                self.current_pose = list(final_pose)
+            elif movement_success:
+                # Use target as fallback
+                self.current_pose = [x, y, z, rx, ry, rz]
         elif not result:
             print("❌ Command send failed")
             movement_success = False
@@ -343,12 +522,32 @@ class EnhancedRobotController:
         self.is_moving = False
         return movement_success
     
-    def gripper_control(self, open_gripper: bool, force: int = None) -> bool:
+    def _motion_timeout(self, pose_before: Optional[list], target: list, linear: bool) -> float:
+        """Timeout for a move from its distance, velocity and acceleration"""
+        if linear and pose_before:
+            distance = np.sqrt(sum((target[i] - pose_before[i])**2 for i in range(3)))
+        else:
+            # Joint moves use rad and rad/s - assume up to half a turn of joint travel
+            distance = np.pi
+        duration = estimate_move_duration(distance, self.velocity, self.acceleration)
+        
+        # Speed slider below 100% stretches the profile
+        state = self.state_reader.latest()
+        scaling = state['speed_scaling'] if state else 1.0
+        duration /= max(min(scaling, 1.0), 0.1)
+        return duration * 1.2 + self.motion_timeout_margin
+    
+    def gripper_control(self, open_gripper: bool, force: int = None, wait: bool = True) -> bool:
         """
         Control gripper state
         Args:
             open_gripper: True to open, False to close
             force: Optional force override (0-100)
+            wait: Return once the gripper reports its motion complete
+                  (fixed wait when no feedback is available)
+        Returns:
+            True if the command was sent (and completed, with wait=True);
+            the grip state is left in self.gripper_status
         """
         if not self.gripper_enabled or not self.gripper:
             print("⚠️ Gripper not available")
@@ -359,15 +558,135 @@ class EnhancedRobotController:
             self.gripper.force = force
         
         # Execute command
+        commanded_at = time.monotonic()
         if open_gripper:
-            return self.gripper.open_gripper()
+            sent = self.gripper.open_gripper()
+        else:
+            sent = self.gripper.close_gripper()
+        if not sent or not wait:
+            return sent
+        return self.wait_for_gripper(commanded_at, open_gripper)
+    
+    def wait_for_gripper(self, commanded_at: float, open_gripper: bool) -> bool:
+        """
+        Wait for a gripper motion commanded at `commanded_at` to finish
+        Returns:
+            False on timeout or stop request
+        """
+        feedback = self.gripper_feedback
+        if feedback is None or feedback.source is None:
+            # No status available - fixed wait
+            self.gripper_status = None
+            return self._pause(self.gripper_open_time if open_gripper else self.gripper_close_time)
+        
+        status = feedback.wait(commanded_at, self.gripper_timeout, self.abort_event)
+        self.gripper_status = status
+        elapsed = time.monotonic() - commanded_at
+        if status is None:
+            if not self.abort_event.is_set():
+                print(f"   ⚠️ Gripper did not report completion within {self.gripper_timeout:.1f}s")
+            return False
+        print(f"   🤏 Gripper: {GRIP_STATUS_NAMES[status]} ({elapsed*1000:.0f}ms)")
+        return True
+    
+    def holding_object(self) -> Optional[bool]:
+        """True if the gripper reports a gripped object, None if it cannot tell"""
+        if not self.gripper_feedback or self.gripper_feedback.source is None:
+            return None
+        status = self.gripper_feedback.status()
+        if status is None:
+            return None
+        self.gripper_status = status
+        return status == GRIP_CAUGHT
+    
+    def _program_timeout(self, program: MotionProgram, start: Optional[list]) -> float:
+        """Timeout for a motion program from its segment profiles and inline actions"""
+        duration = program.estimated_duration(start)
+        state = self.state_reader.latest()
+        scaling = state['speed_scaling'] if state else 1.0
+        duration /= max(min(scaling, 1.0), 0.1)
+        return duration * 1.2 + self.motion_timeout_margin
+    
+    def run_program(self, program: MotionProgram, cancel_event=None) -> bool:
+        """
+        Upload a blended motion program once and follow it on the state stream
+        Args:
+            program: Motion program to run
+            cancel_event: Stop following the program once set (default: abort_event)
+        Returns:
+            True if the program finished with every waypoint reached
+        """
+        if self.abort_event.is_set():
+            print(f"⏹️ Program '{program.name}' skipped (stop requested)")
+            return False
+        
+        start = self.get_robot_pose()
+        script = program.render(start)
+        timeout = self._program_timeout(program, start)
+        print(f"🤖 Program '{program.name}': {len(program.waypoints)} waypoints, "
+              f"~{program.estimated_duration(start):.1f}s")
+        
+        self.is_moving = True
+        try:
+            if not self.send_command(script, wait_sent=True):
+                return False
+            
+            def _progress(index, label, state):
+                print(f"   ✅ {index + 1}/{len(program.waypoints)} {label}")
+            
+            outcome, state, passed = self.state_reader.wait_for_program(
+                program.waypoint_targets(start), tolerance=self.position_tolerance,
+                timeout=timeout, cancel_event=cancel_event or self.abort_event,
+                on_waypoint=_progress)
+        finally:
+            self.is_moving = False
+        
+        if state:
+            self.current_pose = state['pose']
+        if outcome == MOTION_REACHED:
+            return True
+        if outcome == MOTION_CANCELLED:
+            print(f"   ⏹️ Program cancelled (stop requested)")
+        elif outcome == MOTION_PROTECTIVE_STOP:
+            print(f"   ❌ Robot entered a protective/safety stop during '{program.name}'!")
+            print(f"      Clear the stop on the teach pendant before continuing")
+        elif outcome == MOTION_PROGRAM_STOPPED:
+            print(f"   ❌ Program stopped after {passed}/{len(program.waypoints)} waypoints")
         else:
-            return self.gripper.close_gripper()
+            print(f"   ⚠️ Program timeout after {timeout:.1f}s ({passed}/{len(program.waypoints)} waypoints)")
+        return False
+    
+    def _inline_gripper(self, program: MotionProgram, open_gripper: bool,
+                        force: int = None) -> bool:
+        """
+        Add a gripper action to a motion program
+        Returns:
+            False if the gripper must instead be driven between programs
+        """
+        if not self.gripper_enabled or not self.gripper:
+            return True  # No gripper - nothing to do
+        snippet = self.gripper_script_open if open_gripper else self.gripper_script_close
+        if not snippet:
+            return False
+        force = force if force is not None else self.gripper.force
+        program.script(snippet.format(force=force),
+                       self.gripper_open_time if open_gripper else self.gripper_close_time)
+        return True
+    
+    def _gripper_between_programs(self, open_gripper: bool, force: int = None) -> bool:
+        """Drive the gripper on its own and wait for completion; False if aborted"""
+        if not self.gripper_control(open_gripper=open_gripper, force=force):
+            if self.abort_event.is_set():
+                print("   ⏹️ Sequence aborted (stop requested)")
+                return False
+            print(f"   ⚠️ Gripper {'open' if open_gripper else 'close'} command may have failed")
+        return True
     
     def pick_sequence(self, target_x_mm: float, target_y_mm: float, 
                      object_name: str = "object", grip_force: int = 20) -> bool:
         """
-        Execute complete pick sequence with validation
+        Execute complete pick sequence as one blended motion program:
+        safe height -> approach height -> pick height (slow), grip, lift -> safe height
         Args:
             target_x_mm, target_y_mm: Target coordinates in millimeters
             object_name: Name of object for logging
@@ -384,71 +703,50 @@ class EnhancedRobotController:
         # Convert mm to meters
         target_x = target_x_mm / 1000.0
         target_y = target_y_mm / 1000.0
+        above = [target_x, target_y]
+        a, v = self.acceleration, self.velocity
         
+        self.active_sequence = 'pick'
         try:
-            # Step 1: Open gripper
-            print("\n1️⃣ Opening gripper...")
-            if not self.gripper_control(open_gripper=True):
-                print("   ⚠️ Gripper open command may have failed")
-            time.sleep(1.0)
-            
-            # Step 2: Move to safe height above target
-            print(f"\n2️⃣ Moving to safe height above target...")
-            print(f"   Position: X={target_x:.4f}m, Y={target_y:.4f}m, Z={self.z_safe:.4f}m")
-            if not self.move_to_pose(target_x, target_y, self.z_safe, wait=True):
-                print("   ❌ Failed to reach safe height")
-                return False
-            time.sleep(0.5)
-            
-            # Step 3: Move to approach height (for verification)
-            print(f"\n3️⃣ Moving to approach height...")
-            print(f"   Z={self.z_approach:.4f}m ({self.z_approach*1000:.0f}mm)")
-            if not self.move_to_pose(target_x, target_y, self.z_approach, wait=True):
-                print("   ❌ Failed to reach approach height")
+            program = MotionProgram('pick_descend')
+            if not self._inline_gripper(program, open_gripper=True):
+                if not self._gripper_between_programs(open_gripper=True):
+                    return False
+            program.movel([*above, self.z_safe, *self.orientation], a, v,
+                          self.blend_radius, 'safe height')
+            program.movel([*above, self.z_approach, *self.orientation], a, v,
+                          self.blend_radius, 'approach height')
+            program.movel([*above, self.z_pick, *self.orientation], a, self.descent_velocity,
+                          0.0, 'pick height')
+            
+            if not self._inline_gripper(program, open_gripper=False, force=grip_force):
+                # Grip between two programs: finish the descent first
+                if not self.run_program(program):
+                    print("   ❌ Failed to reach pick height")
+                    return False
+                print(f"\n🤏 Closing gripper (force={grip_force})...")
+                if not self._gripper_between_programs(open_gripper=False, force=grip_force):
+                    return False
+                program = MotionProgram('pick_retract')
+            else:
+                program.name = 'pick'
+            
+            program.movel([*above, self.z_approach, *self.orientation], a, v,
+                          self.blend_radius, 'lift to approach height')
+            program.movel([*above, self.z_safe, *self.orientation], a, v,
+                          0.0, 'safe height with object')
+            if not self.run_program(program):
+                print("   ❌ Pick motion failed")
                 return False
-            time.sleep(0.5)
             
-            # Verify position
-            current = self.get_robot_pose()
-            if current:
-                dist_error = np.sqrt((target_x - current[0])**2 + (target_y - current[1])**2)
-                if dist_error > 0.005:  # 5mm tolerance
-                    print(f"   ⚠️ Position error: {dist_error*1000:.1f}mm - adjusting...")
-                    if not self.move_to_pose(target_x, target_y, self.z_approach, wait=True):
-                        print("   ❌ Position correction failed")
-                        return False
+            # Grip feedback: did we get the object, and is it still there after the lift?
+            if self.holding_object() is False:
+                if self.gripper_status == GRIP_DROPPED:
+                    print("   ❌ Object dropped during lift")
+                elif self.gripper_status == GRIP_REACHED:
+                    print("   ❌ Missed - gripper closed without an object")
                 else:
-                    print(f"   ✅ Position accurate (error: {dist_error*1000:.1f}mm)")
-            
-            # Step 4: Descend to pick height
-            print(f"\n4️⃣ Descending to pick height...")
-            print(f"   Z={self.z_pick:.4f}m ({self.z_pick*1000:.0f}mm)")
-            self.velocity = 0.05  # Slow descent
-            if not self.move_to_pose(target_x, target_y, self.z_pick, wait=True):
-                print("   ❌ Failed to reach pick height")
-                self.velocity = 0.3
-                return False
-            self.velocity = 0.3  # Restore normal speed
-            time.sleep(0.5)
-            
-            # Step 5: Close gripper with specified force
-            print(f"\n5️⃣ Closing gripper (force={grip_force})...")
-            if not self.gripper_control(open_gripper=False, force=grip_force):
-                print("   ⚠️ Gripper close command may have failed")
-            time.sleep(2.0)  # Wait for gripper to fully close and grip
-            print("   ✅ Gripper closed")
-            
-            # Step 6: Lift object
-            print(f"\n6️⃣ Lifting object...")
-            if not self.move_to_pose(target_x, target_y, self.z_approach, wait=True):
-                print("   ❌ Failed to lift object")
-                return False
-            time.sleep(0.5)
-            
-            # Step 7: Move to safe height with object
-            print(f"\n7️⃣ Moving to safe height with object...")
-            if not self.move_to_pose(target_x, target_y, self.z_safe, wait=True):
-                print("   ❌ Failed to reach safe height")
+                    print(f"   ❌ No object in gripper ({GRIP_STATUS_NAMES.get(self.gripper_status)})")
                 return False
             
             print(f"\n✅ Pick sequence completed successfully!")
@@ -457,11 +755,14 @@ class EnhancedRobotController:
         except Exception as e:
             print(f"\n❌ Pick sequence failed: {e}")
             return False
+        finally:
+            self.active_sequence = None
     
     def place_sequence(self, target_x_mm: float, target_y_mm: float,
                       object_name: str = "object") -> bool:
         """
-        Execute complete place sequence
+        Execute complete place sequence as one blended motion program:
+        safe height -> place height (slow), release -> safe height
         Args:
             target_x_mm, target_y_mm: Target coordinates in millimeters
             object_name: Name of object for logging
@@ -476,36 +777,31 @@ class EnhancedRobotController:
         # Convert mm to meters
         target_x = target_x_mm / 1000.0
         target_y = target_y_mm / 1000.0
+        above = [target_x, target_y]
+        place_z = self.z_pick + 0.010  # 10mm above pick height
+        a, v = self.acceleration, self.velocity
         
+        self.active_sequence = 'place'
         try:
-            # Step 1: Move to safe height above target
-            print(f"\n1️⃣ Moving to safe height above placement location...")
-            if not self.move_to_pose(target_x, target_y, self.z_safe, wait=True):
-                print("   ❌ Failed to reach safe height")
-                return False
-            time.sleep(0.5)
-            
-            # Step 2: Descend to place height
-            print(f"\n2️⃣ Descending to place height...")
-            place_z = self.z_pick + 0.010  # 10mm above pick height
-            self.velocity = 0.05
-            if not self.move_to_pose(target_x, target_y, place_z, wait=True):
-                print("   ❌ Failed to reach place height")
-                self.velocity = 0.3
-                return False
-            self.velocity = 0.3
-            time.sleep(0.5)
-            
-            # Step 3: Open gripper to release
-            print(f"\n3️⃣ Opening gripper to release object...")
-            if not self.gripper_control(open_gripper=True):
-                print("   ⚠️ Gripper open command may have failed")
-            time.sleep(1.5)
-            
-            # Step 4: Move back up
-            print(f"\n4️⃣ Moving back to safe height...")
-            if not self.move_to_pose(target_x, target_y, self.z_safe, wait=True):
-                print("   ❌ Failed to return to safe height")
+            program = MotionProgram('place')
+            program.movel([*above, self.z_safe, *self.orientation], a, v,
+                          self.blend_radius, 'safe height above placement')
+            program.movel([*above, place_z, *self.orientation], a, self.descent_velocity,
+                          0.0, 'place height')
+            
+            if not self._inline_gripper(program, open_gripper=True):
+                if not self.run_program(program):
+                    print("   ❌ Failed to reach place height")
+                    return False
+                print(f"\n🤏 Opening gripper to release object...")
+                if not self._gripper_between_programs(open_gripper=True):
+                    return False
+                program = MotionProgram('place_retract')
+            
+            program.movel([*above, self.z_safe, *self.orientation], a, v,
+                          0.0, 'safe height')
+            if not self.run_program(program):
+                print("   ❌ Place motion failed")
                 return False
             
             print(f"\n✅ Place sequence completed successfully!")
@@ -514,6 +810,8 @@ class EnhancedRobotController:
         except Exception as e:
             print(f"\n❌ Place sequence failed: {e}")
             return False
+        finally:
+            self.active_sequence = None
     
     def go_home(self) -> bool:
         """Return to home position"""
@@ -576,49 +874,253 @@ class EnhancedRobotController:
         print("   ⚠️ Max attempts reached")
         return False
     
+    def scan_program(self) -> MotionProgram:
+        """Serpentine path over the search grid area at approach height"""
+        xs = [p[0] for p in self.search_grid]
+        ys = [p[1] for p in self.search_grid]
+        z = self.z_approach
+        rows = max(int(round((max(ys) - min(ys)) / self.scan_row_spacing)), 1) + 1
+        rx, ry, rz = self.orientation
+        
+        program = MotionProgram('table_scan')
+        for row in range(rows):
+            y = max(ys) - row * (max(ys) - min(ys)) / (rows - 1)
+            x_from, x_to = (min(xs), max(xs)) if row % 2 == 0 else (max(xs), min(xs))
+            # Transit to the first pass at normal speed, sweep at scan speed
+            velocity = self.velocity if row == 0 else self.scan_velocity
+            program.movel([x_from, y, z, rx, ry, rz], self.acceleration, velocity,
+                          self.blend_radius, label=f"row {row + 1} start")
+            program.movel([x_to, y, z, rx, ry, rz], self.acceleration, self.scan_velocity,
+                          self.blend_radius, label=f"row {row + 1} end")
+        return program
+    
+    def end_search(self, timeout: float = 2.0) -> bool:
+        """
+        Stop a running search in any phase: the arm is halted with stopl and
+        the search thread's blocking move is cancelled through abort_event
+        (cleared again once the thread finished, unless it was already set)
+        Returns:
+            True once the search thread finished and the arm is at rest
+        """
+        self.stop_search = True
+        if not self.search_in_progress:
+            return True
+        
+        aborted_before = self.abort_event.is_set()
+        self.scan_stop.set()
+        self.abort_event.set()
+        self.command_channel.send_urgent(f"stopl({self.stop_deceleration})\n")
+        deadline = time.monotonic() + timeout
+        while self.search_in_progress and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.search_in_progress:
+            print(f"⚠️ Search did not stop within {timeout:.1f}s")
+            return False
+        
+        if not aborted_before:
+            self.abort_event.clear()
+        # The cancelled move returns at once - wait for stopl to bring the arm to rest
+        state = self.state_reader.latest()
+        if state is not None and tcp_speed_norm(state) < 0.002:
+            return True
+        remaining = max(deadline - time.monotonic(), 0.5)
+        return self.state_reader.wait_for(lambda s: tcp_speed_norm(s) < 0.002, remaining) is not None
+    
+    def _run_scan(self):
+        """Run the serpentine scan program (search thread)"""
+        self.search_phase = 'scan'
+        self.scan_stop.clear()
+        program = self.scan_program()
+        print(f"🔍 Sweeping {len(program.waypoints) // 2} rows at "
+              f"{self.scan_velocity * 1000:.0f} mm/s...\n")
+        completed = self.run_program(program, cancel_event=self.scan_stop)
+        if self.scan_stop.is_set():
+            # stopl was sent - wait for the arm to come to rest
+            self.state_reader.wait_for(lambda s: tcp_speed_norm(s) < 0.002, 2.0)
+            print(f"\n🎯 Scan stopped")
+        elif completed:
+            print("\n⚠️ Scan complete - no objects found")
+            print("   Try adjusting detection confidence or object classes")
+    
+    def table_scan(self) -> bool:
+        """Sweep the table continuously (serpentine) while the camera keeps detecting"""
+        if self.is_moving or self.search_in_progress:
+            return False
+        
+        self.search_in_progress = True
+        self.stop_search = False
+        self.search_phase = 'scan'
+        
+        def _scan_thread():
+            print("\n" + "="*70)
+            print("  TABLE SCAN INITIATED")
+            print("="*70)
+            try:
+                self._run_scan()
+            finally:
+                self.search_phase = None
+                self.search_in_progress = False
+                self.is_moving = False
+        
+        threading.Thread(target=_scan_thread, daemon=True).start()
+        return True
+    
+    def add_overview_detections(self, detections: list, timestamp: float):
+        """
+        Collect search candidates from a frame taken at an overview pose
+        Args:
+            detections: Detections with 'target_mm' (VisionSystem.localize_detections)
+            timestamp: Frame capture time - frames from before arriving are ignored
+        """
+        since = self._overview_since
+        if self.search_phase != 'overview' or since is None or timestamp < since:
+            return
+        for det in detections:
+            x_mm, y_mm = det['target_mm']
+            if not any(np.hypot(x_mm - c['target_mm'][0], y_mm - c['target_mm'][1])
+                       < self.candidate_merge_mm for c in self.search_candidates):
+                self.search_candidates.append({'class': det['class'], 'target_mm': (x_mm, y_mm)})
+        self._overview_seen += 1
+        if self._overview_seen >= self.overview_frames:
+            self._overview_done.set()
+    
+    def _order_candidates(self, start_mm: Tuple[float, float]) -> list:
+        """Candidates in nearest-neighbour order from start_mm"""
+        remaining = list(self.search_candidates)
+        ordered = []
+        position = start_mm
+        while remaining:
+            nearest = min(remaining, key=lambda c: np.hypot(c['target_mm'][0] - position[0],
+                                                            c['target_mm'][1] - position[1]))
+            remaining.remove(nearest)
+            ordered.append(nearest)
+            position = nearest['target_mm']
+        return ordered
+    
+    def _dwell(self, seconds: float):
+        """Wait for the detector to stop the search (ends early on stop / abort)"""
+        deadline = time.monotonic() + seconds
+        while not self.stop_search and time.monotonic() < deadline:
+            if self.abort_event.wait(0.02):
+                return
+    
+    def coarse_search(self) -> bool:
+        """Detect candidates from high overview pose(s), then refine only those"""
+        if self.is_moving or self.search_in_progress:
+            return False
+        
+        self.search_in_progress = True
+        self.stop_search = False
+        self.search_candidates = []
+        self.search_phase = 'overview'  # Before the thread runs: frames are overview frames
+        
+        def _search_thread():
+            print("\n" + "="*70)
+            print("  COARSE-TO-FINE SEARCH INITIATED")
+            print("="*70)
+            try:
+                for idx, (x, y, z) in enumerate(self.overview_poses):
+                    print(f"🔭 Overview {idx+1}/{len(self.overview_poses)}: "
+                          f"X={x:.3f}m, Y={y:.3f}m, Z={z:.3f}m")
+                    self.is_moving = True
+                    reached = self.move_to_pose(x, y, z, wait=True)
+                    self.is_moving = False
+                    if self.stop_search:
+                        return
+                    if not reached:
+                        continue
+                    self._overview_seen = 0
+                    self._overview_done.clear()
+                    self._overview_since = time.monotonic()
+                    deadline = self._overview_since + self.overview_timeout
+                    while not self._overview_done.wait(0.05):
+                        if self.stop_search:
+                            return
+                        if time.monotonic() > deadline:
+                            print("⚠️ No overview frames - falling back to a full scan")
+                            self._run_scan()
+                            return
+                self._overview_since = None
+                
+                last_x, last_y = self.overview_poses[-1][:2]
+                candidates = self._order_candidates((last_x * 1000, last_y * 1000))
+                if not candidates:
+                    print("\n⚠️ Search complete - no objects found")
+                    print("   Try adjusting detection confidence or object classes")
+                    return
+                
+                self.search_phase = 'refine'
+                print(f"🎯 {len(candidates)} candidate(s) - refining at approach height")
+                for idx, candidate in enumerate(candidates):
+                    x_mm, y_mm = candidate['target_mm']
+                    print(f"   Candidate {idx+1}/{len(candidates)}: {candidate['class']} "
+                          f"at X={x_mm:.1f}mm, Y={y_mm:.1f}mm")
+                    self.is_moving = True
+                    reached = self.move_to_pose(x_mm / 1000, y_mm / 1000, self.z_approach, wait=True)
+                    self.is_moving = False
+                    if reached:
+                        self._dwell(self.refine_dwell)
+                    if self.stop_search or self.abort_event.is_set():
+                        return
+                print("\n⚠️ Search complete - no candidate confirmed at approach height")
+            finally:
+                self._overview_since = None
+                self.search_phase = None
+                self.search_in_progress = False
+                self.is_moving = False
+        
+        threading.Thread(target=_search_thread, daemon=True).start()
+        return True
+    
     def table_search(self) -> bool:
-        """Search the entire table for objects by moving through grid pattern"""
+        """Search the entire table for objects (coarse-to-fine, continuous scan or grid)"""
+        if self.search_mode == 'coarse':
+            return self.coarse_search()
+        if self.search_mode == 'scan':
+            return self.table_scan()
         if self.is_moving or self.search_in_progress:
             return False
         
         self.search_in_progress = True
         self.stop_search = False
+        self.search_phase = 'grid'
         
         def _search_thread():
             print("\n" + "="*70)
             print("  TABLE SEARCH INITIATED")
             print("="*70)
             print(f"🔍 Searching {len(self.search_grid)} positions on table...\n")
-            
-            for idx, (x, y, z) in enumerate(self.search_grid):
-                # Check if search should stop (object found)
-                if self.stop_search:
-                    print(f"\n🎯 Search stopped - object found!")
-                    break
-                
-                print(f"   Position {idx+1}/{len(self.search_grid)}: "
-                      f"X={x:.3f}m, Y={y:.3f}m, Z={z:.3f}m")
-                
-                # Move to search position
-                self.is_moving = True
-                if not self.move_to_pose(x, y, z, wait=True):
-                    print(f"      ⚠️ Failed to reach position {idx+1}")
-                    continue
+            try:
+                for idx, (x, y, z) in enumerate(self.search_grid):
+                    # Check if search should stop (object found)
+                    if self.stop_search:
+                        print(f"\n🎯 Search stopped - object found!")
+                        break
+                    
+                    print(f"   Position {idx+1}/{len(self.search_grid)}: "
+                          f"X={x:.3f}m, Y={y:.3f}m, Z={z:.3f}m")
+                    
+                    # Move to search position
+                    self.is_moving = True
+                    reached = self.move_to_pose(x, y, z, wait=True)
+                    self.is_moving = False
+                    if not reached:
+                        print(f"      ⚠️ Failed to reach position {idx+1}")
+                        continue
+                    
+                    # Pause at each position for camera to detect (ends early on stop)
+                    self._pause(1.5)
+                    
+                    if self.stop_search:
+                        break
                 
+                if not self.stop_search:
+                    print("\n⚠️ Search complete - no objects found")
+                    print("   Try adjusting detection confidence or object classes")
+            finally:
+                self.search_phase = None
+                self.search_in_progress = False
                 self.is_moving = False
-                
-                # Pause at each position for camera to detect
-                time.sleep(1.5)
-                
-                if self.stop_search:
-                    break
-            
-            if not self.stop_search:
-                print("\n⚠️ Search complete - no objects found")
-                print("   Try adjusting detection confidence or object classes")
-            
-            self.search_in_progress = False
-            self.is_moving = False
         
         # Run search in background thread
         search_thread = threading.Thread(target=_search_thread, daemon=True)
@@ -630,10 +1132,23 @@ class EnhancedRobotController:
 class VisionSystem:
     """Computer vision system for object detection and localization"""
     
-    def __init__(self, model_path: str = "yolov8m.pt", camera_index: int = 0):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path: str = "yolov8m.pt", camera_index: int = 0,
+                 backend: Optional[str] = None, precision: Optional[str] = None,
+                 load_model: bool = True):
+        self.model_path = model_path
+        self.model = None  # Loaded by load_model() (in __init__ unless load_model=False)
+        self.models = {}  # model path -> loaded backend (the frame scheduler switches between them)
+        self.imgsz = 640
+        # One predict() at a time: the ultralytics predictor and OpenVINO infer
+        # requests are not thread-safe, and hand-eye calibration on the control
+        # stage detects while the inference stage is running
+        self._predict_lock = threading.Lock()
+        # Detection timing per calling thread, so a calibration run never shows
+        # up in the inference stage's numbers (frame scheduler)
+        self._detect_stats = threading.local()
         self.camera_index = camera_index
         self.cap = None
+        self.grabber = None
         
         # Camera parameters
         self.frame_width = 1280
@@ -641,11 +1156,22 @@ class VisionSystem:
         self.center_x = self.frame_width // 2
         self.center_y = self.frame_height // 2
         
+        # Detector backend: 'ultralytics' (PyTorch), 'onnxruntime' or 'openvino',
+        # FP32 or INT8 - exported models are created on first use
+        self.inference_backend = backend or getattr(config, 'INFERENCE_BACKEND', 'ultralytics')
+        self.inference_precision = precision or getattr(config, 'INFERENCE_PRECISION', 'fp32')
+        
         # Calibration parameters (from camera images analysis)
         # The camera is mounted at an angle on the gripper
         # Based on the images: camera is ~150mm above working plane
         self.camera_height_mm = 150  # Height of camera above table
         self.mm_per_pixel = 0.35  # Reduced from 0.50 - more conservative movement
+        # Camera height above the TCP: camera_height_mm / mm_per_pixel hold at
+        # TCP Z = 100mm (approach height); scale grows linearly with height
+        self.camera_tcp_offset_mm = getattr(config, 'CAMERA_TCP_OFFSET_MM', 50)
+        # Time from exposure to the frame arriving in grab() (s); frames are
+        # stamped with the exposure time so they get the pose from that instant
+        self.camera_latency = getattr(config, 'CAMERA_LATENCY', 0.0)
         
         # Coordinate system correction
         # IMPORTANT: Camera is MOUNTED on gripper looking DOWN
@@ -659,6 +1185,16 @@ class VisionSystem:
         self.gripper_offset_x = 0
         self.gripper_offset_y = 80  # Gripper appears to be ~80 pixels below camera center
         
+        # Calibrated camera model (pixel -> table homography per TCP height/orientation)
+        # Without a calibration file the fixed mm_per_pixel model above is used
+        self.calibration_file = Path(getattr(config, 'CALIBRATION_FILE',
+                                             Path(__file__).parent / "camera_calibration.json"))
+        self.calibration = CameraCalibration.load(self.calibration_file)
+        if self.calibration:
+            print(f"✅ Camera calibration loaded: {self.calibration_file.name}")
+        else:
+            print(f"⚠️ No camera calibration ({self.calibration_file.name}) - using fixed {self.mm_per_pixel} mm/px")
+        
         # Debug mode
         self.debug_mode = True  # Enable detailed coordinate logging
         
@@ -666,6 +1202,105 @@ class VisionSystem:
         self.confidence_threshold = 0.35
         self.min_detection_area = 5000  # Minimum pixel area
         
+        # Compiled target classes: names/aliases resolved to model class IDs once
+        self.targets = None
+        self._target_spec = None
+        self._compiled_targets = {}
+        
+        # Detect-then-track: full YOLO every N frames (or when tracking degrades),
+        # optical-flow tracking in between
+        self.tracker = ObjectTracker()
+        self.detect_interval = getattr(config, 'DETECT_INTERVAL', 5)
+        self.min_track_quality = 0.5
+        self._frames_since_detection = 0
+        
+        if load_model:
+            self.load_model()
+    
+    def load_model(self) -> bool:
+        """Load the detector on the configured backend (imports PyTorch / the runtime here)"""
+        try:
+            self.model = create_backend(
+                self.model_path, self.inference_backend, self.inference_precision,
+                input_shape=letterbox_shape(self.frame_width, self.frame_height),
+                calibration_images=getattr(config, 'INT8_CALIBRATION_IMAGES',
+                                           Path(__file__).parent / "calibration_images"),
+                threads=getattr(config, 'INFERENCE_THREADS', 0))
+        except (ImportError, RuntimeError, OSError) as e:
+            print(f"⚠️ {self.inference_backend} backend unavailable ({e}) - using PyTorch")
+            self.model = UltralyticsBackend(self.model_path)
+        self.models[self.model_path] = self.model
+        print(f"🧠 Detector: {self.model.description}")
+        return True
+    
+    def preload_models(self, model_paths: list):
+        """Load extra detector models in the background (fallback levels of the frame scheduler)"""
+        def _load():
+            for path in model_paths:
+                if path in self.models:
+                    continue
+                try:
+                    self.models[path] = create_backend(
+                        path, self.inference_backend, self.inference_precision,
+                        input_shape=letterbox_shape(self.frame_width, self.frame_height),
+                        calibration_images=getattr(config, 'INT8_CALIBRATION_IMAGES',
+                                                   Path(__file__).parent / "calibration_images"),
+                        threads=getattr(config, 'INFERENCE_THREADS', 0))
+                    print(f"🧠 Fallback detector ready: {self.models[path].description}")
+                except Exception as e:
+                    print(f"⚠️ Could not load fallback model {path}: {e}")
+        threading.Thread(target=_load, daemon=True).start()
+    
+    def detector_levels(self, model_paths: list, imgsz_steps: list) -> list:
+        """
+        Detector settings for the frame scheduler, most accurate first
+        Args:
+            model_paths: Models from most to least accurate (the main model first)
+            imgsz_steps: Input sizes to try per model (PyTorch only - exported
+                         models have a fixed input size)
+        """
+        levels = []
+        for path in model_paths:
+            steps = imgsz_steps if self.inference_backend == 'ultralytics' else [self.imgsz]
+            for imgsz in steps:
+                levels.append({'model': path, 'imgsz': imgsz, 'name': Path(path).stem})
+        return levels
+    
+    def select_detector(self, model_path: str, imgsz: int):
+        """Switch to a loaded model / input size (targets are re-resolved if class names differ)"""
+        model = self.models[model_path]
+        with self._predict_lock:
+            previous = self.model
+            self.model = model
+            self.imgsz = imgsz
+            if model is not previous and model.names != previous.names:
+                self._compiled_targets.clear()
+                if self._target_spec:
+                    self.targets = self.compile_targets(*self._target_spec)
+    
+    @property
+    def last_detect_time(self) -> Optional[float]:
+        """Duration of this thread's last full detection (s)"""
+        return getattr(self._detect_stats, 'last_time', None)
+    
+    @property
+    def detect_runs(self) -> int:
+        """Full detections run by this thread"""
+        return getattr(self._detect_stats, 'runs', 0)
+    
+    def warm_up(self, runs: int = 2) -> bool:
+        """
+        Run the detector on blank frames so the first live frame does not pay
+        for lazy initialization (graph optimization, allocator, thread pools)
+        """
+        frame = np.zeros((self.frame_height, self.frame_width, 3), dtype=np.uint8)
+        started = time.monotonic()
+        for _ in range(runs):
+            with self._predict_lock:
+                self.model.predict(frame, conf=self.confidence_threshold, imgsz=self.imgsz)
+        print(f"🔥 Detector warmed up ({(time.monotonic() - started) * 1000:.0f}ms for {runs} runs)")
+        return True
+    
     def initialize_camera(self) -> bool:
         """Initialize camera with optimal settings"""
         print(f"\n📷 Initializing camera {self.camera_index}...")
@@ -692,71 +1327,256 @@ class VisionSystem:
             actual_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             print(f"✅ Camera initialized: {actual_w}x{actual_h}")
             
+            # Drain the device continuously so inference always sees the newest frame
+            self.grabber = FrameGrabber(self.cap, frame.shape[1], frame.shape[0],
+                                        exposure_latency=self.camera_latency)
+            self.grabber.start()
+            
             return True
             
         except Exception as e:
             print(f"❌ Camera initialization failed: {e}")
             return False
     
-    def detect_objects(self, frame: np.ndarray, target_classes: list) -> list:
+    def latest_frame(self, wait_new: bool = True, timeout: float = 1.0,
+                     copy: bool = True) -> Tuple[Optional[np.ndarray], float, int]:
+        """
+        Get the freshest camera frame from the capture thread
+        Returns:
+            (frame, capture_timestamp, sequence) - frame is None if unavailable
+        """
+        if self.grabber is None:
+            return None, 0.0, -1
+        return self.grabber.latest_frame(wait_new=wait_new, timeout=timeout, copy=copy)
+    
+    def frame_after(self, timestamp: float, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float, int]:
+        """Get a copy of the first frame captured after `timestamp` (time.monotonic)"""
+        if self.grabber is None:
+            return None, 0.0, -1
+        return self.grabber.frame_after(timestamp, timeout)
+    
+    def compile_targets(self, target_objects: list, aliases: Dict[str, list] = None) -> dict:
+        """
+        Resolve target object names (and their YOLO aliases) to model class IDs
+        Args:
+            target_objects: User-facing object names, e.g. ['can', 'mouse']
+            aliases: Maps user names to YOLO class names, e.g. {'can': ['cup', 'bottle']}
+        Returns:
+            Dict with 'class_ids' (passed to the predictor as class filter),
+            'id_to_name' (class ID -> reported name, aliases already remapped)
+        """
+        aliases = aliases or {}
+        key = (tuple(sorted(o.lower() for o in target_objects)),
+               tuple(sorted((k, tuple(v)) for k, v in aliases.items())))
+        if key in self._compiled_targets:
+            return self._compiled_targets[key]
+        
+        name_to_id = {name.lower(): class_id for class_id, name in self.model.names.items()}
+        wanted = [o.lower() for o in target_objects]
+        id_to_name = {}
+        
+        for obj in wanted:
+            # e.g. If looking for 'can', we actually look for 'cup' and 'bottle'
+            search_names = aliases.get(obj, [obj])
+            for name in search_names:
+                class_id = name_to_id.get(name.lower())
+                if class_id is None:
+                    print(f"⚠️ '{name}' is not a class of this model - ignored")
+                    continue
+                # Only remap if we aren't also looking for that specific alias
+                if name.lower() in wanted:
+                    id_to_name[class_id] = name.lower()
+                else:
+                    id_to_name.setdefault(class_id, obj)
+        
+        compiled = {
+            'class_ids': sorted(id_to_name),
+            'id_to_name': id_to_name,
+        }
+        self._compiled_targets[key] = compiled
+        return compiled
+    
+    def set_targets(self, target_objects: list, aliases: Dict[str, list] = None):
+        """Set the default targets used by detect_objects()"""
+        self._target_spec = (target_objects, aliases)
+        self.targets = self.compile_targets(target_objects, aliases)
+    
+    def detect_objects(self, frame: np.ndarray, target_classes: list = None,
+                       tcp_pose: Optional[list] = None) -> list:
         """
         Detect objects in frame
         Args:
             frame: Input image
             target_classes: List of object class names to detect
+                            (None = targets set with set_targets())
+            tcp_pose: TCP pose of the frame - scales the minimum area with height
         Returns:
             List of detected objects with bounding boxes and coordinates
         """
-        results = self.model.predict(frame, conf=self.confidence_threshold, 
-                                    verbose=False, imgsz=640)
-        result = results[0]
+        with self._predict_lock:
+            # Targets resolved against the model that runs (select_detector may swap it)
+            targets = self.targets if target_classes is None else self.compile_targets(target_classes)
+            if targets is None or not targets['class_ids']:
+                return []
+            
+            # Class filter runs inside the backend's NMS
+            started = time.perf_counter()
+            xyxy, confidences, class_ids = self.model.predict(frame, conf=self.confidence_threshold,
+                                                              imgsz=self.imgsz,
+                                                              classes=targets['class_ids'])
+            self._detect_stats.last_time = time.perf_counter() - started
+        self._detect_stats.runs = self.detect_runs + 1
+        if len(xyxy) == 0:
+            return []
+        
+        # Whole-array filtering: boxes, areas, confidences
+        xyxy = xyxy.astype(np.int32)
+        class_ids = class_ids.astype(np.int32)
+        
+        widths = xyxy[:, 2] - xyxy[:, 0]
+        heights = xyxy[:, 3] - xyxy[:, 1]
+        areas = widths * heights
+        keep = (areas >= self.min_area_at(tcp_pose)) & (confidences >= self.confidence_threshold)
+        if not keep.any():
+            return []
+        
+        xyxy = xyxy[keep]
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) // 2
+        id_to_name = targets['id_to_name']
         
         detections = []
-        
-        for box in result.boxes:
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id].lower()
-            
-            # Filter for target objects
-            if class_name not in [c.lower() for c in target_classes]:
+        for box, center, width, height, area, confidence, class_id in zip(
+                xyxy.tolist(), centers.tolist(), widths[keep].tolist(), heights[keep].tolist(),
+                areas[keep].tolist(), confidences[keep].tolist(), class_ids[keep].tolist()):
+            class_name = id_to_name.get(class_id)
+            if class_name is None:
                 continue
-            
-            # Get bounding box
-            x1, y1, x2, y2 = [int(c) for c in box.xyxy[0].tolist()]
-            width = x2 - x1
-            height = y2 - y1
-            area = width * height
-            
-            # Filter small detections
-            if area < self.min_detection_area:
-                continue
-            
-            # Calculate center
-            cx = (x1 + x2) // 2
-            cy = (y1 + y2) // 2
-            confidence = float(box.conf[0].item())
-            
             detections.append({
                 'class': class_name,
                 'confidence': confidence,
-                'bbox': (x1, y1, x2, y2),
-                'center_px': (cx, cy),
+                'bbox': tuple(box),
+                'center_px': tuple(center),
                 'size': (width, height),
                 'area': area
             })
         
         return detections
     
+    def detect_and_track(self, frame: np.ndarray, tcp_pose: Optional[list] = None,
+                         frame_seq: Optional[int] = None) -> list:
+        """
+        Detect objects with YOLO every detect_interval frames and track them
+        with optical flow in between (targets from set_targets())
+        Args:
+            frame: BGR camera frame
+            tcp_pose: Robot pose at the frame's capture time
+            frame_seq: Camera sequence number - tracking is dropped across
+                       gaps of skipped frames (see ObjectTracker.max_frame_gap)
+        Returns:
+            Detections in detect_objects() format with stable 'track_id's,
+            ordered oldest track first
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        if (self._frames_since_detection < self.detect_interval - 1
+                and not self.tracker.needs_detection(self.min_track_quality)):
+            tracked = self.tracker.track(gray, frame_seq)
+            if tracked and not self.tracker.needs_detection(self.min_track_quality):
+                self._frames_since_detection += 1
+                return tracked
+        
+        # Full detection (scheduled, or tracking confidence dropped)
+        self._frames_since_detection = 0
+        return self.tracker.update(gray, self.detect_objects(frame, tcp_pose=tcp_pose), frame_seq)
+    
+    def camera_height_at(self, tcp_pose: Optional[list]) -> float:
+        """Camera height above the table in mm (fixed-scale model)"""
+        if tcp_pose is None:
+            return self.camera_height_mm
+        return max(tcp_pose[2] * 1000 + self.camera_tcp_offset_mm, 1.0)
+    
+    def scale_at(self, tcp_pose: Optional[list]) -> float:
+        """Table mm per pixel at the image center for a TCP pose"""
+        if self.calibration and tcp_pose is not None:
+            return self.calibration.mm_per_pixel(tcp_pose)
+        return self.mm_per_pixel * self.camera_height_at(tcp_pose) / self.camera_height_mm
+    
+    def min_area_at(self, tcp_pose: Optional[list]) -> float:
+        """Minimum detection area in pixels (objects shrink with camera height squared)"""
+        ratio = self.camera_height_mm / self.camera_height_at(tcp_pose)
+        return self.min_detection_area * min(ratio * ratio, 1.0)
+    
+    def pixels_to_robot_coords(self, pixels, robot_current_mm: Tuple[float, float],
+                               tcp_pose: Optional[list] = None) -> np.ndarray:
+        """
+        Convert many pixel coordinates to robot coordinates in one call
+        Args:
+            pixels: (N, 2) array-like of pixel coordinates
+            robot_current_mm: Current robot position (x, y) in mm
+            tcp_pose: Full TCP pose [X, Y, Z, RX, RY, RZ] when the frame was taken
+                      (required for the calibrated transform)
+        Returns:
+            (N, 2) array of target robot coordinates in mm
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        if self.calibration and tcp_pose is not None:
+            return self.calibration.pixels_to_table(pixels, tcp_pose)
+        
+        # Fixed-scale model: offset from gripper center, axis inversion, mm_per_pixel
+        gripper_center = np.array([self.center_x + self.gripper_offset_x,
+                                   self.center_y + self.gripper_offset_y], dtype=np.float64)
+        signs = np.array([-1.0 if self.invert_x else 1.0, -1.0 if self.invert_y else 1.0])
+        offsets_mm = (pixels - gripper_center) * signs * self.scale_at(tcp_pose)
+        return offsets_mm + np.asarray(robot_current_mm, dtype=np.float64)
+    
+    def robot_coords_to_pixels(self, points_mm, robot_current_mm: Tuple[float, float],
+                               tcp_pose: Optional[list] = None) -> np.ndarray:
+        """Inverse of pixels_to_robot_coords: (N, 2) table points in mm -> pixels"""
+        points_mm = np.asarray(points_mm, dtype=np.float64).reshape(-1, 2)
+        if self.calibration and tcp_pose is not None:
+            return self.calibration.table_to_pixels(points_mm, tcp_pose)
+        gripper_center = np.array([self.center_x + self.gripper_offset_x,
+                                   self.center_y + self.gripper_offset_y], dtype=np.float64)
+        signs = np.array([-1.0 if self.invert_x else 1.0, -1.0 if self.invert_y else 1.0])
+        offsets_mm = points_mm - np.asarray(robot_current_mm, dtype=np.float64)
+        return gripper_center + offsets_mm * signs / self.scale_at(tcp_pose)
+    
+    def in_view(self, points_mm, robot_current_mm: Tuple[float, float],
+                tcp_pose: Optional[list] = None, margin_px: int = 40) -> np.ndarray:
+        """Bool array: which table points (mm) fall inside the image (minus a margin)"""
+        pixels = self.robot_coords_to_pixels(points_mm, robot_current_mm, tcp_pose)
+        return ((pixels[:, 0] >= margin_px) & (pixels[:, 0] < self.frame_width - margin_px)
+                & (pixels[:, 1] >= margin_px) & (pixels[:, 1] < self.frame_height - margin_px))
+    
+    def localize_detections(self, detections: list, robot_current_mm: Tuple[float, float],
+                            tcp_pose: Optional[list] = None) -> list:
+        """Add 'target_mm' (robot coordinates) to every detection in one vectorized call"""
+        if detections:
+            targets = self.pixels_to_robot_coords([d['center_px'] for d in detections],
+                                                  robot_current_mm, tcp_pose)
+            for det, (tx, ty) in zip(detections, targets.tolist()):
+                det['target_mm'] = (tx, ty)
+        return detections
+    
     def pixel_to_robot_coords(self, pixel_x: int, pixel_y: int, 
-                             robot_current_mm: Tuple[float, float]) -> Tuple[float, float]:
+                             robot_current_mm: Tuple[float, float],
+                             tcp_pose: Optional[list] = None) -> Tuple[float, float]:
         """
         Convert pixel coordinates to robot coordinates
         Args:
             pixel_x, pixel_y: Object center in pixels
             robot_current_mm: Current robot position (x, y) in mm
+            tcp_pose: Full TCP pose when the frame was taken (enables calibrated transform)
         Returns:
             (target_x_mm, target_y_mm): Target robot coordinates in mm
         """
+        if self.calibration and tcp_pose is not None:
+            target_x_mm, target_y_mm = self.calibration.pixels_to_table([[pixel_x, pixel_y]], tcp_pose)[0]
+            if self.debug_mode:
+                print(f"\n📐 Pixel ({pixel_x}, {pixel_y}) at Z={tcp_pose[2]*1000:.0f}mm "
+                      f"→ target ({target_x_mm:.1f}, {target_y_mm:.1f})mm (calibrated)")
+            return (float(target_x_mm), float(target_y_mm))
+        
         # Calculate gripper center in pixels
         gripper_center_x = self.center_x + self.gripper_offset_x
         gripper_center_y = self.center_y + self.gripper_offset_y
@@ -786,9 +1606,10 @@ class VisionSystem:
         if self.invert_y:
             pixel_offset_y = -pixel_offset_y_raw
         
-        # Convert to millimeters
-        mm_offset_x = pixel_offset_x * self.mm_per_pixel
-        mm_offset_y = pixel_offset_y * self.mm_per_pixel
+        # Convert to millimeters (scale at the frame's camera height)
+        mm_per_pixel = self.scale_at(tcp_pose)
+        mm_offset_x = pixel_offset_x * mm_per_pixel
+        mm_offset_y = pixel_offset_y * mm_per_pixel
         
         if self.debug_mode:
             print(f"   After inversion (X={self.invert_x}, Y={self.invert_y}): "
@@ -823,9 +1644,13 @@ class VisionSystem:
         return is_centered
     
     def draw_detections(self, frame: np.ndarray, detections: list, 
-                       robot_current_mm: Tuple[float, float]) -> np.ndarray:
+                       robot_current_mm: Tuple[float, float],
+                       tcp_pose: Optional[list] = None) -> np.ndarray:
         """Draw detection overlays on frame"""
         display = frame.copy()
+        if detections:
+            targets = self.pixels_to_robot_coords([d['center_px'] for d in detections],
+                                                  robot_current_mm, tcp_pose).tolist()
         
         # Draw gripper center crosshair
         gripper_x = self.center_x + self.gripper_offset_x
@@ -837,7 +1662,7 @@ class VisionSystem:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
         
         # Draw detections
-        for det in detections:
+        for det_index, det in enumerate(detections):
             x1, y1, x2, y2 = det['bbox']
             cx, cy = det['center_px']
             
@@ -849,8 +1674,8 @@ class VisionSystem:
             cv2.rectangle(display, (x1, y1), (x2, y2), color, 3)
             cv2.circle(display, (cx, cy), 8, color, -1)
             
-            # Calculate robot coordinates
-            target_x, target_y = self.pixel_to_robot_coords(cx, cy, robot_current_mm)
+            # Robot coordinates (computed for all detections above)
+            target_x, target_y = targets[det_index]
             
             # Calculate movement direction
             move_x = target_x - robot_current_mm[0]
@@ -889,13 +1714,548 @@ class VisionSystem:
     
     def release_camera(self):
         """Release camera resources"""
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
         if self.cap:
             self.cap.release()
             print("✅ Camera released")
 
 
+class AutoPickController:
+    """Control stage: automatic centering, pick/place and manual robot actions"""
+    
+    def __init__(self, robot: EnhancedRobotController, vision: VisionSystem,
+                 place_positions: Dict[str, Tuple[float, float]],
+                 target_objects: list = None, aliases: Dict[str, list] = None):
+        self.robot = robot
+        self.vision = vision
+        self.place_positions = place_positions
+        self.target_objects = target_objects or []
+        self.aliases = aliases
+        
+        self.auto_pick = True   # NOW ENABLED BY DEFAULT - system should find and center objects
+        self.auto_place = False # Still disabled for safety
+        self.gripper_open = True
+        self.last_detection = None
+        self.centering_attempts = 0
+        self.lost_frames = 0  # Track frames without detection
+        self.objects_processed = 0  # Count successful picks
+        self.last_pixel_distance = None  # Track if getting closer or farther
+        self.held_object = None  # Class name of the object in the gripper
+        
+        # Manual actions (keyboard) waiting to run on the control stage
+        self.actions = DropOldestQueue(maxsize=8)
+        
+        # BCI intents (prioritized, may preempt the running activity)
+        self.dispatcher: Optional[CommandDispatcher] = None
+        
+        # Table-frame memory of every object seen (see world_model.py): the next
+        # target is served from here instead of searching again after each pick
+        self.world = WorldModel(merge_radius_mm=getattr(config, 'WORLD_MERGE_RADIUS_MM', 40.0),
+                                stale_misses=getattr(config, 'WORLD_STALE_MISSES', 5))
+        self.bin_radius_mm = getattr(config, 'BIN_RADIUS_MM', 80.0)  # Objects in bins are done
+        
+        # Pick order over the remembered objects: shortest pick -> bin -> next pick route
+        self.scheduler = PickScheduler()
+        
+        # Centering: 'servo' streams speedl from the live detections (visual_servo.py),
+        # 'step' moves 60% of the way per detection with blocking moves
+        self.centering_mode = getattr(config, 'CENTERING_MODE', 'servo')
+        self.servo = VisualServo(robot, vision,
+                                 gain=getattr(config, 'SERVO_GAIN', 2.0),
+                                 deadband_px=getattr(config, 'SERVO_DEADBAND_PX', 25.0),
+                                 max_speed=getattr(config, 'SERVO_MAX_SPEED', 0.08),
+                                 watchdog_timeout=getattr(config, 'SERVO_WATCHDOG', 0.3),
+                                 watchdog_periods=getattr(config, 'SERVO_WATCHDOG_PERIODS', 3.0))
+    
+    def activity_mode(self) -> str:
+        """What the arm is doing, for the frame scheduler ('command', 'centering', ...)"""
+        if len(self.actions) or (self.dispatcher and self.dispatcher.pending()):
+            return 'command'
+        if self.servo.active or self.last_detection is not None:
+            return 'centering'
+        if self.robot.search_phase or self.robot.search_in_progress:
+            return 'search'
+        if self.robot.is_moving:
+            return 'transport'
+        return 'idle'
+    
+    def request(self, action: str, packet: Optional[dict]):
+        """Queue a manual action ('h', 'g', 's', 't', 'c', 'p', ' ') for the control stage"""
+        self.actions.put((action, packet))
+    
+    def on_stop(self):
+        """BCI stop: drop queued work and leave auto mode"""
+        self.actions.clear()
+        self.auto_pick = False
+        self.auto_place = False
+        self.servo.stop()
+        self._reset_centering()
+        print("⏸️ AUTO mode OFF (stop command)")
+    
+    def process(self, packet: dict):
+        """Handle one inference result (called by the control stage thread)"""
+        self._update_world(packet)
+        
+        if self.dispatcher:
+            intent = self.dispatcher.next_intent()
+            while intent is not None:
+                self._halt_servo()
+                self._run_intent(intent, packet)
+                intent = self.dispatcher.next_intent()
+        
+        action = self.actions.get_nowait()
+        while action is not None:
+            self._set_activity(f"key '{action[0]}'", MANUAL_PRIORITY)
+            self._halt_servo()
+            try:
+                self.robot.abort_event.clear()
+                self._run_action(*action)
+            finally:
+                self._set_activity(None)
+            action = self.actions.get_nowait()
+        
+        self._set_activity('auto', AUTO_PRIORITY)
+        try:
+            self._auto_pick_step(packet['detections'], packet['robot_xy_mm'],
+                                 packet.get('robot_pose'), packet.get('timestamp'))
+        finally:
+            self._set_activity(None)
+    
+    def _update_world(self, packet: dict):
+        """Fuse the frame's detections into the world model (adds 'target_mm', 'object_id')"""
+        pose = packet.get('robot_pose')
+        if pose is None:
+            return
+        robot_xy_mm = packet['robot_xy_mm']
+        detections = self.vision.localize_detections(packet['detections'], robot_xy_mm, pose)
+        self.world.update(detections, packet.get('timestamp'),
+                          in_view=lambda points: self.vision.in_view(points, robot_xy_mm, pose))
+    
+    def _in_bin(self, obj: dict) -> bool:
+        x, y = obj['position_mm']
+        return any(np.hypot(x - bx, y - by) < self.bin_radius_mm
+                   for bx, by in self.place_positions.values())
+    
+    def _pick_candidates(self) -> list:
+        """Remembered targets outside the bins, with their destination bins (scheduler input)"""
+        targets = self.vision.targets
+        classes = set(targets['id_to_name'].values()) if targets else None
+        return [{'id': obj['id'], 'class': obj['class'], 'pick_mm': obj['position_mm'],
+                 'bin_mm': self.place_positions.get(obj['class'], (0, 400)),
+                 'observations': obj['observations']}
+                for obj in self.world.objects()
+                if (classes is None or obj['class'] in classes) and not self._in_bin(obj)]
+    
+    def _order_by_plan(self, detections: list, robot_xy_mm: Tuple[float, float]) -> list:
+        """Put the visible detection that comes first in the pick plan first"""
+        if len(detections) < 2:
+            return detections
+        plan = self.scheduler.update(robot_xy_mm, self._pick_candidates())
+        rank = {obj['id']: idx for idx, obj in enumerate(plan)}
+        return sorted(detections, key=lambda d: rank.get(d.get('object_id'), len(rank)))
+    
+    def _find_next(self):
+        """Go to the next planned target from memory, or search the table if there is none"""
+        robot = self.robot
+        pose = robot.get_robot_pose()
+        target = None
+        if pose:
+            target = self.scheduler.next((pose[0] * 1000, pose[1] * 1000), self._pick_candidates())
+        if target is None:
+            print(f"\n🔍 Searching for next object...")
+            robot.table_search()
+            return
+        
+        x, y = target['pick_mm']
+        print(f"\n🧠 Next object from memory: {target['class']} #{target['id']} at "
+              f"({x:.1f}, {y:.1f})mm (seen {target['observations']}x)")
+        # Counts as the object being followed: if it is gone, the lost-object
+        # timeout moves on to the next hypothesis
+        self.last_detection = {'class': target['class'], 'target_mm': target['pick_mm']}
+        self.lost_frames = 0
+        robot.move_to_pose(x / 1000, y / 1000, robot.z_approach, wait=True)
+    
+    def _set_activity(self, name: Optional[str], priority: int = AUTO_PRIORITY):
+        # Lets the dispatcher decide whether a new BCI intent preempts us
+        if not self.dispatcher:
+            return
+        if name is None:
+            self.dispatcher.end()
+        else:
+            self.dispatcher.begin_activity(name, priority)
+    
+    def _halt_servo(self):
+        # Other motions must not be cut short by the servo watchdog's stopl
+        if self.servo.active:
+            self.servo.stop(wait=True)
+    
+    def _servo_step(self, detection: dict, robot_xy_mm: Tuple[float, float],
+                    robot_pose: Optional[list]) -> bool:
+        """Velocity-mode centering; True once the object is centered and the arm at rest"""
+        if self.servo.timed_out():
+            self.servo.stop(wait=True)
+            print("⚠️ Servo centering timed out")
+            print("   Starting new search for better view...")
+            self._reset_centering()
+            self.robot.table_search()
+            return False
+        if not self.servo.active:
+            print(f"\n📍 Servoing to {detection['class']}...")
+        return self.servo.update(detection, robot_xy_mm, robot_pose)
+    
+    def _reset_centering(self):
+        self.centering_attempts = 0
+        self.last_detection = None
+        self.lost_frames = 0
+        self.last_pixel_distance = None
+    
+    @staticmethod
+    def _grip_force(class_name: str) -> int:
+        """Gripper closing force for an object type"""
+        if 'pyth' in class_name:
+            return 15  # Gentle for remote control
+        if 'mouse' in class_name:
+            return 18  # Medium for mouse
+        if 'scissors' in class_name:
+            return 25  # Firmer for scissors
+        return 20  # Default
+    
+    def _run_intent(self, intent: dict, packet: Optional[dict]):
+        """Execute one BCI intent on the control stage"""
+        robot = self.robot
+        vision = self.vision
+        name, argument = intent['intent'], intent['argument']
+        detections = packet['detections'] if packet else []
+        
+        self.dispatcher.begin(intent)
+        try:
+            if name == 'home':
+                print("\n🏠 BCI: going home...")
+                self.dispatcher.motion_started(intent)
+                robot.go_home()
+            elif name == 'select':
+                if not argument or argument == 'all':
+                    objects = self.target_objects
+                else:
+                    objects = [argument]
+                compiled = vision.compile_targets(objects, self.aliases)
+                if not compiled['class_ids']:
+                    print(f"⚠️ BCI: cannot select '{argument}' - not a known object")
+                    return
+                vision.set_targets(objects, self.aliases)
+                vision.tracker.reset()
+                self._reset_centering()
+                print(f"\n🎯 BCI: target set to {', '.join(objects)}")
+            elif name == 'pick':
+                if self.held_object:
+                    print(f"⚠️ BCI: already holding {self.held_object} - place it first")
+                elif not detections:
+                    print("⚠️ BCI: nothing to pick - no object in view")
+                else:
+                    detection = detections[0]
+                    cx, cy = detection['center_px']
+                    target_x, target_y = vision.pixel_to_robot_coords(cx, cy, packet['robot_xy_mm'],
+                                                                      packet.get('robot_pose'))
+                    self.dispatcher.motion_started(intent)
+                    if robot.pick_sequence(target_x, target_y, detection['class'],
+                                           self._grip_force(detection['class'])):
+                        self.held_object = detection['class']
+                        self.objects_processed += 1
+                        self.world.mark_picked(detection.get('object_id'), (target_x, target_y),
+                                               detection['class'])
+                    self._reset_centering()
+            elif name == 'place':
+                if not self.held_object:
+                    print("⚠️ BCI: nothing to place - gripper is empty")
+                else:
+                    place_x, place_y = self.place_positions.get(self.held_object, (0, 400))
+                    self.dispatcher.motion_started(intent)
+                    if robot.place_sequence(place_x, place_y, self.held_object):
+                        self.held_object = None
+        finally:
+            self.dispatcher.end()
+    
+    def _auto_pick_step(self, detections: list, robot_xy_mm: Tuple[float, float],
+                        robot_pose: Optional[list] = None, timestamp: Optional[float] = None):
+        robot = self.robot
+        vision = self.vision
+        
+        # Coarse search overview: frames only provide candidates, nothing to center on
+        if robot.search_phase == 'overview':
+            if timestamp is not None and robot_pose is not None:
+                robot.add_overview_detections(
+                    vision.localize_detections(detections, robot_xy_mm, robot_pose), timestamp)
+            return
+        
+        # Several objects in view: the one planned first is handled first
+        detections = self._order_by_plan(detections, robot_xy_mm)
+        
+        # Auto-pick logic - ONLY if not searching and not moving
+        if self.auto_pick and detections and not robot.is_moving and not robot.search_in_progress:
+            # Focus on first detected object
+            detection = detections[0]
+            cx, cy = detection['center_px']
+            
+            # Calculate current distance from gripper center
+            gripper_center_x = vision.center_x + vision.gripper_offset_x
+            gripper_center_y = vision.center_y + vision.gripper_offset_y
+            current_pixel_distance = np.sqrt((cx - gripper_center_x)**2 + (cy - gripper_center_y)**2)
+            
+            # Check if we're moving in wrong direction (step centering)
+            if (self.centering_mode == 'step' and self.last_pixel_distance is not None
+                    and self.centering_attempts > 0):
+                distance_change = current_pixel_distance - self.last_pixel_distance
+                if distance_change > 20:  # Getting significantly farther
+                    print(f"\n⚠️ WARNING: Moving AWAY from object!")
+                    print(f"   Distance INCREASED by {distance_change:.0f}px (was {self.last_pixel_distance:.0f}px, now {current_pixel_distance:.0f}px)")
+                    print(f"   🔄 Coordinate axes are INVERTED - already fixed!")
+                    print(f"   Current settings: invert_x={vision.invert_x}, invert_y={vision.invert_y}")
+                    
+                    # Stop trying to center this object
+                    self.centering_attempts = 0
+                    self.last_pixel_distance = None
+                    self.last_detection = None
+                    
+                    # Start new search
+                    print(f"   🔍 Starting new search...")
+                    robot.table_search()
+                    time.sleep(1)
+                    return
+            
+            self.last_pixel_distance = current_pixel_distance
+            
+            # Check if centered (the servo reports it once the arm has stopped)
+            if self.centering_mode == 'servo':
+                centered = self._servo_step(detection, robot_xy_mm, robot_pose)
+            else:
+                centered = vision.is_centered(cx, cy)
+            
+            if centered:
+                print(f"\n🎯 {detection['class'].upper()} CENTERED - Initiating pick...")
+                
+                # Calculate target coordinates
+                target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm, robot_pose)
+                
+                # Determine grip force based on object type
+                grip_force = self._grip_force(detection['class'])
+                
+                # Execute pick sequence
+                success = robot.pick_sequence(target_x, target_y, 
+                                             detection['class'], grip_force)
+                
+                if success:
+                    self.objects_processed += 1
+                    self.held_object = detection['class']
+                    self.world.mark_picked(detection.get('object_id'), (target_x, target_y),
+                                           detection['class'])
+                    print(f"\n✅ Object picked successfully! (Total: {self.objects_processed})")
+                    
+                    # Automatic place sequence
+                    if self.auto_place:
+                        # Get placement position for this object type
+                        place_pos = self.place_positions.get(detection['class'], (0, 400))
+                        place_x, place_y = place_pos
+                        
+                        print(f"\n📦 Auto-placing {detection['class']} at ({place_x}mm, {place_y}mm)...")
+                        place_success = robot.place_sequence(place_x, place_y, detection['class'])
+                        
+                        if place_success:
+                            self.held_object = None
+                            print(f"\n✅ {detection['class'].upper()} placed successfully!")
+                            # Next object from memory, or a new search
+                            self._find_next()
+                        else:
+                            print("\n⚠️ Place failed - object may still be in gripper")
+                    else:
+                        # If not auto-placing, bring object to home position as requested
+                        print(f"\n🏠 Bringing {detection['class']} to home position...")
+                        robot.go_home()
+                        
+                        # Drop object at home
+                        print(f"⬇️ Dropping {detection['class']} at home position...")
+                        robot.gripper_control(open_gripper=True)  # Returns once open
+                        self.held_object = None
+                        
+                        print(f"\n🔍 Ready for next object...")
+                        # We moved away - next object from memory, or a new search
+                        self._find_next()
+                else:
+                    print("\n❌ Pick failed")
+                
+                self.centering_attempts = 0
+                self.last_detection = None
+                self.lost_frames = 0
+                self.last_pixel_distance = None  # Reset distance tracking
+                
+            elif self.centering_mode == 'step':
+                # Object not centered - move robot INCREMENTALLY to center it
+                if self.centering_attempts < 10:  # More attempts but smaller movements
+                    pixel_distance = current_pixel_distance
+                    
+                    print(f"\n📍 Centering attempt {self.centering_attempts+1}/10: {detection['class']} at {pixel_distance:.0f}px away")
+                    
+                    # Calculate target but only move a fraction of the way
+                    target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm, robot_pose)
+                    
+                    # Use robot_xy_mm (updated from current_pose) for consistent position
+                    current_x = robot_xy_mm[0]  # Already in mm
+                    current_y = robot_xy_mm[1]  # Already in mm
+                    
+                    # Calibrated transform: go straight to the object
+                    # Fixed mm/px model: move 60% of the distance (faster convergence)
+                    gain = 1.0 if (vision.calibration and robot_pose) else 0.6
+                    delta_x = target_x - current_x
+                    delta_y = target_y - current_y
+                    
+                    step_x = current_x + (delta_x * gain)
+                    step_y = current_y + (delta_y * gain)
+                    
+                    print(f"      Object at: ({target_x:.1f}, {target_y:.1f})mm")
+                    print(f"      Current: ({current_x:.1f}, {current_y:.1f})mm")
+                    print(f"      Moving {gain*100:.0f}% closer to: ({step_x:.1f}, {step_y:.1f})mm")
+                    
+                    # Slow incremental movement
+                    old_vel = robot.velocity
+                    robot.velocity = 0.05  # Very slow
+                    if robot.move_to_pose(step_x / 1000, step_y / 1000, 
+                                     robot.z_approach, wait=True):
+                        print(f"      ✅ Movement command executed")
+                    else:
+                        print(f"      ❌ Movement command failed")
+                    robot.velocity = old_vel
+                    
+                    self.centering_attempts += 1
+                    time.sleep(0.1)  # Brief pause (reduced from 0.8s for faster updates)
+                    
+                    # Check if we're getting closer
+                    if self.centering_attempts > 1:
+                        # If distance isn't decreasing, might be wrong direction
+                        if pixel_distance > 200:  # Still far away
+                            print(f"      ⚠️ Still {pixel_distance:.0f}px away after {self.centering_attempts} attempts")
+                            if self.centering_attempts > 5:
+                                print(f"      🔄 Coordinate system might be inverted!")
+                                print(f"      Try pressing 'x' or 'y' to flip axis")
+                else:
+                    print("⚠️ Centering failed after 10 attempts")
+                    print("   Starting new search for better view...")
+                    self.centering_attempts = 0
+                    self.last_pixel_distance = None
+                    robot.table_search()
+        
+        elif not detections and self.last_detection:
+            self.lost_frames += 1
+            
+            # Trigger search if object lost for too long
+            if self.lost_frames > 30 and not robot.search_in_progress and not robot.is_moving:
+                print("\n⚠️ Object lost from view for >30 frames")
+                self.last_detection = None
+                self.centering_attempts = 0
+                self.lost_frames = 0
+                self.last_pixel_distance = None
+                self._find_next()
+        
+        if detections:
+            self.last_detection = detections[0]
+            self.lost_frames = 0  # Reset counter when object detected
+            
+            # CRITICAL: Stop search immediately when object found
+            if robot.search_in_progress and not robot.stop_search:
+                detection = detections[0]
+                print(f"\n🎯 Object found during search: {detection['class']}!")
+                print("   Stopping search immediately...")
+                if not robot.end_search():
+                    # Still moving: the auto cycle waits for search_in_progress to clear
+                    print("   ⚠️ Search not stopped yet - holding the pick until it has")
+                if robot_pose is not None:
+                    # Frame pose at capture time - the arm was still moving during a scan
+                    cx, cy = detection['center_px']
+                    table_mm = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm, robot_pose)
+                    robot.search_result = {'class': detection['class'], 'table_mm': table_mm,
+                                           'pose': list(robot_pose)}
+                    print(f"   📍 {detection['class']} at table X={table_mm[0]:.1f}mm, "
+                          f"Y={table_mm[1]:.1f}mm (seen from X={robot_pose[0]:.3f}m, "
+                          f"Y={robot_pose[1]:.3f}m)")
+    
+    def _run_action(self, action: str, packet: Optional[dict]):
+        robot = self.robot
+        vision = self.vision
+        detections = packet['detections'] if packet else []
+        
+        if action == 'h':
+            print("\n🏠 Going home...")
+            robot.go_home()
+        elif action == 'g':
+            self.gripper_open = not self.gripper_open
+            robot.gripper_control(self.gripper_open)
+            print(f"\n🤏 Gripper: {'OPEN' if self.gripper_open else 'CLOSED'}")
+        elif action == 's':
+            print("\n🔍 Manual search triggered...")
+            robot.table_search()
+        elif action == 'c':
+            print("\n📐 Hand-eye calibration triggered...")
+            run_hand_eye_calibration(robot, vision)
+        elif action == 't':
+            print("\n🧪 Testing robot movement...")
+            # Get current position
+            current = robot.get_robot_pose()
+            if current:
+                print(f"   Current position: X={current[0]:.4f}m, Y={current[1]:.4f}m, Z={current[2]:.4f}m")
+                
+                # Try a small test move (1cm in X direction)
+                test_x = current[0] + 0.01  # +10mm
+                test_y = current[1]
+                test_z = current[2]
+                
+                print(f"   Testing move to: X={test_x:.4f}m, Y={test_y:.4f}m, Z={test_z:.4f}m")
+                success = robot.move_to_pose(test_x, test_y, test_z, wait=True)
+                
+                if success:
+                    print("   ✅ Test move completed")
+                else:
+                    print("   ❌ Test move failed")
+            else:
+                print("   ❌ Cannot get current position")
+        elif action == 'p' and detections:
+            # Manual pick AND place sequence
+            detection = detections[0]
+            cx, cy = detection['center_px']
+            target_x, target_y = vision.pixel_to_robot_coords(cx, cy, packet['robot_xy_mm'],
+                                                              packet.get('robot_pose'))
+            
+            # Pick
+            success = robot.pick_sequence(target_x, target_y, detection['class'])
+            if success:
+                self.held_object = detection['class']
+                # Place
+                place_pos = self.place_positions.get(detection['class'], (0, 400))
+                if robot.place_sequence(place_pos[0], place_pos[1], detection['class']):
+                    self.held_object = None
+        elif action == ' ' and detections:
+            # Manual pick only (no place)
+            detection = detections[0]
+            cx, cy = detection['center_px']
+            target_x, target_y = vision.pixel_to_robot_coords(cx, cy, packet['robot_xy_mm'],
+                                                              packet.get('robot_pose'))
+            if robot.pick_sequence(target_x, target_y, detection['class']):
+                self.held_object = detection['class']
+
+
 def main():
     """Main control loop for complete pick and place system"""
+    parser = argparse.ArgumentParser(description="Complete pick and place system")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="Run hand-eye calibration on the selected object, save it and exit")
+    parser.add_argument('--headless', action='store_true', default=None,
+                        help="No window or keyboard: control via the command socket (config.HEADLESS)")
+    parser.add_argument('--targets', nargs='+', default=None,
+                        help="Objects to pick ('all' = every object) instead of the interactive selection")
+    parser.add_argument('--preview-port', type=int, default=None,
+                        help="MJPEG preview port in headless mode, 0 = off (config.PREVIEW_PORT)")
+    args = parser.parse_args()
+    headless = args.headless or getattr(config, 'HEADLESS', False)
+    
     print("="*70)
     print("  COMPLETE INTEGRATED PICK AND PLACE SYSTEM")
     print("="*70)
@@ -933,15 +2293,34 @@ def main():
     # Initialize systems
     print("\n📦 Initializing systems...")
     
-    # Vision system
-    vision = VisionSystem(model_path='yolov8m.pt', camera_index=CAMERA_INDEX)
-    if not vision.initialize_camera():
+    # BCI Listener (Start listening for brain commands right away)
+    cmd_listener = CommandListener(port=getattr(config, 'BCI_PORT', 65432))
+    cmd_listener.start()
+    
+    # Model load + warm-up, camera, robot and gripper start in parallel -
+    # startup takes as long as the slowest of them, not the sum
+    vision = VisionSystem(model_path='yolov8m.pt', camera_index=CAMERA_INDEX, load_model=False)
+    robot = EnhancedRobotController(robot_ip=ROBOT_IP, gripper_enabled=True)
+    startup = ParallelStartup()
+    startup.add('model', lambda: vision.load_model() and vision.warm_up())
+    startup.add('camera', vision.initialize_camera)
+    startup.add('robot', lambda: robot.connect(gripper=False))
+    startup.add('gripper', robot.connect_gripper)
+    started = startup.run()
+    print("\n⏱️ Startup timing:")
+    print(startup.report())
+    
+    def abort_startup():
+        cmd_listener.stop()
+        vision.release_camera()
+        robot.disconnect()
+    
+    if not (started['model'] and started['camera']):
         print("❌ Failed to initialize vision system")
+        abort_startup()
         return
     
-    # Robot controller
-    robot = EnhancedRobotController(robot_ip=ROBOT_IP, gripper_enabled=True)
-    if not robot.connect():
+    if not started['robot']:
         print("❌ Failed to connect to robot")
         print("\n⚠️  TROUBLESHOOTING:")
         print("   1. Check robot IP: Is it correct?")
@@ -949,62 +2328,95 @@ def main():
         print("   3. Check power: Is robot powered on?")
         print("   4. Check mode: Is robot in REMOTE CONTROL?")
         print("\n   Run: python test_robot_diagnostic.py for detailed diagnostics")
-        vision.release_camera()
+        abort_startup()
         return
     
     print("\n✅ All systems initialized!")
 
-    # BCI Listener (Start listening for brain commands)
-    cmd_listener = CommandListener()
-    cmd_listener.start()
-
-    # Interactve Object Selection
-    print("\n" + "="*70)
-    print("  OBJECT SELECTION")
-    print("="*70)
-    print("Available objects:")
+    # Object selection: --targets / config.HEADLESS_TARGETS, or interactive
     all_available_objects = sorted(list(PLACE_POSITIONS.keys()))
-    for i, obj in enumerate(all_available_objects):
-        print(f"  {i+1}. {obj}")
-    print(f"  {len(all_available_objects)+1}. ALL OBJECTS")
+    requested = args.targets or (getattr(config, 'HEADLESS_TARGETS', ['all']) if headless else None)
+    if requested:
+        requested = [name.lower() for name in requested]
+        if 'all' in requested:
+            TARGET_OBJECTS = all_available_objects
+        else:
+            for name in requested:
+                if name not in PLACE_POSITIONS:
+                    print(f"⚠️ Unknown object '{name}' - ignored")
+            TARGET_OBJECTS = [name for name in requested if name in PLACE_POSITIONS]
+        if not TARGET_OBJECTS:
+            print("❌ No valid target objects")
+            abort_startup()
+            return
+        print(f"✅ Targets: {', '.join(TARGET_OBJECTS)}")
+    else:
+        print("\n" + "="*70)
+        print("  OBJECT SELECTION")
+        print("="*70)
+        print("Available objects:")
+        for i, obj in enumerate(all_available_objects):
+            print(f"  {i+1}. {obj}")
+        print(f"  {len(all_available_objects)+1}. ALL OBJECTS")
+        
+        while True:
+            try:
+                selection = input(f"\nSelect object to pick (1-{len(all_available_objects)+1}): ").lower().strip()
+                
+                if selection == 'all' or selection == str(len(all_available_objects)+1):
+                    TARGET_OBJECTS = all_available_objects
+                    print(f"✅ Mode selected: PICK ALL OBJECTS")
+                    break
+                elif selection.isdigit() and 1 <= int(selection) <= len(all_available_objects):
+                    idx = int(selection) - 1
+                    selected_obj = all_available_objects[idx]
+                    TARGET_OBJECTS = [selected_obj]
+                    print(f"✅ Mode selected: PICK {selected_obj.upper()} ONLY")
+                    break
+                else:
+                    # Check if typed name directly
+                    if selection in all_available_objects:
+                        TARGET_OBJECTS = [selection]
+                        print(f"✅ Mode selected: PICK {selection.upper()} ONLY")
+                        break
+                    print("❌ Invalid selection. Please try again.")
+            except KeyboardInterrupt:
+                print("\nExiting...")
+                abort_startup()
+                return
+
+    # Target names and aliases are resolved to YOLO class IDs once
+    vision.set_targets(TARGET_OBJECTS, YOLO_ALIASES)
     
-    while True:
+    if args.calibrate:
         try:
-            selection = input(f"\nSelect object to pick (1-{len(all_available_objects)+1}): ").lower().strip()
-            
-            if selection == 'all' or selection == str(len(all_available_objects)+1):
-                TARGET_OBJECTS = all_available_objects
-                print(f"✅ Mode selected: PICK ALL OBJECTS")
-                break
-            elif selection.isdigit() and 1 <= int(selection) <= len(all_available_objects):
-                idx = int(selection) - 1
-                selected_obj = all_available_objects[idx]
-                TARGET_OBJECTS = [selected_obj]
-                print(f"✅ Mode selected: PICK {selected_obj.upper()} ONLY")
-                break
-            else:
-                # Check if typed name directly
-                if selection in all_available_objects:
-                    TARGET_OBJECTS = [selection]
-                    print(f"✅ Mode selected: PICK {selection.upper()} ONLY")
-                    break
-                print("❌ Invalid selection. Please try again.")
-        except KeyboardInterrupt:
-            print("\nExiting...")
-            return
+            run_hand_eye_calibration(robot, vision)
+        finally:
+            abort_startup()
+        return
 
-    print("\n📋 CONTROLS:")
-    print("   SPACE = Pick current object")
-    print("   's' = Start table SEARCH")
-    print("   'p' = Pick & PLACE (complete sequence)")
-    print("   'h' = Home position")
-    print("   'g' = Toggle gripper")
-    print("   'a' = Toggle AUTO mode")
-    print("   't' = TEST robot movement (small move)")
-    print("   'x' = Flip X-axis inversion")
-    print("   'y' = Flip Y-axis inversion")
-    print("   'd' = Toggle DEBUG mode")
-    print("   'q' = Quit")
+    if headless:
+        print(f"\n📋 CONTROLS (command socket, port {cmd_listener.port}):")
+        print("   stop / home / pick / place / select <object>")
+        print("   auto [on|off] = Toggle AUTO mode")
+        print("   search / gripper / test / calibrate")
+        print("   flip x|y = Flip axis inversion")
+        print("   quit = Shut down")
+    else:
+        print("\n📋 CONTROLS:")
+        print("   SPACE = Pick current object")
+        print("   's' = Start table SEARCH")
+        print("   'p' = Pick & PLACE (complete sequence)")
+        print("   'h' = Home position")
+        print("   'g' = Toggle gripper")
+        print("   'a' = Toggle AUTO mode")
+        print("   't' = TEST robot movement (small move)")
+        print("   'c' = CALIBRATE camera (object in view)")
+        print("   'x' = Flip X-axis inversion")
+        print("   'y' = Flip Y-axis inversion")
+        print("   'd' = Toggle DEBUG mode")
+        print("   'q' = Quit")
+        print("   (the same commands work over the command socket)")
     print("-" * 70)
     
     print("\n⚠️  IMPORTANT CHECKS BEFORE RUNNING:")
@@ -1026,22 +2438,175 @@ def main():
     print("   2. Detect objects with camera")
     print("   3. Center objects under gripper")
     print("   4. Pick objects")
-    print("   Press 'a' to toggle AUTO mode")
+    print("   Press 'a' (or send 'auto') to toggle AUTO mode")
     print("-" * 70)
     
     print("\n🔍 Starting initial table search...")
-    time.sleep(1.0)
-    
-    # Main loop
-    auto_pick = True   # NOW ENABLED BY DEFAULT - system should find and center objects
-    auto_place = False # Still disabled for safety
-    gripper_open = True
-    frame_count = 0
-    last_detection = None
-    centering_attempts = 0
-    lost_frames = 0  # Track frames without detection
-    objects_processed = 0  # Count successful picks
-    last_pixel_distance = None  # Track if getting closer or farther
+    
+    # Processing pipeline: capture -> inference -> control / display
+    # Each stage runs independently, so video and detection keep running while
+    # the control stage is blocked inside a pick or place sequence
+    controller = AutoPickController(robot, vision, PLACE_POSITIONS, TARGET_OBJECTS, YOLO_ALIASES)
+    dispatcher = CommandDispatcher(robot, on_stop=controller.on_stop,
+                                   motion_active=lambda: controller.servo.active)
+    controller.dispatcher = dispatcher
+    pipeline = Pipeline()
+    inference_q = pipeline.add_queue('inference', maxsize=1)
+    control_q = pipeline.add_queue('control', maxsize=1)
+    display_q = pipeline.add_queue('display', maxsize=1)
+    
+    def capture_stage(_):
+        # Get the freshest frame from the capture thread
+        frame, frame_time, frame_seq = vision.latest_frame(wait_new=True)
+        if frame is None:
+            return None
+        
+        # Robot pose at the frame's capture time, interpolated from the state
+        # stream - valid while the arm moves (scan, servo)
+        current_pose = robot.pose_at(frame_time)
+        if current_pose is None:
+            # No robot state around the capture time - a pose from another
+            # instant would misplace every detection, so skip the frame
+            if frame_seq % 30 == 0:  # Only warn occasionally
+                print("⚠️ No robot state for frame time (state stream down?) - frame skipped")
+            return None
+        robot.current_pose = current_pose
+        robot_xy_mm = (current_pose[0] * 1000, current_pose[1] * 1000)
+        
+        return {'frame': frame, 'timestamp': frame_time, 'seq': frame_seq,
+                'robot_xy_mm': robot_xy_mm, 'robot_pose': current_pose}
+    
+    # Track between detections to cut YOLO runs on CPU (config.TRACKING_ENABLED)
+    tracking_enabled = getattr(config, 'TRACKING_ENABLED', True)
+    
+    # Adaptive frame scheduling (frame_scheduler.py): detector rate, input size and
+    # model follow a control-loop period per activity instead of fixed settings
+    scheduling_enabled = getattr(config, 'ADAPTIVE_SCHEDULING', True)
+    fallback_models = list(getattr(config, 'ADAPTIVE_MODELS', []))
+    scheduler = AdaptiveFrameScheduler(
+        vision.detector_levels([vision.model_path] + fallback_models,
+                               list(getattr(config, 'ADAPTIVE_IMGSZ', [640, 480, 320]))),
+        periods=getattr(config, 'FRAME_PERIODS', None),
+        available=lambda level: level['model'] in vision.models)
+    # The servo watchdog follows the detector rate the scheduler actually achieves
+    controller.servo.period_source = lambda: scheduler.loop_period
+    if scheduling_enabled and fallback_models:
+        vision.preload_models(fallback_models)
+    last_detections = []
+    
+    def inference_stage(packet):
+        nonlocal last_detections
+        if scheduling_enabled:
+            level = scheduler.set_mode(controller.activity_mode())
+            if level:
+                vision.select_detector(level['model'], level['imgsz'])
+            if not scheduler.should_run():
+                # Not this frame: only the display gets it (with the last boxes)
+                packet['detections'] = last_detections
+                display_q.put(packet)
+                return None
+        
+        # Detect objects (aliased classes come back remapped, e.g. 'cup' -> 'can')
+        # Overview frames of a coarse search always get a full detection
+        detect_runs = vision.detect_runs
+        if tracking_enabled and robot.search_phase != 'overview':
+            packet['detections'] = vision.detect_and_track(packet['frame'], packet['robot_pose'],
+                                                               packet['seq'])
+        else:
+            packet['detections'] = vision.detect_objects(packet['frame'],
+                                                         tcp_pose=packet['robot_pose'])
+        last_detections = packet['detections']
+        
+        if scheduling_enabled:
+            detected = vision.detect_runs != detect_runs
+            level = scheduler.record(vision.last_detect_time if detected else None,
+                                     packet['timestamp'])
+            if level:
+                vision.select_detector(level['model'], level['imgsz'])
+        return packet
+    
+    last_packet = None
+    
+    def annotate(packet):
+        display_frame = vision.draw_detections(packet['frame'], packet['detections'],
+                                               packet['robot_xy_mm'], packet['robot_pose'])
+        cv2.putText(display_frame,
+                    f"CAM {capture.stats.rate:.0f} fps | DET {inference.stats.rate:.0f} fps",
+                    (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        return display_frame
+    
+    # Headless: no window - annotated frames only go to the optional MJPEG
+    # preview, which draws and encodes on its own thread while someone watches
+    preview = None
+    preview_port = args.preview_port if args.preview_port is not None else \
+        getattr(config, 'PREVIEW_PORT', 8080)
+    if headless and preview_port:
+        preview = PreviewServer(annotate, host=getattr(config, 'PREVIEW_HOST', '127.0.0.1'),
+                                port=preview_port, max_fps=getattr(config, 'PREVIEW_FPS', 10))
+        if not preview.start():
+            preview = None
+    
+    def display_stage(packet):
+        nonlocal last_packet
+        last_packet = packet
+        if headless:
+            if preview:
+                preview.submit(packet)
+            return packet
+        cv2.imshow("Complete Pick & Place System", annotate(packet))
+        return packet
+    
+    capture = pipeline.add_stage(PipelineStage('capture', capture_stage, outputs=[inference_q]))
+    inference = pipeline.add_stage(PipelineStage('inference', inference_stage, inference_q,
+                                                 outputs=[control_q, display_q]))
+    pipeline.add_stage(PipelineStage('control', controller.process, control_q))
+    display = pipeline.add_stage(PipelineStage('display', display_stage, display_q,
+                                               foreground=not headless))
+    
+    # Control commands shared by the keyboard and the command socket
+    # (BCI intents - stop, home, pick, place, select - go to the dispatcher)
+    shutdown = threading.Event()
+    socket_actions = {'search': 's', 'gripper': 'g', 'test': 't', 'calibrate': 'c'}
+    
+    def set_auto(enabled: bool):
+        controller.auto_pick = enabled
+        controller.auto_place = enabled  # Toggle both together
+        if enabled:
+            robot.abort_event.clear()  # Resume after a BCI stop
+        print(f"\n⚡ AUTO mode: {'ON' if enabled else 'OFF'}")
+    
+    def flip_axis(axis: str):
+        if axis == 'x':
+            vision.invert_x = not vision.invert_x
+            print(f"\n🔄 X-axis inversion: {'ON' if vision.invert_x else 'OFF'}")
+            print("   If robot moves opposite in X direction, this toggles it")
+        else:
+            vision.invert_y = not vision.invert_y
+            print(f"\n🔄 Y-axis inversion: {'ON' if vision.invert_y else 'OFF'}")
+            print("   If robot moves opposite in Y direction, this toggles it")
+    
+    def control_command(command: dict) -> bool:
+        """Handle a socket control command; False if it is a BCI intent"""
+        words = command.get('command', '').lower().split()
+        if not words:
+            return False
+        name, argument = words[0], words[1] if len(words) > 1 else None
+        if name in ('quit', 'shutdown'):
+            print("\n👋 Shutdown requested")
+            shutdown.set()
+        elif name == 'auto':
+            set_auto(not controller.auto_pick if argument is None else argument in ('on', '1', 'true'))
+        elif name == 'flip' and argument in ('x', 'y'):
+            flip_axis(argument)
+        elif name in socket_actions:
+            controller.request(socket_actions[name], last_packet)
+        else:
+            return False
+        return True
+    
+    if headless:
+        # Service managers stop us with SIGTERM
+        signal.signal(signal.SIGTERM, lambda signum, frame: shutdown.set())
     
     print("\n⚠️  AUTO mode is DISABLED on startup")
     print("   1. First, verify robot moves TOWARDS object (watch debug output)")
@@ -1050,239 +2615,24 @@ def main():
     
     # Start with initial search
     robot.table_search()
+    pipeline.start()
+    session_started = time.monotonic()
     
     try:
-        while True:
-            # Capture frame
-            ret, frame = vision.cap.read()
-            if not ret:
-                print("⚠️ Frame capture failed")
-                time.sleep(0.1)
-                continue
-            
-            frame_count += 1
-            if frame_count % 2 != 0:  # Process every other frame
-                continue
-            
-            # Update robot pose
-            current_pose = robot.get_robot_pose()
-            if current_pose:
-                robot.current_pose = current_pose
-                robot_xy_mm = (current_pose[0] * 1000, current_pose[1] * 1000)
+        while not shutdown.is_set():
+            if headless:
+                shutdown.wait(0.02)
             else:
-                # Use last known good pose if available to avoid jumping to (0,0)
-                if hasattr(robot, 'current_pose') and any(robot.current_pose):
-                     robot_xy_mm = (robot.current_pose[0] * 1000, robot.current_pose[1] * 1000)
-                     if frame_count % 30 == 0: # Only warn occasionally
-                         print("⚠️ using cached robot pose (connection glitch)")
-                else:
-                    # No valid pose known - skipping this frame for movement calculations
-                    continue
-            
-            # Prepare detection classes with aliases
-            # e.g. If looking for 'can', we actually look for 'cup' and 'bottle'
-            search_classes = []
-            alias_map = {} # detected_class -> user_class
-            
-            for obj in TARGET_OBJECTS:
-                if obj in YOLO_ALIASES:
-                    for alias in YOLO_ALIASES[obj]:
-                        search_classes.append(alias)
-                        # Only map if we aren't also looking for that specific alias
-                        if alias not in TARGET_OBJECTS:
-                            alias_map[alias] = obj
-                else:
-                    search_classes.append(obj)
-            
-            # Detect objects
-            detections = vision.detect_objects(frame, list(set(search_classes)))
-            
-            # Remap aliased objects (e.g. 'cup' -> 'can')
-            for det in detections:
-                if det['class'] in alias_map:
-                    det['class'] = alias_map[det['class']]
-
-            # Draw visualization
-            display_frame = vision.draw_detections(frame, detections, robot_xy_mm)
-            cv2.imshow("Complete Pick & Place System", display_frame)
-            
-            # Auto-pick logic - ONLY if not searching and not moving
-            if auto_pick and detections and not robot.is_moving and not robot.search_in_progress:
-                # Focus on first detected object
-                detection = detections[0]
-                cx, cy = detection['center_px']
-                
-                # Calculate current distance from gripper center
-                gripper_center_x = vision.center_x + vision.gripper_offset_x
-                gripper_center_y = vision.center_y + vision.gripper_offset_y
-                current_pixel_distance = np.sqrt((cx - gripper_center_x)**2 + (cy - gripper_center_y)**2)
-                
-                # Check if we're moving in wrong direction
-                if last_pixel_distance is not None and centering_attempts > 0:
-                    distance_change = current_pixel_distance - last_pixel_distance
-                    if distance_change > 20:  # Getting significantly farther
-                        print(f"\n⚠️ WARNING: Moving AWAY from object!")
-                        print(f"   Distance INCREASED by {distance_change:.0f}px (was {last_pixel_distance:.0f}px, now {current_pixel_distance:.0f}px)")
-                        print(f"   🔄 Coordinate axes are INVERTED - already fixed!")
-                        print(f"   Current settings: invert_x={vision.invert_x}, invert_y={vision.invert_y}")
-                        
-                        # Stop trying to center this object
-                        centering_attempts = 0
-                        last_pixel_distance = None
-                        last_detection = None
-                        
-                        # Start new search
-                        print(f"   🔍 Starting new search...")
-                        robot.table_search()
-                        time.sleep(1)
-                        continue
-                
-                last_pixel_distance = current_pixel_distance
-                
-                # Check if centered
-                if vision.is_centered(cx, cy):
-                    print(f"\n🎯 {detection['class'].upper()} CENTERED - Initiating pick...")
-                    
-                    # Calculate target coordinates
-                    target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm)
-                    
-                    # Determine grip force based on object type
-                    grip_force = 20  # Default
-                    if 'pyth' in detection['class']:
-                        grip_force = 15  # Gentle for remote control
-                    elif 'mouse' in detection['class']:
-                        grip_force = 18  # Medium for mouse
-                    elif 'scissors' in detection['class']:
-                        grip_force = 25  # Firmer for scissors
-                    
-                    # Execute pick sequence
-                    success = robot.pick_sequence(target_x, target_y, 
-                                                 detection['class'], grip_force)
-                    
-                    if success:
-                        objects_processed += 1
-                        print(f"\n✅ Object picked successfully! (Total: {objects_processed})")
-                        
-                        # Automatic place sequence
-                        if auto_place:
-                            # Get placement position for this object type
-                            place_pos = PLACE_POSITIONS.get(detection['class'], (0, 400))
-                            place_x, place_y = place_pos
-                            
-                            print(f"\n📦 Auto-placing {detection['class']} at ({place_x}mm, {place_y}mm)...")
-                            place_success = robot.place_sequence(place_x, place_y, detection['class'])
-                            
-                            if place_success:
-                                print(f"\n✅ {detection['class'].upper()} placed successfully!")
-                                print(f"\n🔍 Searching for next object...")
-                                # Trigger new search for next object
-                                time.sleep(1.0)
-                                robot.table_search()
-                            else:
-                                print("\n⚠️ Place failed - object may still be in gripper")
-                        else:
-                            # If not auto-placing, bring object to home position as requested
-                            print(f"\n🏠 Bringing {detection['class']} to home position...")
-                            robot.go_home()
-                            
-                            # Drop object at home
-                            print(f"⬇️ Dropping {detection['class']} at home position...")
-                            robot.gripper_control(open_gripper=True)
-                            time.sleep(1.0)
-
-                            print(f"\n🔍 Ready for next object...")
-                            # Trigger new search since we moved away
-                            time.sleep(1.0)
-                            robot.table_search()
-                    else:
-                        print("\n❌ Pick failed")
-                    
-                    centering_attempts = 0
-                    last_detection = None
-                    lost_frames = 0
-                    last_pixel_distance = None  # Reset distance tracking
-                    
-                else:
-                    # Object not centered - move robot INCREMENTALLY to center it
-                    if centering_attempts < 10:  # More attempts but smaller movements
-                        # Calculate distance from gripper center
-                        gripper_center_x = vision.center_x + vision.gripper_offset_x
-                        gripper_center_y = vision.center_y + vision.gripper_offset_y
-                        pixel_distance = np.sqrt((cx - gripper_center_x)**2 + (cy - gripper_center_y)**2)
-                        
-                        print(f"\n📍 Centering attempt {centering_attempts+1}/10: {detection['class']} at {pixel_distance:.0f}px away")
-                        
-                        # Calculate target but only move a fraction of the way
-                        target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm)
-                        
-                        # Use robot_xy_mm (updated from current_pose) for consistent position
-                        current_x = robot_xy_mm[0]  # Already in mm
-                        current_y = robot_xy_mm[1]  # Already in mm
-                        
-                        # Move 60% of the distance towards object (faster convergence)
-                        delta_x = target_x - current_x
-                        delta_y = target_y - current_y
-                        
-                        step_x = current_x + (delta_x * 0.6)
-                        step_y = current_y + (delta_y * 0.6)
-                        
-                        print(f"      Object at: ({target_x:.1f}, {target_y:.1f})mm")
-                        print(f"      Current: ({current_x:.1f}, {current_y:.1f})mm")
-                        print(f"      Moving 60% closer to: ({step_x:.1f}, {step_y:.1f})mm")
-                        
-                        # Slow incremental movement
-                        old_vel = robot.velocity
-                        robot.velocity = 0.05  # Very slow
-                        if robot.move_to_pose(step_x / 1000, step_y / 1000, 
-                                         robot.z_approach, wait=True):
-                            print(f"      ✅ Movement command executed")
-                        else:
-                            print(f"      ❌ Movement command failed")
-                        robot.velocity = old_vel
-                        
-                        centering_attempts += 1
-                        time.sleep(0.1)  # Brief pause (reduced from 0.8s for faster updates)
-                        
-                        # Check if we're getting closer
-                        if centering_attempts > 1:
-                            # If distance isn't decreasing, might be wrong direction
-                            if pixel_distance > 200:  # Still far away
-                                print(f"      ⚠️ Still {pixel_distance:.0f}px away after {centering_attempts} attempts")
-                                if centering_attempts > 5:
-                                    print(f"      🔄 Coordinate system might be inverted!")
-                                    print(f"      Try pressing 'x' or 'y' to flip axis")
-                    else:
-                        print("⚠️ Centering failed after 10 attempts")
-                        print("   Starting new search for better view...")
-                        centering_attempts = 0
-                        last_pixel_distance = None
-                        robot.table_search()
-            
-            elif not detections and last_detection:
-                lost_frames += 1
-                
-                # Trigger search if object lost for too long
-                if lost_frames > 30 and not robot.search_in_progress and not robot.is_moving:
-                    print("\n⚠️ Object lost from view for >30 frames")
-                    print("🔍 Initiating table search...")
-                    last_detection = None
-                    centering_attempts = 0
-                    robot.table_search()
-                    lost_frames = 0
-                    last_pixel_distance = None
-            
-            if detections:
-                last_detection = detections[0]
-                lost_frames = 0  # Reset counter when object detected
-                
-                # CRITICAL: Stop search immediately when object found
-                if robot.search_in_progress:
-                    print(f"\n🎯 Object found during search: {detections[0]['class']}!")
-                    print("   Stopping search immediately...")
-                    robot.stop_search = True
-                    robot.search_in_progress = False
-                    robot.is_moving = False
-                    time.sleep(0.5)  # Brief pause for search thread to stop
+                # Display stage runs on the main thread (cv2 window handling)
+                display.run_once(timeout=0.05)
+            
+            # Drain socket commands every tick ('stop' is executed right here)
+            for command in cmd_listener.drain():
+                if not control_command(command):
+                    dispatcher.submit(command)
+            if headless:
+                continue
+            detections = last_packet['detections'] if last_packet else []
             
             # Handle keyboard input
             key = cv2.waitKey(1) & 0xFF
@@ -1290,84 +2640,51 @@ def main():
             if key == ord('q'):
                 print("\n👋 Exiting...")
                 break
-            elif key == ord('h'):
-                print("\n🏠 Going home...")
-                robot.go_home()
-            elif key == ord('g'):
-                gripper_open = not gripper_open
-                robot.gripper_control(gripper_open)
-                print(f"\n🤏 Gripper: {'OPEN' if gripper_open else 'CLOSED'}")
-            elif key == ord('s'):
-                print("\n🔍 Manual search triggered...")
-                robot.table_search()
             elif key == ord('a'):
-                auto_pick = not auto_pick
-                auto_place = auto_pick  # Toggle both together
-                print(f"\n⚡ AUTO mode: {'ON' if auto_pick else 'OFF'}")
-            elif key == ord('x'):
-                vision.invert_x = not vision.invert_x
-                print(f"\n🔄 X-axis inversion: {'ON' if vision.invert_x else 'OFF'}")
-                print("   If robot moves opposite in X direction, this toggles it")
-            elif key == ord('y'):
-                vision.invert_y = not vision.invert_y
-                print(f"\n🔄 Y-axis inversion: {'ON' if vision.invert_y else 'OFF'}")
-                print("   If robot moves opposite in Y direction, this toggles it")
-            elif key == ord('t'):
-                print("\n🧪 Testing robot movement...")
-                # Get current position
-                current = robot.get_robot_pose()
-                if current:
-                    print(f"   Current position: X={current[0]:.4f}m, Y={current[1]:.4f}m, Z={current[2]:.4f}m")
-                    
-                    # Try a small test move (1cm in X direction)
-                    test_x = current[0] + 0.01  # +10mm
-                    test_y = current[1]
-                    test_z = current[2]
-                    
-                    print(f"   Testing move to: X={test_x:.4f}m, Y={test_y:.4f}m, Z={test_z:.4f}m")
-                    success = robot.move_to_pose(test_x, test_y, test_z, wait=True)
-                    
-                    if success:
-                        print("   ✅ Test move completed")
-                    else:
-                        print("   ❌ Test move failed")
-                else:
-                    print("   ❌ Cannot get current position")
-            elif key == ord('p') and detections:
-                # Manual pick AND place sequence
-                detection = detections[0]
-                cx, cy = detection['center_px']
-                target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm)
-                
-                # Pick
-                success = robot.pick_sequence(target_x, target_y, detection['class'])
-                if success:
-                    # Place
-                    place_pos = PLACE_POSITIONS.get(detection['class'], (0, 400))
-                    robot.place_sequence(place_pos[0], place_pos[1], detection['class'])
-            elif key == ord(' ') and detections:
-                # Manual pick only (no place)
-                detection = detections[0]
-                cx, cy = detection['center_px']
-                target_x, target_y = vision.pixel_to_robot_coords(cx, cy, robot_xy_mm)
-                robot.pick_sequence(target_x, target_y, detection['class'])
+                set_auto(not controller.auto_pick)
+            elif key in (ord('x'), ord('y')):
+                flip_axis(chr(key))
+            elif key in (ord('h'), ord('g'), ord('s'), ord('t'), ord('c')):
+                # Robot actions run on the control stage so the video keeps going
+                controller.request(chr(key), last_packet)
+            elif key in (ord('p'), ord(' ')) and detections:
+                controller.request(chr(key), last_packet)
     
     except KeyboardInterrupt:
         print("\n\n⚠️ Interrupted by user")
     
     finally:
+        pipeline.stop()
+        cmd_listener.stop()
+        if preview:
+            preview.stop()
+        
         # Cleanup
+        runtime = int(time.monotonic() - session_started)
         print("\n" + "="*70)
         print("  SESSION STATISTICS")
         print("="*70)
-        print(f"📊 Objects processed: {objects_processed}")
-        print(f"⏱️  Total runtime: {frame_count // 30 // 60}m {(frame_count // 30) % 60}s")
+        print(f"📊 Objects processed: {controller.objects_processed}")
+        print(f"🧠 Objects remembered: {len(controller.world)} active, "
+              f"{len(controller.world.objects('stale'))} stale")
+        print(f"⏱️  Total runtime: {runtime // 60}m {runtime % 60}s")
+        print("📈 Pipeline throughput:")
+        print(pipeline.report())
+        if scheduling_enabled:
+            print("🎚️ Frame scheduler:")
+            print(scheduler.report())
+        if preview:
+            print("📺 Preview:")
+            print(preview.report())
+        print("🧠 BCI commands:")
+        print(dispatcher.report())
         print("="*70)
         
         print("\n🧹 Cleaning up...")
         vision.release_camera()
         robot.disconnect()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
         print("✅ Shutdown complete")
 
 
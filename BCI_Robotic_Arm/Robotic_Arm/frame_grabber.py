@@ -0,0 +1,160 @@
+"""
+LATEST-FRAME CAMERA GRABBER
+===========================
+Capture thread that continuously drains a cv2.VideoCapture into a
+preallocated triple buffer, so consumers always get the freshest frame
+instead of whatever is queued in the driver.
+
+Triple buffering:
+- the capture thread writes into its own "write" slot
+- a finished frame is published by swapping it with the "ready" slot
+- latest_frame() swaps "ready" with the consumer's "read" slot
+so the writer never blocks on the reader and never overwrites the frame
+the reader is holding.
+"""
+
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class FrameGrabber:
+    """Background capture thread with a triple-buffered latest frame"""
+
+    def __init__(self, cap, width: int, height: int, channels: int = 3,
+                 exposure_latency: float = 0.0):
+        self.cap = cap
+        self.exposure_latency = exposure_latency  # Exposure -> grab() returning (s)
+
+        # Preallocated slots: [write, ready, read]
+        self._buffers = [np.zeros((height, width, channels), dtype=np.uint8) for _ in range(3)]
+        self._write_idx, self._ready_idx, self._read_idx = 0, 1, 2
+        self._ready_meta = (0.0, -1)  # (timestamp, sequence) of the ready slot
+        self._read_meta = (0.0, -1)
+        self._fresh = False
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self.running = False
+        self._thread = None
+
+        # Statistics
+        self.sequence = 0
+        self.failed_reads = 0
+        self.fps = 0.0
+
+    def start(self):
+        """Start the capture thread (no-op if already running)"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the capture thread"""
+        self.running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def _run(self):
+        fps_window_start = time.monotonic()
+        fps_frames = 0
+
+        while self.running:
+            # grab() returns once the frame is available - stamp it right away
+            # (back-dated to the exposure), then decode into the write slot
+            if not self.cap.grab():
+                self.failed_reads += 1
+                time.sleep(0.005)
+                continue
+            captured_at = time.monotonic() - self.exposure_latency
+
+            slot = self._buffers[self._write_idx]
+            ret, image = self.cap.retrieve(slot)
+            if not ret or image is None:
+                self.failed_reads += 1
+                continue
+            if image is not slot:
+                # Resolution differs from the preallocated slot - adopt the new array
+                self._buffers[self._write_idx] = image
+
+            with self._new_frame:
+                self.sequence += 1
+                self._write_idx, self._ready_idx = self._ready_idx, self._write_idx
+                self._ready_meta = (captured_at, self.sequence)
+                self._fresh = True
+                self._new_frame.notify_all()
+
+            fps_frames += 1
+            elapsed = captured_at - fps_window_start
+            if elapsed >= 1.0:
+                self.fps = fps_frames / elapsed
+                fps_window_start = captured_at
+                fps_frames = 0
+
+    def latest_frame(self, wait_new: bool = False, timeout: float = 1.0,
+                     copy: bool = True) -> Tuple[Optional[np.ndarray], float, int]:
+        """
+        Return the freshest captured frame
+        Args:
+            wait_new: Block until a frame newer than the last returned one arrives
+            timeout: Maximum wait in seconds when wait_new=True
+            copy: Return a private copy. With copy=False the array is only valid
+                  until the next latest_frame() call (single consumer).
+        Returns:
+            (frame, capture_timestamp, sequence) - frame is None if nothing
+            has been captured yet (or the wait timed out)
+        """
+        with self._new_frame:
+            if wait_new and not self._fresh:
+                deadline = time.monotonic() + timeout
+                while not self._fresh and self.running:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._new_frame.wait(remaining)
+                if not self._fresh:
+                    return None, 0.0, -1
+
+            if self._fresh:
+                self._read_idx, self._ready_idx = self._ready_idx, self._read_idx
+                self._read_meta = self._ready_meta
+                self._fresh = False
+
+            timestamp, sequence = self._read_meta
+            if sequence < 0:
+                return None, 0.0, -1
+            frame = self._buffers[self._read_idx]
+            if copy:
+                frame = frame.copy()
+
+        return frame, timestamp, sequence
+
+    def frame_after(self, timestamp: float, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float, int]:
+        """
+        Return a copy of the first available frame captured after `timestamp`
+        Safe to use alongside latest_frame() consumers (does not consume frames)
+        Returns:
+            (frame, capture_timestamp, sequence) - frame is None on timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._new_frame:
+            while self.running:
+                # Newest frame is in "ready" if unconsumed, otherwise in "read"
+                if self._fresh:
+                    index, (frame_time, sequence) = self._ready_idx, self._ready_meta
+                else:
+                    index, (frame_time, sequence) = self._read_idx, self._read_meta
+                if sequence >= 0 and frame_time > timestamp:
+                    return self._buffers[index].copy(), frame_time, sequence
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._new_frame.wait(remaining)
+        return None, 0.0, -1
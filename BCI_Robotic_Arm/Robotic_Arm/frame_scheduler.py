@@ -0,0 +1,180 @@
+"""
+ADAPTIVE FRAME SCHEDULING
+=========================
+Decides per camera frame whether the detector runs, and with which model
+and input size, so the control loop meets a target period for what the
+arm is doing right now:
+
+    command     0.0 s   (queued key / BCI command: handle it on the next frame)
+    centering   0.05 s  (servo needs fresh detections)
+    search      0.1 s   (a scan stops on the first detection)
+    idle        0.25 s
+    transport   0.5 s   (control stage is busy in a pick/place sequence)
+
+Two knobs:
+- rate: a frame goes to the detector only once the mode's period has
+  elapsed since the last run; the other frames only update the display
+- level: a ladder of detector settings from most accurate to cheapest,
+  e.g. yolov8m@640, yolov8m@480, yolov8m@320, yolov8n@640, ...
+  Detection time is measured online per level (EMA). The scheduler picks
+  the most accurate level expected to fit headroom * period. Levels not
+  measured yet are estimated from a measured level of the same model
+  (cost ~ imgsz^2) or assumed as expensive as the current one.
+  Switching down happens at once; switching up needs dwell seconds on
+  the current level and a margin, so it does not flap at the boundary.
+"""
+
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_PERIODS = {
+    'command': 0.0,
+    'centering': 0.05,
+    'search': 0.1,
+    'idle': 0.25,
+    'transport': 0.5,
+}
+
+
+class AdaptiveFrameScheduler:
+    """Inference rate and detector level from measured detection time and a per-mode period"""
+
+    def __init__(self, levels: List[dict], periods: Optional[Dict[str, float]] = None,
+                 headroom: float = 0.8, up_margin: float = 0.75, dwell: float = 1.0,
+                 alpha: float = 0.2, available: Optional[Callable[[dict], bool]] = None):
+        """
+        Args:
+            levels: Detector settings, most accurate first: dicts with 'model' and 'imgsz'
+            periods: Target control-loop period (s) per mode
+            headroom: Fraction of the period the detection may take
+            up_margin: Switch to a more accurate level only below up_margin * budget
+            dwell: Minimum seconds on a level before switching up
+            alpha: EMA weight of a new measurement
+            available: available(level) -> False while a level's model is not loaded
+        """
+        self.levels = levels
+        self.periods = dict(DEFAULT_PERIODS, **(periods or {}))
+        self.headroom = headroom
+        self.up_margin = up_margin
+        self.dwell = dwell
+        self.alpha = alpha
+        self.available = available or (lambda level: True)
+
+        self.mode = 'idle'
+        self.level = 0
+        self._level_since = time.monotonic()
+        self._last_run = 0.0
+        self._ema = [None] * len(levels)
+
+        # Statistics
+        self.frames_run = 0
+        self.frames_skipped = 0
+        self.switches = 0
+        self.loop_period = None  # EMA of the time between detector runs
+        self.frame_latency = None  # EMA of capture -> detections ready
+
+    @property
+    def current(self) -> dict:
+        return self.levels[self.level]
+
+    @property
+    def period(self) -> float:
+        return self.periods.get(self.mode, self.periods['idle'])
+
+    def set_mode(self, mode: str) -> Optional[dict]:
+        """Set the arm's activity; returns the new level if the budget change switches it"""
+        if mode == self.mode:
+            return None
+        self.mode = mode
+        return self._choose(time.monotonic())
+
+    def should_run(self, now: Optional[float] = None) -> bool:
+        """True if this frame goes to the detector (the mode's period has elapsed)"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_run >= self.period:
+            if self._last_run:
+                self.loop_period = self._smooth(self.loop_period, now - self._last_run)
+            self._last_run = now
+            self.frames_run += 1
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def record(self, detect_s: Optional[float], frame_time: Optional[float] = None) -> Optional[dict]:
+        """
+        Feed one detector run
+        Args:
+            detect_s: Full-detection time of the current level (None = tracked frame)
+            frame_time: Capture time of the frame (for the latency statistic)
+        Returns:
+            The new level dict if the scheduler switched, else None
+        """
+        now = time.monotonic()
+        if frame_time is not None:
+            self.frame_latency = self._smooth(self.frame_latency, now - frame_time)
+        if detect_s is None:
+            return None
+        self._ema[self.level] = self._smooth(self._ema[self.level], detect_s)
+        return self._choose(now)
+
+    def _smooth(self, value: Optional[float], sample: float) -> float:
+        return sample if value is None else value + self.alpha * (sample - value)
+
+    def estimate(self, index: int) -> Optional[float]:
+        """Expected detection time of a level (measured, or scaled from a measured one)"""
+        if self._ema[index] is not None:
+            return self._ema[index]
+        level = self.levels[index]
+        for other, measured in zip(self.levels, self._ema):
+            if measured is not None and other['model'] == level['model']:
+                return measured * (level['imgsz'] / other['imgsz']) ** 2
+        return self._ema[self.level]
+
+    def _choose(self, now: float) -> Optional[dict]:
+        current = self._ema[self.level]
+        if current is None:
+            return None
+        budget = self.period * self.headroom
+        if self.period <= 0:
+            return None  # 'command' frames are one-offs, keep the level
+
+        best = len(self.levels) - 1
+        for index in range(len(self.levels)):
+            if not self.available(self.levels[index]):
+                continue
+            estimate = self.estimate(index)
+            limit = budget * (self.up_margin if index < self.level else 1.0)
+            if estimate is not None and estimate <= limit:
+                best = index
+                break
+        while best > 0 and not self.available(self.levels[best]):
+            best -= 1
+
+        if best == self.level:
+            return None
+        if best < self.level and now - self._level_since < self.dwell:
+            return None
+        previous = self.levels[self.level]
+        self.level = best
+        self._level_since = now
+        self.switches += 1
+        print(f"🎚️ Detector {self._label(previous)} -> {self._label(self.current)} "
+              f"({self.mode}: {current * 1000:.0f}ms vs budget {budget * 1000:.0f}ms)")
+        return self.current
+
+    @staticmethod
+    def _label(level: dict) -> str:
+        return f"{level.get('name', level['model'])}@{level['imgsz']}"
+
+    def report(self) -> str:
+        """Rate, latency and the measured time of every level"""
+        total = self.frames_run + self.frames_skipped
+        lines = [f"   frames to detector: {self.frames_run}/{total}  switches={self.switches}  "
+                 f"level={self._label(self.current)}"]
+        if self.loop_period:
+            lines.append(f"   loop period: {self.loop_period * 1000:.0f}ms  "
+                         f"frame latency: {(self.frame_latency or 0) * 1000:.0f}ms")
+        for level, measured in zip(self.levels, self._ema):
+            if measured is not None:
+                lines.append(f"   {self._label(level):<20} {measured * 1000:6.1f}ms")
+        return "\n".join(lines)
@@ -0,0 +1,144 @@
+"""
+GRIPPER FEEDBACK
+================
+Completion and grip status for the DH-AG95 instead of fixed sleeps.
+
+The gripper reports one of four grip states (DH grip-state register,
+or its two status outputs in IO mode):
+    0 moving, 1 reached position (no object), 2 object caught, 3 object dropped
+
+Feedback sources (config.GRIPPER_FEEDBACK):
+- 'controller': poll a status method of GripperController
+  (get_grip_state / get_gripper_state / grip_state / get_status)
+- 'tool_io':    read the gripper's status outputs wired to tool digital
+  inputs 0/1 from the realtime state stream
+  (00 moving, 10 reached, 01 caught, 11 dropped)
+- 'auto':       'controller' if GripperController has a status method
+- 'none':       no feedback - callers fall back to fixed waits
+"""
+
+import time
+from typing import Optional
+
+GRIP_MOVING = 0
+GRIP_REACHED = 1
+GRIP_CAUGHT = 2
+GRIP_DROPPED = 3
+GRIP_STATUS_NAMES = {
+    GRIP_MOVING: 'moving',
+    GRIP_REACHED: 'reached position (no object)',
+    GRIP_CAUGHT: 'object gripped',
+    GRIP_DROPPED: 'object dropped',
+}
+
+TOOL_INPUT_0 = 16  # Bit of tool digital input 0 in the digital input bits
+TOOL_INPUT_1 = 17
+
+_STATUS_METHODS = ('get_grip_state', 'get_gripper_state', 'grip_state', 'get_status')
+_TOOL_IO_STATES = {
+    (0, 0): GRIP_MOVING,
+    (1, 0): GRIP_REACHED,
+    (0, 1): GRIP_CAUGHT,
+    (1, 1): GRIP_DROPPED,
+}
+
+
+def decode_tool_inputs(bits: int) -> int:
+    """Grip state from the realtime digital input bits (IO mode)"""
+    return _TOOL_IO_STATES[((bits >> TOOL_INPUT_0) & 1, (bits >> TOOL_INPUT_1) & 1)]
+
+
+def encode_tool_inputs(status: int) -> int:
+    """Digital input bits for a grip state (inverse of decode_tool_inputs)"""
+    for (in0, in1), value in _TOOL_IO_STATES.items():
+        if value == status:
+            return (in0 << TOOL_INPUT_0) | (in1 << TOOL_INPUT_1)
+    return 0
+
+
+class GripperFeedback:
+    """Waits for gripper motion to finish and reports the grip state"""
+
+    def __init__(self, gripper, state_reader, source: str = 'auto',
+                 poll_interval: float = 0.02, start_grace: float = 0.3):
+        self.gripper = gripper
+        self.state_reader = state_reader
+        self.poll_interval = poll_interval
+        self.start_grace = start_grace  # Time for a command to show up as 'moving'
+        self._status_method = None
+
+        for name in _STATUS_METHODS:
+            method = getattr(gripper, name, None)
+            if callable(method):
+                self._status_method = method
+                break
+
+        if source == 'auto':
+            source = 'controller' if self._status_method else 'none'
+        if source == 'controller' and not self._status_method:
+            print("⚠️ GripperController has no status method - gripper feedback disabled")
+            source = 'none'
+        self.source = None if source == 'none' else source
+
+    def status(self) -> Optional[int]:
+        """Current grip state (None if unavailable)"""
+        if self.source == 'tool_io':
+            state = self.state_reader.latest()
+            return decode_tool_inputs(state['digital_inputs']) if state else None
+        if self.source == 'controller':
+            try:
+                value = self._status_method()
+            except Exception as e:
+                print(f"⚠️ Gripper status read failed: {e}")
+                return None
+            if isinstance(value, dict):
+                value = value.get('grip_state', value.get('state'))
+            return int(value) if value is not None else None
+        return None
+
+    def wait(self, commanded_at: float, timeout: float, cancel_event=None) -> Optional[int]:
+        """
+        Block until the gripper finished the motion commanded at `commanded_at`
+        Args:
+            commanded_at: time.monotonic() when the command was sent
+            timeout: Maximum wait in seconds
+            cancel_event: Stop waiting once set
+        Returns:
+            Final grip state, or None on timeout / cancel / no feedback
+        """
+        if self.source is None:
+            return None
+        tracker = {'moving': False, 'status': None}
+
+        def _settled(status: Optional[int], now: float) -> bool:
+            if status is None:
+                return False
+            if status == GRIP_MOVING:
+                tracker['moving'] = True
+                return False
+            # A status left over from the previous motion only counts after the grace period
+            if tracker['moving'] or now - commanded_at > self.start_grace:
+                tracker['status'] = status
+                return True
+            return False
+
+        if self.source == 'tool_io':
+            def _check(state):
+                if cancel_event is not None and cancel_event.is_set():
+                    return True
+                if state['timestamp'] < commanded_at:
+                    return False
+                return _settled(decode_tool_inputs(state['digital_inputs']), state['timestamp'])
+
+            remaining = commanded_at + timeout - time.monotonic()
+            self.state_reader.wait_for(_check, max(remaining, 0.0))
+            return tracker['status']
+
+        deadline = commanded_at + timeout
+        while time.monotonic() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if _settled(self.status(), time.monotonic()):
+                return tracker['status']
+            time.sleep(self.poll_interval)
+        return None
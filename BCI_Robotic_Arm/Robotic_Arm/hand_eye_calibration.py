@@ -0,0 +1,139 @@
+"""
+AUTOMATIC HAND-EYE CALIBRATION
+==============================
+Replaces flipping axes by hand ('x' / 'y' keys) with a measured camera model.
+
+Procedure (object must be visible in the camera, roughly under the gripper):
+1. Move the arm through a small pattern of known offsets around the start
+   pose: XY steps, two heights and small rotations about the tool axis
+2. At each pose, detect the object on frames captured after the arm settled
+3. Fit the camera pose on the TCP (and focal length) by least squares
+4. Report the residual error and save the calibration file that
+   VisionSystem loads at startup
+"""
+
+import time
+from typing import Optional
+
+import numpy as np
+
+from camera_calibration import (CameraCalibration, fit_calibration,
+                                matrix_to_rotvec, rotvec_to_matrix)
+
+
+def calibration_poses(center_pose: list, xy_step: float = 0.02,
+                      height_step: float = 0.05, yaw: float = 0.25) -> list:
+    """
+    Build the calibration pattern around a start pose
+    Args:
+        center_pose: TCP pose [X, Y, Z, RX, RY, RZ] with the object in view
+        xy_step: XY offset of the outer points (m)
+        height_step: Second height above the start pose (m)
+        yaw: Rotation about the tool axis (rad) - makes the camera offset observable
+    Returns:
+        List of TCP poses
+    """
+    x, y, z = center_pose[:3]
+    r_base_tcp = rotvec_to_matrix(center_pose[3:6])
+    poses = []
+    for dz in (0.0, height_step):
+        for dx, dy in ((0, 0), (xy_step, 0), (-xy_step, 0), (0, xy_step), (0, -xy_step)):
+            for angle in (0.0, yaw, -yaw):
+                if angle and (dx or dy):
+                    continue  # Rotations only at the center points
+                r_z = rotvec_to_matrix([0.0, 0.0, angle])
+                orientation = matrix_to_rotvec(r_base_tcp @ r_z)
+                poses.append([x + dx, y + dy, z + dz, *orientation.tolist()])
+    return poses
+
+
+def _observe(vision, last_pixel: Optional[np.ndarray], frames: int,
+             settled_at: float) -> Optional[np.ndarray]:
+    """Median object pixel over `frames` frames captured after settled_at"""
+    observations = []
+    timestamp = settled_at
+    for _ in range(frames * 3):
+        frame, timestamp, _ = vision.frame_after(timestamp, timeout=1.0)
+        if frame is None:
+            break
+        detections = vision.detect_objects(frame)
+        if not detections:
+            continue
+        centers = np.array([d['center_px'] for d in detections], dtype=np.float64)
+        if last_pixel is None:
+            best = int(np.argmax([d['confidence'] for d in detections]))
+        else:
+            best = int(np.argmin(np.linalg.norm(centers - last_pixel, axis=1)))
+        observations.append(centers[best])
+        if len(observations) >= frames:
+            break
+    if len(observations) < frames:
+        return None
+    return np.median(np.array(observations), axis=0)
+
+
+def run_hand_eye_calibration(robot, vision, save_path=None, frames: int = 3,
+                             velocity: float = 0.05) -> Optional[CameraCalibration]:
+    """
+    Run the calibration pattern, fit the camera model and save it
+    Args:
+        robot: Connected EnhancedRobotController
+        vision: VisionSystem with its camera running and targets set
+        save_path: Calibration file (None = vision.calibration_file)
+        frames: Detections averaged per pose
+        velocity: Travel speed during calibration (m/s)
+    Returns:
+        The fitted calibration (also installed on `vision`), or None on failure
+    """
+    save_path = save_path or vision.calibration_file
+    start_pose = robot.get_robot_pose()
+    if start_pose is None:
+        print("❌ Calibration aborted: no robot pose")
+        return None
+
+    poses = calibration_poses(start_pose)
+    print("\n" + "="*70)
+    print("  HAND-EYE CALIBRATION")
+    print("="*70)
+    print(f"📐 Visiting {len(poses)} poses around X={start_pose[0]:.3f}m, Y={start_pose[1]:.3f}m")
+
+    samples = []
+    last_pixel = None
+    old_velocity = robot.velocity
+    robot.velocity = velocity
+    try:
+        for idx, pose in enumerate(poses):
+            print(f"   Pose {idx+1}/{len(poses)}: X={pose[0]:.3f}m, Y={pose[1]:.3f}m, Z={pose[2]:.3f}m")
+            if not robot.move_to_pose(*pose, wait=True):
+                print("      ⚠️ Move failed - skipping pose")
+                continue
+            settled_at = time.monotonic()
+            actual_pose = robot.get_robot_pose()
+            pixel = _observe(vision, last_pixel, frames, settled_at)
+            if pixel is None or actual_pose is None:
+                print("      ⚠️ Object not detected - skipping pose")
+                continue
+            last_pixel = pixel
+            samples.append({'pixel': pixel.tolist(), 'pose': actual_pose})
+            print(f"      Object at pixel ({pixel[0]:.1f}, {pixel[1]:.1f})")
+    finally:
+        robot.velocity = old_velocity
+        robot.move_to_pose(*start_pose, wait=True)
+
+    image_size = (vision.frame_width, vision.frame_height)
+    camera_matrix = vision.calibration.camera_matrix if vision.calibration else None
+    calibration = fit_calibration(samples, image_size, camera_matrix=camera_matrix)
+    if calibration is None:
+        print(f"❌ Calibration failed: only {len(samples)} usable samples (need 5+)")
+        return None
+
+    print(f"\n✅ Calibration fitted from {calibration.samples} samples")
+    print(f"   Residual: RMS {calibration.residual_rms_mm:.2f}mm, "
+          f"max {calibration.residual_max_mm:.2f}mm ({calibration.residual_rms_px:.2f}px RMS)")
+    print(f"   Camera offset on TCP: {[f'{v*1000:.1f}' for v in calibration.tcp_to_camera_translation]} mm")
+    print(f"   Object located at: ({calibration.object_xy_mm[0]:.1f}, {calibration.object_xy_mm[1]:.1f})mm")
+
+    calibration.save(save_path)
+    vision.calibration = calibration
+    print(f"💾 Saved to {save_path}")
+    return calibration
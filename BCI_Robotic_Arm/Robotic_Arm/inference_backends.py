@@ -0,0 +1,360 @@
+"""
+INFERENCE BACKENDS
+==================
+Runs the YOLO detector through PyTorch (ultralytics) or through an
+exported model on a CPU-optimized runtime:
+
+- 'ultralytics': the .pt model as before
+- 'onnxruntime': ONNX export, FP32 or INT8 (static QDQ quantization)
+- 'openvino':    OpenVINO IR export, FP32 or INT8 (NNCF post-training
+                 quantization)
+
+Every backend returns the raw boxes of one frame as numpy arrays
+(xyxy in frame pixels, confidence, class ID), so VisionSystem builds the
+same detection dicts whichever backend runs. Exported backends do the
+ultralytics pre/post-processing themselves: letterbox to the model's
+input shape, best class per anchor, confidence threshold, class filter,
+per-class NMS (IoU 0.7, max 300 boxes) and boxes scaled back to the frame.
+
+Exported models are created next to the .pt file on first use:
+    yolov8m.onnx, yolov8m_int8.onnx
+    yolov8m_openvino_model/, yolov8m_int8_openvino_model/
+The input shape is fixed to the letterboxed camera frame (1280x720 ->
+384x640), the same shape ultralytics picks for .pt inference, so FP32
+exports match PyTorch up to float rounding. INT8 needs a calibration
+set: a directory of typical camera frames (a few hundred is plenty).
+"""
+
+import abc
+import ast
+import importlib
+import shutil
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+BACKENDS = ('ultralytics', 'onnxruntime', 'openvino')
+PRECISIONS = ('fp32', 'int8')
+
+IOU_THRESHOLD = 0.7  # ultralytics predict() default
+MAX_DETECTIONS = 300
+MAX_WH = 7680  # Class offset for batched per-class NMS
+STRIDE = 32
+PAD_VALUE = 114
+
+
+def letterbox_shape(width: int, height: int, imgsz: int = 640) -> Tuple[int, int]:
+    """Smallest stride-aligned (h, w) input that fits a width x height frame scaled to imgsz"""
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    return (int(np.ceil(new_h / STRIDE) * STRIDE), int(np.ceil(new_w / STRIDE) * STRIDE))
+
+
+def letterbox(frame: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Resize keeping the aspect ratio and pad to shape (h, w), like ultralytics LetterBox
+    Returns:
+        NCHW float32 RGB blob in [0, 1]
+    """
+    height, width = frame.shape[:2]
+    ratio = min(shape[0] / height, shape[1] / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dw, dh = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+    top, bottom = round(dh - 0.1), round(dh + 0.1)
+    left, right = round(dw - 0.1), round(dw + 0.1)
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+    return cv2.dnn.blobFromImage(frame, 1 / 255.0, swapRB=True)
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output: np.ndarray, input_shape: Tuple[int, int], frame_shape: Tuple[int, int],
+                conf: float, classes: Optional[Sequence[int]] = None):
+    """
+    Decode a YOLOv8 output (4 + num_classes, anchors) into frame-pixel boxes
+    Returns:
+        (xyxy (N, 4) float32, confidences (N,), class IDs (N,))
+    """
+    predictions = output.T
+    scores = predictions[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences > conf
+    if classes is not None:
+        keep &= np.isin(class_ids, classes)
+    boxes_xywh, confidences, class_ids = predictions[keep, :4], confidences[keep], class_ids[keep]
+    empty = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32))
+    if not len(confidences):
+        return empty
+
+    xyxy = np.empty_like(boxes_xywh)
+    xyxy[:, :2] = boxes_xywh[:, :2] - boxes_xywh[:, 2:] / 2
+    xyxy[:, 2:] = boxes_xywh[:, :2] + boxes_xywh[:, 2:] / 2
+    keep = _nms(xyxy + class_ids[:, None] * MAX_WH, confidences, IOU_THRESHOLD)[:MAX_DETECTIONS]
+    xyxy, confidences, class_ids = xyxy[keep], confidences[keep], class_ids[keep]
+
+    # Undo the letterbox (same rounding as ultralytics scale_boxes)
+    height, width = frame_shape[:2]
+    gain = min(input_shape[0] / height, input_shape[1] / width)
+    pad_x = round((input_shape[1] - width * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - height * gain) / 2 - 0.1)
+    xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - pad_x) / gain, 0, width)
+    xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - pad_y) / gain, 0, height)
+    return xyxy.astype(np.float32), confidences.astype(np.float32), class_ids.astype(np.float32)
+
+
+class UltralyticsBackend:
+    """The .pt model through PyTorch"""
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path: str):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.description = f"ultralytics {Path(model_path).name} (PyTorch)"
+
+    def predict(self, frame: np.ndarray, conf: float, imgsz: int = 640,
+                classes: Optional[Sequence[int]] = None):
+        """Boxes of one frame: (xyxy, confidences, class IDs) as numpy arrays"""
+        results = self.model.predict(frame, conf=conf, verbose=False, imgsz=imgsz, classes=classes)
+        boxes = results[0].boxes
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()
+
+
+class _ExportedBackend(abc.ABC):
+    """Shared letterbox/decode around a runtime's infer()"""
+
+    name = None
+
+    def __init__(self, model_path: Path, input_shape: Tuple[int, int], names: dict,
+                 precision: str):
+        self.model_path = Path(model_path)
+        self.input_shape = input_shape
+        self.names = names
+        self.precision = precision
+        self.description = (f"{self.name} {self.model_path.name} ({precision.upper()}, "
+                            f"{input_shape[1]}x{input_shape[0]})")
+
+    @abc.abstractmethod
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        """Raw model output for one letterboxed NCHW blob"""
+
+    def predict(self, frame: np.ndarray, conf: float, imgsz: int = 640,
+                classes: Optional[Sequence[int]] = None):
+        """Boxes of one frame (imgsz is fixed by the export and ignored)"""
+        output = self._infer(letterbox(frame, self.input_shape))
+        return postprocess(output[0], self.input_shape, frame.shape, conf, classes)
+
+
+class OnnxRuntimeBackend(_ExportedBackend):
+    """ONNX export on the ONNX Runtime CPU execution provider"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path: Path, precision: str = 'fp32', threads: int = 0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options,
+                                            providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if 'names' not in metadata:
+            raise RuntimeError(f"{model_path} has no class names (export it with ultralytics)")
+        super().__init__(model_path, tuple(model_input.shape[2:]),
+                         ast.literal_eval(metadata['names']), precision)
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    """OpenVINO IR on the CPU plugin, compiled for latency"""
+
+    name = 'openvino'
+
+    def __init__(self, model_path: Path, precision: str = 'fp32', threads: int = 0):
+        import openvino as ov
+        import yaml
+        core = ov.Core()
+        model = core.read_model(str(model_path))
+        properties = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            properties['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = core.compile_model(model, 'CPU', properties)
+        self.request = self.compiled.create_infer_request()
+        metadata_file = Path(model_path).parent / 'metadata.yaml'
+        if not metadata_file.exists():
+            raise RuntimeError(f"{metadata_file} missing (export it with ultralytics)")
+        names = yaml.safe_load(metadata_file.read_text())['names']
+        input_shape = tuple(int(d) for d in model.inputs[0].get_shape()[2:])
+        super().__init__(model_path, input_shape, names, precision)
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+# ----------------------------------------------------------------------
+# Export / quantization
+# ----------------------------------------------------------------------
+def exported_model_path(model_path: str, backend: str, precision: str) -> Path:
+    """Where the export of model_path for backend/precision lives"""
+    base = Path(model_path).with_suffix('')
+    suffix = '_int8' if precision == 'int8' else ''
+    if backend == 'onnxruntime':
+        return base.parent / f"{base.name}{suffix}.onnx"
+    if backend == 'openvino':
+        return base.parent / f"{base.name}{suffix}_openvino_model" / f"{base.name}.xml"
+    return Path(model_path)
+
+
+def load_calibration_images(directory, input_shape: Tuple[int, int], limit: int = 300) -> list:
+    """Letterboxed blobs of the images in a calibration directory"""
+    directory = Path(directory) if directory else None
+    if directory is None or not directory.is_dir():
+        raise RuntimeError(f"INT8 needs calibration images (directory {directory} not found)")
+    files = sorted(p for p in directory.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+    blobs = []
+    for path in files[:limit]:
+        image = cv2.imread(str(path))
+        if image is not None:
+            blobs.append(letterbox(image, input_shape))
+    if not blobs:
+        raise RuntimeError(f"No readable images in {directory}")
+    return blobs
+
+
+def _export_ultralytics(model_path: str, fmt: str, input_shape: Tuple[int, int]) -> Path:
+    from ultralytics import YOLO
+    return Path(YOLO(model_path).export(format=fmt, imgsz=list(input_shape), half=False,
+                                        dynamic=False, simplify=True))
+
+
+def _quantize_onnx(fp32_path: Path, int8_path: Path, blobs: list):
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._input = onnx.load(str(fp32_path), load_external_data=False).graph.input[0].name
+            self._blobs = iter(blobs)
+
+        def get_next(self):
+            blob = next(self._blobs, None)
+            return None if blob is None else {self._input: blob}
+
+    quantize_static(str(fp32_path), str(int8_path), _Reader(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8)
+    # Keep the class names (and other export metadata) of the FP32 model
+    source, quantized = onnx.load(str(fp32_path)), onnx.load(str(int8_path))
+    if not quantized.metadata_props:
+        quantized.metadata_props.extend(source.metadata_props)
+        onnx.save(quantized, str(int8_path))
+
+
+def _quantize_openvino(fp32_xml: Path, int8_xml: Path, blobs: list):
+    import nncf
+    import openvino as ov
+    model = ov.Core().read_model(str(fp32_xml))
+    # Keep the box decoding (Multiply/Subtract) and class scores (Sigmoid) in FP32
+    quantized = nncf.quantize(model, nncf.Dataset(blobs), preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(blobs),
+                              ignored_scope=nncf.IgnoredScope(types=['Multiply', 'Subtract',
+                                                                     'Sigmoid']))
+    int8_xml.parent.mkdir(parents=True, exist_ok=True)
+    ov.save_model(quantized, str(int8_xml))
+    shutil.copy(fp32_xml.parent / 'metadata.yaml', int8_xml.parent / 'metadata.yaml')
+
+
+def export_model(model_path: str, backend: str, precision: str = 'fp32',
+                 input_shape: Tuple[int, int] = (384, 640), calibration_images=None) -> Path:
+    """
+    Export (and for INT8 quantize) a .pt model for an exported backend
+    Args:
+        model_path: ultralytics .pt model
+        backend: 'onnxruntime' or 'openvino'
+        precision: 'fp32' or 'int8'
+        input_shape: Fixed model input (h, w)
+        calibration_images: Directory of camera frames (INT8 only)
+    Returns:
+        Path of the exported model
+    """
+    target = exported_model_path(model_path, backend, precision)
+    fp32 = exported_model_path(model_path, backend, 'fp32')
+    if not fp32.exists():
+        print(f"🔧 Exporting {Path(model_path).name} to {backend} ({input_shape[1]}x{input_shape[0]})...")
+        exported = _export_ultralytics(model_path, 'onnx' if backend == 'onnxruntime' else 'openvino',
+                                       input_shape)
+        if backend == 'onnxruntime' and exported != fp32:
+            shutil.move(str(exported), str(fp32))
+    if precision == 'fp32':
+        return fp32
+
+    blobs = load_calibration_images(calibration_images, input_shape)
+    print(f"🔧 Quantizing to INT8 with {len(blobs)} calibration images...")
+    if backend == 'onnxruntime':
+        _quantize_onnx(fp32, target, blobs)
+    else:
+        _quantize_openvino(fp32, target, blobs)
+    print(f"✅ INT8 model saved: {target}")
+    return target
+
+
+def create_backend(model_path: str, backend: str = 'ultralytics', precision: str = 'fp32',
+                   input_shape: Tuple[int, int] = (384, 640), calibration_images=None,
+                   threads: int = 0):
+    """
+    Load the detector on a backend, exporting the model first if needed
+    Args:
+        model_path: ultralytics .pt model (or an already exported .onnx / .xml)
+        backend: One of BACKENDS
+        precision: One of PRECISIONS (ignored for 'ultralytics')
+        input_shape: Input (h, w) for new exports
+        calibration_images: Calibration frame directory for INT8 exports
+        threads: CPU threads for inference (0 = runtime default)
+    Returns:
+        Backend with .names, .description and .predict()
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}' (choose from {', '.join(PRECISIONS)})")
+    if backend == 'ultralytics':
+        return UltralyticsBackend(model_path)
+
+    # Fail before a (slow) export if the runtime is not installed
+    importlib.import_module(backend)
+    path = Path(model_path)
+    if path.suffix == '.pt':
+        path = exported_model_path(model_path, backend, precision)
+        if not path.exists():
+            path = export_model(model_path, backend, precision, input_shape, calibration_images)
+    backend_class = OnnxRuntimeBackend if backend == 'onnxruntime' else OpenVinoBackend
+    return backend_class(path, precision, threads)
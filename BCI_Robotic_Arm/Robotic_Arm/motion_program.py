@@ -0,0 +1,103 @@
+"""
+BLENDED MOTION PROGRAMS
+=======================
+Builds one URScript program for a whole pick or place path instead of
+sending one movel per step and waiting (with fixed pauses) in between.
+
+- every segment has its own speed and acceleration
+- waypoints the arm only passes through get a blend radius, so it does
+  not stop there; the radius is clamped to 40% of the adjacent segments
+- a waypoint followed by an inline action (gripper script, sleep) or the
+  last waypoint always has radius 0 - the arm must be at rest there
+- waypoint_targets() feeds RobotStateReader.wait_for_program(), which
+  follows the program's progress on the realtime state stream
+"""
+
+import math
+from typing import List, Optional
+
+from robot_state import estimate_move_duration
+
+MAX_BLEND_FRACTION = 0.4
+
+
+def _distance(a, b) -> float:
+    return math.sqrt(sum((a[i] - b[i]) ** 2 for i in range(3)))
+
+
+class MotionProgram:
+    """Sequence of movel segments and inline script actions"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._statements = []  # ('move', waypoint index) or ('script', text)
+        self.waypoints = []
+        self.action_time = 0.0  # Expected duration of inline actions (s)
+
+    def movel(self, pose: list, acceleration: float, velocity: float,
+              blend_radius: float = 0.0, label: str = ''):
+        """Linear move to pose [X, Y, Z, RX, RY, RZ] (m, rad)"""
+        self.waypoints.append({
+            'pose': list(pose),
+            'acceleration': acceleration,
+            'velocity': velocity,
+            'radius': blend_radius,
+            'label': label or f"waypoint {len(self.waypoints) + 1}",
+        })
+        self._statements.append(('move', len(self.waypoints) - 1))
+
+    def script(self, text: str, duration: float = 0.0):
+        """Inline URScript (e.g. a gripper call); `duration` is used for timeouts"""
+        self._statements.append(('script', text))
+        self.action_time += duration
+
+    def sleep(self, seconds: float):
+        self.script(f"sleep({seconds:.3f})", seconds)
+
+    def blend_radii(self, start_position: Optional[list]) -> List[float]:
+        """Effective blend radius per waypoint"""
+        radii = []
+        for idx, waypoint in enumerate(self.waypoints):
+            statement = self._statements.index(('move', idx))
+            followed_by_move = (statement + 1 < len(self._statements)
+                                and self._statements[statement + 1][0] == 'move')
+            if not followed_by_move or waypoint['radius'] <= 0:
+                radii.append(0.0)
+                continue
+            previous = self.waypoints[idx - 1]['pose'] if idx > 0 else start_position
+            incoming = _distance(previous, waypoint['pose']) if previous else math.inf
+            outgoing = _distance(waypoint['pose'], self.waypoints[idx + 1]['pose'])
+            radii.append(min(waypoint['radius'], MAX_BLEND_FRACTION * min(incoming, outgoing)))
+        return radii
+
+    def render(self, start_position: Optional[list] = None) -> str:
+        """URScript program text (def <name>(): ... end)"""
+        radii = self.blend_radii(start_position)
+        lines = [f"def {self.name}():"]
+        for kind, value in self._statements:
+            if kind == 'move':
+                wp = self.waypoints[value]
+                pose = ", ".join(f"{v:.5f}" for v in wp['pose'])
+                lines.append(f"  movel(p[{pose}], a={wp['acceleration']}, "
+                             f"v={wp['velocity']}, r={radii[value]:.4f})")
+            else:
+                lines.append(f"  {value}")
+        lines.append("end")
+        return "\n".join(lines) + "\n"
+
+    def waypoint_targets(self, start_position: Optional[list] = None) -> list:
+        """[(position [X, Y, Z], blend radius, label), ...] for wait_for_program()"""
+        radii = self.blend_radii(start_position)
+        return [(wp['pose'][:3], radius, wp['label'])
+                for wp, radius in zip(self.waypoints, radii)]
+
+    def estimated_duration(self, start_position: Optional[list] = None) -> float:
+        """Rest-to-rest duration of every segment plus inline actions (upper bound)"""
+        total = self.action_time
+        previous = start_position
+        for wp in self.waypoints:
+            if previous is not None:
+                total += estimate_move_duration(_distance(previous, wp['pose']),
+                                                wp['velocity'], wp['acceleration'])
+            previous = wp['pose']
+        return total
@@ -0,0 +1,229 @@
+"""
+DETECT-THEN-TRACK
+=================
+Cheap frame-to-frame tracking between full YOLO detections.
+
+- update(): called with fresh detections; matches them to existing tracks
+  by IoU so track IDs stay stable, and seeds feature points in each box
+- track(): called on in-between frames; moves every box by the median
+  pyramidal Lucas-Kanade optical flow of its feature points (one batched
+  calcOpticalFlowPyrLK call for all tracks, forward-backward checked)
+- needs_detection(): True when tracks are missing or their quality dropped
+
+LK only holds over small inter-frame motion: when frames were skipped
+(frame scheduler) and the gap since the tracked frame exceeds
+max_frame_gap camera frames, track() drops the tracks instead of
+flowing across the gap.
+
+Tracked objects are returned in the same dict format as
+VisionSystem.detect_objects(), plus 'track_id' and 'tracked'.
+"""
+
+import cv2
+import numpy as np
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two (N, 4) / (M, 4) xyxy box arrays"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = boxes_a[:, None, :].astype(np.float64)
+    b = boxes_b[None, :, :].astype(np.float64)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+class ObjectTracker:
+    """Optical-flow tracker that keeps detections alive between YOLO runs"""
+
+    def __init__(self, match_iou: float = 0.3, max_points: int = 40,
+                 confidence_decay: float = 0.97, max_frame_gap: int = 3):
+        self.match_iou = match_iou
+        self.max_points = max_points
+        self.confidence_decay = confidence_decay  # Per tracked frame
+        self.max_frame_gap = max_frame_gap  # Camera frames LK may span
+        self.min_points = 5
+        self.fb_threshold = 1.5  # Max forward-backward error (px)
+
+        self.tracks = []
+        self.lost_track = False  # A track was dropped since the last detection
+        self._next_id = 1
+        self._prev_gray = None
+        self._prev_seq = None
+        self._lk_params = dict(winSize=(21, 21), maxLevel=3,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def reset(self):
+        self.tracks = []
+        self.lost_track = False
+        self._prev_gray = None
+        self._prev_seq = None
+
+    def quality(self) -> float:
+        """Lowest track quality (fraction of seeded feature points still tracked)"""
+        if not self.tracks:
+            return 0.0
+        return min(t['quality'] for t in self.tracks)
+
+    def needs_detection(self, min_quality: float) -> bool:
+        return not self.tracks or self.lost_track or self.quality() < min_quality
+
+    def update(self, gray: np.ndarray, detections: list, frame_seq: int = None) -> list:
+        """
+        Replace tracks with fresh detections, keeping IDs of matched objects
+        Args:
+            gray: Grayscale frame the detections came from
+            detections: Output of VisionSystem.detect_objects()
+            frame_seq: Camera frame sequence number (None = consecutive frames)
+        Returns:
+            The detections with 'track_id' and 'tracked'=False added
+        """
+        old_boxes = np.array([t['bbox'] for t in self.tracks]).reshape(-1, 4)
+        new_boxes = np.array([d['bbox'] for d in detections]).reshape(-1, 4)
+        ious = iou_matrix(old_boxes, new_boxes)
+
+        # Greedy matching on IoU, same class only
+        assigned = {}
+        used_tracks = set()
+        if ious.size:
+            for flat in np.argsort(-ious, axis=None):
+                ti, di = np.unravel_index(flat, ious.shape)
+                if ious[ti, di] < self.match_iou:
+                    break
+                if ti in used_tracks or di in assigned:
+                    continue
+                if self.tracks[ti]['class'] != detections[di]['class']:
+                    continue
+                used_tracks.add(ti)
+                assigned[di] = self.tracks[ti]['track_id']
+
+        tracks = []
+        for di, det in enumerate(detections):
+            points = self._seed_points(gray, det['bbox'])
+            track_id = assigned.get(di)
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+            det['track_id'] = track_id
+            det['tracked'] = False
+            tracks.append({
+                'track_id': track_id,
+                'class': det['class'],
+                'confidence': det['confidence'],
+                'bbox': np.array(det['bbox'], dtype=np.float32),
+                'points': points,
+                'seeded': max(len(points), 1),
+                'quality': 1.0 if len(points) else 0.0,
+            })
+
+        # Oldest track first, so detections[0] stays on the same object
+        tracks.sort(key=lambda t: t['track_id'])
+        detections.sort(key=lambda d: d['track_id'])
+        self.tracks = tracks
+        self.lost_track = False
+        self._prev_gray = gray
+        self._prev_seq = frame_seq
+        return detections
+
+    def track(self, gray: np.ndarray, frame_seq: int = None) -> list:
+        """
+        Propagate all tracks into a new frame with optical flow
+        Args:
+            gray: Grayscale frame
+            frame_seq: Camera frame sequence number (None = consecutive frames)
+        Returns:
+            Tracked objects in detect_objects() format (empty if tracking failed)
+        """
+        if self._prev_gray is None or not self.tracks:
+            return []
+        if (frame_seq is not None and self._prev_seq is not None
+                and frame_seq - self._prev_seq > self.max_frame_gap):
+            # Too much motion since the tracked frame for LK - re-detect
+            self.tracks = []
+            self.lost_track = True
+            return []
+
+        counts = [len(t['points']) for t in self.tracks]
+        if sum(counts) == 0:
+            self.lost_track = True
+            return []
+
+        # One batched LK call for every track's points, checked forward-backward
+        prev_pts = np.concatenate([t['points'] for t in self.tracks if len(t['points'])])
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev_pts, None,
+                                                       **self._lk_params)
+        back_pts, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, next_pts, None,
+                                                            **self._lk_params)
+        fb_error = np.linalg.norm((prev_pts - back_pts).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.fb_threshold)
+
+        height, width = gray.shape[:2]
+        offset = 0
+        surviving = []
+        for track, count in zip(self.tracks, counts):
+            if count == 0:
+                track['quality'] = 0.0
+                self.lost_track = True
+                continue
+            sl = slice(offset, offset + count)
+            offset += count
+            ok = good[sl]
+            track['quality'] = float(ok.sum()) / track['seeded']
+            if ok.sum() < self.min_points:
+                track['quality'] = 0.0
+                self.lost_track = True
+                continue
+
+            shift = np.median((next_pts[sl][ok] - prev_pts[sl][ok]).reshape(-1, 2), axis=0)
+            bbox = track['bbox'] + np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+            cx = (bbox[0] + bbox[2]) / 2
+            cy = (bbox[1] + bbox[3]) / 2
+            if not (0 <= cx < width and 0 <= cy < height):
+                track['quality'] = 0.0  # Left the image
+                self.lost_track = True
+                continue
+
+            track['bbox'] = bbox
+            track['points'] = next_pts[sl][ok].reshape(-1, 1, 2)
+            track['confidence'] *= self.confidence_decay
+            surviving.append(track)
+
+        self.tracks = surviving
+        self._prev_gray = gray
+        self._prev_seq = frame_seq
+        return [self._as_detection(t) for t in surviving]
+
+    def _seed_points(self, gray: np.ndarray, bbox) -> np.ndarray:
+        x1, y1, x2, y2 = [int(v) for v in bbox]
+        height, width = gray.shape[:2]
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, width), min(y2, height)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return np.empty((0, 1, 2), dtype=np.float32)
+
+        # Search the box ROI only (a view, no full-frame mask) and shift back
+        points = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=self.max_points,
+                                         qualityLevel=0.01, minDistance=5)
+        if points is None:
+            return np.empty((0, 1, 2), dtype=np.float32)
+        return points.astype(np.float32) + np.array([x1, y1], dtype=np.float32)
+
+    @staticmethod
+    def _as_detection(track: dict) -> dict:
+        x1, y1, x2, y2 = [int(round(v)) for v in track['bbox']]
+        width = x2 - x1
+        height = y2 - y1
+        return {
+            'class': track['class'],
+            'confidence': float(track['confidence']),
+            'bbox': (x1, y1, x2, y2),
+            'center_px': ((x1 + x2) // 2, (y1 + y2) // 2),
+            'size': (width, height),
+            'area': width * height,
+            'track_id': track['track_id'],
+            'tracked': True,
+        }
@@ -0,0 +1,529 @@
+"""
+PICK-CYCLE BENCHMARK
+====================
+Times the robot entry points against the local UR simulator and saves
+the results as JSON so runs can be compared over time.
+
+Measured:
+- detector: detect_objects() FPS / latency on a recorded video or
+  synthetic frames
+- pick_sequence, place_sequence, table_search: total time and time per
+  step (every motion program, move, gripper command and pause, in order)
+- full cycles: detect -> center -> pick -> place through
+  AutoPickController, with the centering effort of the chosen centering
+  mode: blocking moves ('step') or speedl updates and the time to
+  converge ('servo')
+
+The cycle uses a synthetic scene: one object on the table, projected
+into the image with the same camera model VisionSystem uses (calibration
+file or fixed mm/px), so centering converges like on the real setup.
+The measured detector latency is added to every control frame.
+
+Usage:
+    python pick_benchmark.py --cycles 5 --video recording.mp4
+    python pick_benchmark.py --cycles 5 --centering-mode step
+    python pick_benchmark.py --compare benchmark_results/<previous>.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from complete_pick_and_place_system import (EnhancedRobotController, VisionSystem,
+                                            AutoPickController)
+from inference_backends import BACKENDS, PRECISIONS
+from ur_simulator import URSimulator
+
+RESULTS_DIR = Path(__file__).parent / "benchmark_results"
+
+
+class StepRecorder:
+    """Wraps a robot controller's moves, gripper commands and pauses with timers"""
+
+    def __init__(self, robot: EnhancedRobotController):
+        self.robot = robot
+        self.phase = 'idle'
+        self.records = []
+        self._lock = threading.Lock()
+
+        self._wrap('move_to_pose', self._move_label)
+        self._wrap('gripper_control', self._gripper_label)
+        self._wrap('_pause', lambda args, kwargs: f"sleep {args[0]:.1f}s")
+        self._wrap('run_program', lambda args, kwargs: f"program {args[0].name}")
+        for name in ('pick_sequence', 'place_sequence'):
+            self._wrap_phase(name)
+
+    def _move_label(self, args, kwargs) -> str:
+        z = args[2] if len(args) > 2 else kwargs.get('z')
+        robot = self.robot
+        for label, height in (('safe', robot.z_safe), ('approach', robot.z_approach),
+                              ('pick', robot.z_pick), ('place', robot.z_pick + 0.010)):
+            if abs(z - height) < 1e-4:
+                return f"move to {label} height"
+        return f"move z={z:.3f}m"
+
+    @staticmethod
+    def _gripper_label(args, kwargs) -> str:
+        open_gripper = args[0] if args else kwargs.get('open_gripper')
+        return f"gripper {'open' if open_gripper else 'close'}"
+
+    def _wrap(self, name: str, label):
+        original = getattr(self.robot, name)
+
+        def timed(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(label(args, kwargs), time.monotonic() - started, name)
+        setattr(self.robot, name, timed)
+
+    def _wrap_phase(self, name: str):
+        original = getattr(self.robot, name)
+
+        def phased(*args, **kwargs):
+            previous = self.phase
+            self.phase = name
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.phase = previous
+        setattr(self.robot, name, phased)
+
+    def wrap_servo(self, servo):
+        """Time VisualServo.update() calls and the time from start to convergence"""
+        original = servo.update
+
+        def timed(*args, **kwargs):
+            started = time.monotonic()
+            converged = original(*args, **kwargs)
+            self.record('servo update', time.monotonic() - started, 'servo_update')
+            if converged:
+                self.record('servo converged', time.monotonic() - servo.started_at,
+                            'servo_converged')
+            return converged
+        servo.update = timed
+
+    def record(self, step: str, duration: float, kind: str):
+        with self._lock:
+            self.records.append({'phase': self.phase, 'step': step, 'kind': kind,
+                                 'duration': duration, 'at': time.monotonic()})
+
+    def since(self, started: float, phase: Optional[str] = None) -> list:
+        with self._lock:
+            return [r for r in self.records
+                    if r['at'] >= started and (phase is None or r['phase'] == phase)]
+
+
+class SyntheticScene:
+    """One object on the table, projected with VisionSystem's camera model"""
+
+    def __init__(self, vision: VisionSystem, class_name: str, size_px=(120, 90), seed: int = 0):
+        self.vision = vision
+        self.class_name = class_name
+        self.size_px = size_px
+        self.object_mm = None
+        self._random = np.random.default_rng(seed)
+
+    def spawn_near(self, tcp_pose: list, max_offset_px: float = 250):
+        """Place the object at a random visible spot around the current view"""
+        vision = self.vision
+        center = np.array([vision.center_x, vision.center_y], dtype=np.float64)
+        pixel = center + self._random.uniform(-max_offset_px, max_offset_px, size=2)
+        robot_mm = (tcp_pose[0] * 1000, tcp_pose[1] * 1000)
+        self.object_mm = vision.pixels_to_robot_coords([pixel], robot_mm, tcp_pose)[0]
+
+    def project(self, tcp_pose: list) -> Optional[np.ndarray]:
+        """Object center in pixels for a TCP pose (None if no object)"""
+        if self.object_mm is None:
+            return None
+        robot_mm = (tcp_pose[0] * 1000, tcp_pose[1] * 1000)
+        return self.vision.robot_coords_to_pixels([self.object_mm], robot_mm, tcp_pose)[0]
+
+    def detections(self, tcp_pose: list) -> list:
+        """Ground-truth detections in detect_objects() format"""
+        pixel = self.project(tcp_pose)
+        if pixel is None:
+            return []
+        cx, cy = int(round(pixel[0])), int(round(pixel[1]))
+        w, h = self.size_px
+        if not (0 <= cx < self.vision.frame_width and 0 <= cy < self.vision.frame_height):
+            return []
+        return [{
+            'class': self.class_name,
+            'confidence': 0.9,
+            'bbox': (cx - w // 2, cy - h // 2, cx + w // 2, cy + h // 2),
+            'center_px': (cx, cy),
+            'size': (w, h),
+            'area': w * h,
+        }]
+
+    def render(self, index: int) -> np.ndarray:
+        """Synthetic frame (textured background, moving box) for detector timing"""
+        vision = self.vision
+        frame = self._random.integers(90, 140, (vision.frame_height, vision.frame_width, 3),
+                                      dtype=np.uint8)
+        w, h = self.size_px
+        cx = int(vision.center_x + 200 * np.sin(index / 15))
+        cy = int(vision.center_y + 120 * np.cos(index / 20))
+        cv2.rectangle(frame, (cx - w // 2, cy - h // 2), (cx + w // 2, cy + h // 2), (40, 40, 200), -1)
+        return frame
+
+
+def _stats(values) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {}
+    return {'mean': float(values.mean()), 'min': float(values.min()),
+            'max': float(values.max()), 'p95': float(np.percentile(values, 95)), 'n': int(len(values))}
+
+
+def benchmark_detector(vision: VisionSystem, scene: SyntheticScene, video: Optional[str],
+                       frames: int, warmup: int = 5) -> dict:
+    """detect_objects() latency over a recorded video or synthetic frames"""
+    source = 'synthetic'
+    images = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(images) < frames + warmup:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            images.append(frame)
+        cap.release()
+        source = video
+        if not images:
+            print(f"⚠️ Could not read {video} - using synthetic frames")
+            source = 'synthetic'
+    if not images:
+        images = [scene.render(i) for i in range(frames + warmup)]
+
+    print(f"\n🔎 Detector: {len(images) - warmup} frames from {source}")
+    for image in images[:warmup]:
+        vision.detect_objects(image)
+
+    latencies = []
+    detections = []
+    for image in images[warmup:]:
+        started = time.perf_counter()
+        found = vision.detect_objects(image)
+        latencies.append(time.perf_counter() - started)
+        detections.append(len(found))
+
+    mean = float(np.mean(latencies)) if latencies else 0.0
+    result = {
+        'source': source,
+        'backend': vision.model.description,
+        'frames': len(latencies),
+        'fps': 1.0 / mean if mean else 0.0,
+        'latency_s': _stats(latencies),
+        'detections_per_frame': float(np.mean(detections)) if detections else 0.0,
+    }
+    print(f"   {result['fps']:.1f} FPS, mean {mean*1000:.1f}ms")
+    return result
+
+
+def _summarize_steps(runs: list) -> list:
+    """Per-step mean/min/max over runs with the same step order"""
+    longest = max(runs, key=len) if runs else []
+    steps = []
+    for index, record in enumerate(longest):
+        durations = [run[index]['duration'] for run in runs
+                     if len(run) > index and run[index]['step'] == record['step']]
+        steps.append({'step': record['step'], 'kind': record['kind'], **_stats(durations)})
+    return steps
+
+
+def benchmark_sequence(robot, recorder: StepRecorder, name: str, runs: int,
+                       target_mm: tuple, place_mm: tuple) -> dict:
+    """Time pick_sequence / place_sequence in isolation"""
+    totals, step_runs, successes = [], [], 0
+    for run in range(runs):
+        print(f"\n⏱️ {name} run {run + 1}/{runs}")
+        started = time.monotonic()
+        if name == 'pick_sequence':
+            ok = robot.pick_sequence(*target_mm, "benchmark")
+        else:
+            ok = robot.place_sequence(*place_mm, "benchmark")
+        totals.append(time.monotonic() - started)
+        successes += bool(ok)
+        step_runs.append(recorder.since(started, phase=name))
+
+    return _sequence_result(totals, step_runs, successes)
+
+
+def _sequence_result(totals: list, step_runs: list, successes: int) -> dict:
+    sleep_share = [sum(r['duration'] for r in run if r['kind'] == '_pause') for run in step_runs]
+    return {
+        'runs': len(totals),
+        'successes': successes,
+        'total_s': _stats(totals),
+        'sleep_s': _stats(sleep_share),
+        'steps': _summarize_steps(step_runs),
+    }
+
+
+def benchmark_table_search(robot, recorder: StepRecorder, runs: int) -> dict:
+    """Time a full table search with nothing to find"""
+    totals, step_runs = [], []
+    for run in range(runs):
+        print(f"\n⏱️ table_search run {run + 1}/{runs}")
+        recorder.phase = 'table_search'
+        started = time.monotonic()
+        robot.table_search()
+        while robot.search_in_progress:
+            time.sleep(0.01)
+        totals.append(time.monotonic() - started)
+        step_runs.append(recorder.since(started, phase='table_search'))
+        recorder.phase = 'idle'
+    return _sequence_result(totals, step_runs, len(totals))
+
+
+def benchmark_cycles(robot, vision, scene: SyntheticScene, recorder: StepRecorder,
+                     place_positions: dict, cycles: int, frame_time: float,
+                     centering_mode: Optional[str] = None, timeout: float = 120.0,
+                     search_stop_timeout: float = 10.0) -> dict:
+    """Full detect -> center -> pick -> place cycles through AutoPickController"""
+    controller = AutoPickController(robot, vision, place_positions)
+    controller.auto_pick = True
+    controller.auto_place = True
+    if centering_mode:
+        controller.centering_mode = centering_mode
+    recorder.wrap_servo(controller.servo)
+
+    results = []
+    for cycle in range(cycles):
+        print(f"\n⏱️ Cycle {cycle + 1}/{cycles}")
+        robot.go_home()
+        scene.spawn_near(robot.get_robot_pose())
+        processed = controller.objects_processed
+        started = time.monotonic()
+        frames = 0
+        while time.monotonic() - started < timeout:
+            frame_started = time.monotonic()
+            pose = robot.get_robot_pose()
+            recorder.phase = 'centering'
+            controller.process({
+                'frame': None,
+                'timestamp': frame_started,
+                'seq': frames,
+                'robot_xy_mm': (pose[0] * 1000, pose[1] * 1000),
+                'robot_pose': pose,
+                'detections': scene.detections(pose),
+            })
+            recorder.phase = 'idle'
+            frames += 1
+            if controller.objects_processed > processed:
+                break
+            time.sleep(max(0.0, frame_time - (time.monotonic() - frame_started)))
+        elapsed = time.monotonic() - started
+
+        # The controller starts a search for the next object - stop it before the
+        # next cycle's go_home, or the two race for the arm
+        search_stopped = robot.end_search()
+        if not search_stopped:
+            print("   ⚠️ Search did not stop - waiting for it, cycle counts as failed")
+            deadline = time.monotonic() + search_stop_timeout
+            while robot.search_in_progress and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if robot.search_in_progress:
+                raise RuntimeError("search thread still running - later cycles would race it")
+        scene.object_mm = None
+
+        records = recorder.since(started)
+        per_phase = defaultdict(float)
+        for record in records:
+            if record['kind'] == 'servo_converged':
+                continue  # Spans the servo updates already counted
+            if record['kind'] != '_pause' or record['phase'] == 'centering':
+                per_phase[record['phase']] += record['duration']
+        # Centering effort: blocking moves ('step') or speedl updates ('servo')
+        if controller.centering_mode == 'servo':
+            iterations = sum(1 for r in records if r['kind'] == 'servo_update')
+        else:
+            iterations = sum(1 for r in records if r['phase'] == 'centering'
+                             and r['kind'] == 'move_to_pose')
+        converged = [r['duration'] for r in records if r['kind'] == 'servo_converged']
+        results.append({
+            'success': controller.objects_processed > processed and search_stopped,
+            'cycle_s': elapsed,
+            'frames': frames,
+            'centering_mode': controller.centering_mode,
+            'centering_iterations': iterations,
+            'servo_converge_s': converged[-1] if converged else None,
+            'time_in_s': dict(per_phase),
+            'sleep_s': sum(r['duration'] for r in records if r['kind'] == '_pause'),
+        })
+        unit = 'servo updates' if controller.centering_mode == 'servo' else 'centering moves'
+        converge = f", converged in {converged[-1]:.2f}s" if converged else ""
+        print(f"   Cycle {'OK' if results[-1]['success'] else 'FAILED'} in {elapsed:.2f}s "
+              f"({iterations} {unit}{converge})")
+
+    return {
+        'cycles': results,
+        'centering_mode': controller.centering_mode,
+        'cycle_s': _stats([r['cycle_s'] for r in results if r['success']]),
+        'centering_iterations': _stats([r['centering_iterations'] for r in results]),
+        'servo_converge_s': _stats([r['servo_converge_s'] for r in results
+                                    if r['servo_converge_s'] is not None]),
+        'success_rate': sum(r['success'] for r in results) / max(len(results), 1),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=Path(__file__).parent, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_summary(results: dict):
+    print("\n" + "="*70)
+    print("  BENCHMARK RESULTS")
+    print("="*70)
+    detector = results.get('detector')
+    if detector:
+        print(f"🔎 Detector: {detector['fps']:.1f} FPS ({detector['source']}, {detector['backend']})")
+    for name in ('pick_sequence', 'place_sequence', 'table_search'):
+        section = results.get(name)
+        if not section or not section['total_s']:
+            continue
+        print(f"\n⏱️ {name}: {section['total_s']['mean']:.2f}s mean "
+              f"(sleeps {section['sleep_s'].get('mean', 0):.2f}s)")
+        for step in section['steps']:
+            print(f"   {step['step']:<28} {step.get('mean', 0):6.3f}s")
+    cycles = results.get('cycles')
+    if cycles and cycles['cycle_s']:
+        mode = cycles.get('centering_mode', 'step')
+        unit = 'servo updates' if mode == 'servo' else 'centering moves'
+        converge = cycles.get('servo_converge_s')
+        converge = f" (converged in {converge['mean']:.2f}s)" if converge else ""
+        print(f"\n🔁 Cycle: {cycles['cycle_s']['mean']:.2f}s mean, "
+              f"{cycles['centering_iterations']['mean']:.1f} {unit}{converge} [{mode}], "
+              f"success {cycles['success_rate']*100:.0f}%")
+    print("="*70)
+
+
+def compare(current: dict, previous_path: str):
+    """Print the change of the headline numbers against a previous run"""
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\n📊 Compared with {previous_path} ({previous.get('revision', '?')})")
+    rows = [('detector FPS', ('detector', 'fps'))]
+    for name in ('pick_sequence', 'place_sequence', 'table_search'):
+        rows.append((f"{name} s", (name, 'total_s', 'mean')))
+    rows.append(('cycle s', ('cycles', 'cycle_s', 'mean')))
+    for label, path in rows:
+        old, new = previous, current
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+            new = new.get(key, {}) if isinstance(new, dict) else {}
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+            print(f"   {label:<20} {old:8.2f} -> {new:8.2f}  ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick-cycle benchmark against the UR simulator")
+    parser.add_argument('--model', default='yolov8m.pt')
+    parser.add_argument('--backend', choices=BACKENDS, default=None,
+                        help="Detector backend (default: config.INFERENCE_BACKEND)")
+    parser.add_argument('--precision', choices=PRECISIONS, default=None)
+    parser.add_argument('--object', default='mouse', help="Class name of the synthetic object")
+    parser.add_argument('--video', default=None, help="Recorded video for the detector benchmark")
+    parser.add_argument('--detector-frames', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=3, help="Runs per sequence benchmark")
+    parser.add_argument('--search-runs', type=int, default=1)
+    parser.add_argument('--search-mode', choices=['coarse', 'scan', 'grid'], default=None,
+                        help="Table search mode (default: config.SEARCH_MODE)")
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--centering-mode', choices=['servo', 'step'], default=None,
+                        help="Centering mode for the cycles (default: config.CENTERING_MODE)")
+    parser.add_argument('--camera-fps', type=float, default=30.0)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.5)
+    parser.add_argument('--stop-probability', type=float, default=0.0)
+    parser.add_argument('--speed-scaling', type=float, default=1.0)
+    parser.add_argument('--gripper', action='store_true',
+                        help="Drive the real GripperController against the simulator")
+    parser.add_argument('--external-sim', action='store_true',
+                        help="Use a simulator already running on 127.0.0.1")
+    parser.add_argument('--output', default=None, help="Result file (default: benchmark_results/)")
+    parser.add_argument('--compare', default=None, help="Previous result file to compare with")
+    args = parser.parse_args()
+
+    sim = None
+    if not args.external_sim:
+        sim = URSimulator(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                          stop_probability=args.stop_probability,
+                          speed_scaling=args.speed_scaling, seed=0, verbose=False)
+        sim.start()
+
+    vision = VisionSystem(model_path=args.model, backend=args.backend, precision=args.precision)
+    vision.debug_mode = False
+    vision.set_targets([args.object])
+    robot = EnhancedRobotController('127.0.0.1', gripper_enabled=args.gripper)
+    if args.search_mode:
+        robot.search_mode = args.search_mode
+    if not robot.connect():
+        print("❌ Simulator not reachable")
+        return
+    recorder = StepRecorder(robot)
+    scene = SyntheticScene(vision, args.object)
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'config': vars(args),
+        'calibrated': bool(vision.calibration),
+    }
+    try:
+        results['detector'] = benchmark_detector(vision, scene, args.video, args.detector_frames)
+        detector_time = results['detector']['latency_s'].get('mean', 0.0)
+
+        home = robot.home_pose
+        target_mm = (home[0] * 1000, home[1] * 1000)
+        place_mm = (home[0] * 1000 + 100, home[1] * 1000)
+        robot.go_home()
+        results['pick_sequence'] = benchmark_sequence(robot, recorder, 'pick_sequence',
+                                                      args.runs, target_mm, place_mm)
+        results['place_sequence'] = benchmark_sequence(robot, recorder, 'place_sequence',
+                                                       args.runs, target_mm, place_mm)
+        if args.search_runs:
+            results['table_search'] = benchmark_table_search(robot, recorder, args.search_runs)
+        if args.cycles:
+            # Bins next to home so cycles stay in the simulated workspace
+            place_positions = {args.object: place_mm}
+            frame_time = max(1.0 / args.camera_fps, detector_time)
+            results['cycles'] = benchmark_cycles(robot, vision, scene, recorder, place_positions,
+                                                 args.cycles, frame_time, args.centering_mode)
+    finally:
+        robot.disconnect()
+        if sim:
+            results['simulator'] = {'moves': sim.moves_executed,
+                                    'protective_stops': sim.protective_stops}
+            sim.stop()
+
+    print_summary(results)
+    if args.compare:
+        compare(results, args.compare)
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"pick_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=float))
+    print(f"💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+PICK ORDER PLANNING
+===================
+Visiting order for sorting runs. Every object is carried to its own bin,
+so a run is  start -> pick 1 -> bin 1 -> pick 2 -> bin 2 -> ...
+The pick->bin legs are the same in any order; the order decides the
+transits from one bin to the next pick.
+
+- up to EXACT_LIMIT objects: exact shortest order (Held-Karp DP over
+  subsets of objects)
+- more objects: nearest-neighbour order improved with or-opt moves
+  (move one object to another place in the order while it gets shorter)
+
+PickScheduler keeps the current plan and re-plans whenever the set of
+known objects changes (new object seen, object picked or gone stale).
+Objects are dicts with 'id', 'pick_mm' (x, y) and 'bin_mm' (x, y).
+"""
+
+import math
+from typing import List, Optional, Sequence
+
+EXACT_LIMIT = 9
+
+
+def _distance(a, b) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def route_length(start_mm, objects: Sequence[dict]) -> float:
+    """Travel in mm for visiting `objects` in the given order (pick -> bin each)"""
+    total = 0.0
+    position = start_mm
+    for obj in objects:
+        total += _distance(position, obj['pick_mm']) + _distance(obj['pick_mm'], obj['bin_mm'])
+        position = obj['bin_mm']
+    return total
+
+
+def _exact_order(start_mm, objects: Sequence[dict]) -> List[int]:
+    n = len(objects)
+    carry = [_distance(o['pick_mm'], o['bin_mm']) for o in objects]
+    transit = [[_distance(a['bin_mm'], b['pick_mm']) for b in objects] for a in objects]
+
+    # cost[mask][last]: shortest route over `mask` ending at the bin of `last`
+    cost = [[math.inf] * n for _ in range(1 << n)]
+    parent = [[-1] * n for _ in range(1 << n)]
+    for i, obj in enumerate(objects):
+        cost[1 << i][i] = _distance(start_mm, obj['pick_mm']) + carry[i]
+    for mask in range(1, 1 << n):
+        for last in range(n):
+            current = cost[mask][last]
+            if current == math.inf:
+                continue
+            for nxt in range(n):
+                if mask & (1 << nxt):
+                    continue
+                candidate = current + transit[last][nxt] + carry[nxt]
+                if candidate < cost[mask | (1 << nxt)][nxt]:
+                    cost[mask | (1 << nxt)][nxt] = candidate
+                    parent[mask | (1 << nxt)][nxt] = last
+
+    full = (1 << n) - 1
+    last = min(range(n), key=lambda i: cost[full][i])
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return order[::-1]
+
+
+def _heuristic_order(start_mm, objects: Sequence[dict]) -> List[int]:
+    # Nearest neighbour from the current position (a bin after each object)
+    remaining = set(range(len(objects)))
+    order = []
+    position = start_mm
+    while remaining:
+        nxt = min(remaining, key=lambda i: _distance(position, objects[i]['pick_mm']))
+        remaining.remove(nxt)
+        order.append(nxt)
+        position = objects[nxt]['bin_mm']
+
+    # Or-opt: relocate single objects while the route gets shorter
+    def length(candidate):
+        return route_length(start_mm, [objects[i] for i in candidate])
+
+    best = length(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order)):
+            for j in range(len(order)):
+                if i == j:
+                    continue
+                candidate = order[:i] + order[i + 1:]
+                candidate.insert(j, order[i])
+                candidate_length = length(candidate)
+                if candidate_length < best - 1e-6:
+                    order, best = candidate, candidate_length
+                    improved = True
+    return order
+
+
+def plan_order(start_mm, objects: Sequence[dict]) -> List[dict]:
+    """
+    Order objects for the shortest pick -> bin -> next pick route
+    Args:
+        start_mm: Current gripper position (x, y) in mm
+        objects: Dicts with 'pick_mm' and 'bin_mm'
+    Returns:
+        The objects in visiting order
+    """
+    if len(objects) <= 1:
+        return list(objects)
+    if len(objects) <= EXACT_LIMIT:
+        order = _exact_order(start_mm, objects)
+    else:
+        order = _heuristic_order(start_mm, objects)
+    return [objects[i] for i in order]
+
+
+class PickScheduler:
+    """Current pick plan; re-planned when the known objects change"""
+
+    def __init__(self):
+        self.plan = []
+        self._known = frozenset()
+        self.replans = 0
+
+    def update(self, start_mm, objects: Sequence[dict]) -> List[dict]:
+        """
+        Plan for the given objects (re-plans only if the set of ids changed)
+        Returns:
+            Objects in visiting order
+        """
+        known = frozenset(obj['id'] for obj in objects)
+        if known != self._known:
+            self._known = known
+            self.plan = plan_order(start_mm, objects)
+            self.replans += 1
+            if len(self.plan) > 1:
+                naive = route_length(start_mm, objects)
+                planned = route_length(start_mm, self.plan)
+                stops = [f"{obj.get('class', '?')} #{obj['id']}" for obj in self.plan]
+                print(f"🗺️ Pick plan: {' → '.join(stops)}")
+                print(f"   {planned / 1000:.2f} m travel (detection order: {naive / 1000:.2f} m)")
+        else:
+            # Same objects - refresh positions, keep the order
+            by_id = {obj['id']: obj for obj in objects}
+            self.plan = [by_id[obj['id']] for obj in self.plan]
+        return self.plan
+
+    def next(self, start_mm, objects: Sequence[dict]) -> Optional[dict]:
+        """First object of the (re-)planned order, or None"""
+        plan = self.update(start_mm, objects)
+        return plan[0] if plan else None
@@ -0,0 +1,198 @@
+"""
+STAGED PROCESSING PIPELINE
+==========================
+Capture -> inference -> control / display stages, each on its own thread,
+joined by bounded drop-oldest queues.
+
+A slow stage never stalls the stages before it: when its input queue is
+full the oldest item is discarded, so it always picks up the newest data
+once it is ready again (e.g. the next target is already localized when a
+pick sequence finishes).
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+
+class DropOldestQueue:
+    """Bounded thread-safe queue that discards the oldest item when full"""
+
+    def __init__(self, maxsize: int = 1):
+        self._items = deque()
+        self.maxsize = maxsize
+        self._not_empty = threading.Condition(threading.Lock())
+        self.dropped = 0
+
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full (never blocks)"""
+        with self._not_empty:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def get(self, timeout: float = None):
+        """Remove and return the oldest item (None on timeout)"""
+        with self._not_empty:
+            if not self._items:
+                self._not_empty.wait(timeout)
+                if not self._items:
+                    return None
+            return self._items.popleft()
+
+    def get_nowait(self):
+        """Return the oldest item or None without blocking"""
+        with self._not_empty:
+            return self._items.popleft() if self._items else None
+
+    def clear(self):
+        with self._not_empty:
+            self._items.clear()
+
+    def __len__(self):
+        with self._not_empty:
+            return len(self._items)
+
+
+class StageStats:
+    """Per-stage throughput counters"""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.rate = 0.0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def record(self, duration: float):
+        with self._lock:
+            self.processed += 1
+            self.busy_time += duration
+            self._window_count += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                self.rate = self._window_count / elapsed
+                self._window_start = now
+                self._window_count = 0
+
+    def mean_ms(self) -> float:
+        with self._lock:
+            return (self.busy_time / self.processed * 1000) if self.processed else 0.0
+
+
+class PipelineStage:
+    """
+    One pipeline stage running on its own thread
+    Args:
+        name: Stage name used in reports
+        work: Called with each input item (or with None for source stages);
+              its return value is pushed to every output queue unless it is None
+        input_queue: Queue to read from (None = source stage, work() is called in a loop)
+        outputs: Queues receiving the stage's results
+        foreground: Stage is driven by the caller via run_once() instead of
+                    its own thread (e.g. cv2 windows on the main thread)
+    """
+
+    def __init__(self, name: str, work: Callable, input_queue: Optional[DropOldestQueue] = None,
+                 outputs: List[DropOldestQueue] = None, foreground: bool = False):
+        self.name = name
+        self.work = work
+        self.input_queue = input_queue
+        self.outputs = outputs or []
+        self.foreground = foreground
+        self.stats = StageStats()
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        while self.running:
+            self.run_once(timeout=0.1)
+
+    def run_once(self, timeout: float = 0.1) -> bool:
+        """
+        Process a single item on the calling thread
+        Used directly for stages that must stay on the main thread (cv2.imshow)
+        Returns:
+            True if an item was processed
+        """
+        item = None
+        if self.input_queue is not None:
+            item = self.input_queue.get(timeout=timeout)
+            if item is None:
+                return False
+
+        started = time.monotonic()
+        try:
+            result = self.work(item)
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"⚠️ Pipeline stage '{self.name}' error: {e}")
+            time.sleep(0.05)
+            return False
+        if result is None and self.input_queue is None:
+            return False  # Source had nothing to produce
+        self.stats.record(time.monotonic() - started)
+
+        if result is not None:
+            for queue in self.outputs:
+                queue.put(result)
+        return True
+
+
+class Pipeline:
+    """A set of stages started and stopped together"""
+
+    def __init__(self):
+        self.stages: List[PipelineStage] = []
+        self.queues = {}
+
+    def add_queue(self, name: str, maxsize: int = 1) -> DropOldestQueue:
+        queue = DropOldestQueue(maxsize)
+        self.queues[name] = queue
+        return queue
+
+    def add_stage(self, stage: PipelineStage) -> PipelineStage:
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            if not stage.foreground:
+                stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.running = False
+        for stage in self.stages:
+            stage.stop()
+
+    def report(self) -> str:
+        """One line per stage and queue with throughput counters"""
+        lines = []
+        for stage in self.stages:
+            s = stage.stats
+            lines.append(f"   {stage.name:<10} {s.rate:6.1f}/s  processed={s.processed:<7} "
+                         f"mean={s.mean_ms():6.1f}ms  errors={s.errors}")
+        for name, queue in self.queues.items():
+            lines.append(f"   queue {name:<10} dropped={queue.dropped}")
+        return "\n".join(lines)
@@ -0,0 +1,216 @@
+"""
+MJPEG PREVIEW SERVER
+====================
+Annotated camera frames over HTTP for headless operation (replaces the
+cv2.imshow window):
+
+    http://<host>:<port>/              page with the stream
+    http://<host>:<port>/stream        multipart/x-mixed-replace MJPEG
+    http://<host>:<port>/snapshot.jpg  one frame
+
+The pipeline only hands over its newest packet (submit() stores a
+reference, nothing else). A separate encoder thread draws the overlay,
+downscales and JPEG-encodes at most max_fps frames per second - and only
+while at least one viewer is connected, so an unwatched preview costs
+nothing.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import cv2
+import numpy as np
+
+BOUNDARY = b'frame'
+
+INDEX_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Pick &amp; Place</title></head>
+<body style="margin:0;background:#111">
+<img src="/stream" style="width:100%;height:auto">
+</body></html>
+"""
+
+
+class PreviewServer:
+    """Rate-capped MJPEG stream of annotated frames, encoded only while watched"""
+
+    def __init__(self, render: Callable[[dict], np.ndarray], host: str = '127.0.0.1',
+                 port: int = 8080, max_fps: float = 10.0, quality: int = 70,
+                 scale: float = 0.5):
+        """
+        Args:
+            render: render(packet) -> annotated BGR frame (runs on the encoder thread)
+            host: Bind address (127.0.0.1 = this machine only)
+            port: HTTP port
+            max_fps: Encoding rate cap
+            quality: JPEG quality (0-100)
+            scale: Downscale factor applied before encoding
+        """
+        self.render = render
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.quality = quality
+        self.scale = scale
+
+        self.viewers = 0
+        self.frames_encoded = 0
+        self.running = False
+        self._packet = None
+        self._packet_seq = 0
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._new_packet = threading.Condition()
+        self._new_jpeg = threading.Condition()
+        self._server = None
+        self._threads = []
+
+    def start(self) -> bool:
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        except OSError as e:
+            print(f"⚠️ Preview server could not bind {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self.running = True
+        self._threads = [threading.Thread(target=self._server.serve_forever, daemon=True),
+                         threading.Thread(target=self._encode_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        print(f"📺 Preview: http://{self.host}:{self.port}/")
+        return True
+
+    def stop(self):
+        self.running = False
+        with self._new_packet:
+            self._new_packet.notify_all()
+        with self._new_jpeg:
+            self._new_jpeg.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def submit(self, packet: dict):
+        """Offer the newest packet (called by the pipeline - never blocks, never copies)"""
+        if not self.viewers:
+            return
+        with self._new_packet:
+            self._packet = packet
+            self._packet_seq += 1
+            self._new_packet.notify()
+
+    # ------------------------------------------------------------------
+    # Encoder thread
+    # ------------------------------------------------------------------
+    def _encode_loop(self):
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        encoded_seq = 0
+        last_encode = 0.0
+        while self.running:
+            with self._new_packet:
+                while self.running and (not self.viewers or self._packet_seq == encoded_seq):
+                    self._new_packet.wait(0.5)
+                packet, encoded_seq = self._packet, self._packet_seq
+            if not self.running or packet is None:
+                continue
+
+            wait = last_encode + interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)  # Rate cap; a newer packet may arrive meanwhile
+                with self._new_packet:
+                    packet, encoded_seq = self._packet, self._packet_seq
+            last_encode = time.monotonic()
+
+            try:
+                frame = self.render(packet)
+                if self.scale != 1.0:
+                    frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                                       interpolation=cv2.INTER_AREA)
+                ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            except Exception as e:
+                print(f"⚠️ Preview encoding failed: {e}")
+                continue
+            if not ok:
+                continue
+            with self._new_jpeg:
+                self._jpeg = jpeg.tobytes()
+                self._jpeg_seq += 1
+                self.frames_encoded += 1
+                self._new_jpeg.notify_all()
+
+    def _next_jpeg(self, after_seq: int, timeout: float = 2.0):
+        with self._new_jpeg:
+            if self._jpeg_seq == after_seq:
+                self._new_jpeg.wait(timeout)
+            return self._jpeg, self._jpeg_seq
+
+    def _viewer(self, delta: int):
+        with self._new_packet:
+            self.viewers += delta
+            self._new_packet.notify()
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep the console for the robot
+
+            def do_GET(self):
+                if self.path in ('/', '/index.html'):
+                    self._send(200, 'text/html', INDEX_PAGE)
+                elif self.path.startswith('/stream'):
+                    self._stream()
+                elif self.path.startswith('/snapshot'):
+                    # Always a fresh frame - the last JPEG may be from an old viewer
+                    seq = server._jpeg_seq
+                    server._viewer(+1)
+                    try:
+                        jpeg, new_seq = server._next_jpeg(seq)
+                    finally:
+                        server._viewer(-1)
+                    if jpeg is None or new_seq == seq:
+                        self._send(503, 'text/plain', b'no frame yet')
+                    else:
+                        self._send(200, 'image/jpeg', jpeg)
+                else:
+                    self._send(404, 'text/plain', b'not found')
+
+            def _send(self, status: int, content_type: str, body: bytes):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Content-Type',
+                                 f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+                self.end_headers()
+                server._viewer(+1)
+                seq = 0
+                try:
+                    while server.running:
+                        jpeg, new_seq = server._next_jpeg(seq)
+                        if jpeg is None or new_seq == seq:
+                            continue
+                        seq = new_seq
+                        self.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n'
+                                         + f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                                         + jpeg + b'\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Viewer closed the page
+                finally:
+                    server._viewer(-1)
+
+        return Handler
+
+    def report(self) -> str:
+        return f"   frames encoded={self.frames_encoded}  viewers={self.viewers}"
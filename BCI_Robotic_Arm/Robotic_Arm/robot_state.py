@@ -0,0 +1,586 @@
+"""
+ROBOT STATE STREAM
+==================
+Background reader for the UR realtime interface (port 30003).
+
+The controller pushes one state packet every 8 ms (125 Hz) to every
+connected client. Instead of opening a new socket per pose query, one
+connection is kept open and every packet is parsed into:
+- a lock-protected "latest state" slot (served to get_robot_pose)
+- a timestamped ring buffer of recent states (for history lookups)
+
+Every state gets 'measured_at': the controller timestamp mapped onto the
+local monotonic clock. The offset is the smallest (receive time -
+controller time) over the last history_size packets, i.e. the packet
+with the least network/scheduling delay, so network jitter does not
+shift the time a pose was measured. The minimum one-way delay stays in
+the offset (about 1 ms on a direct LAN link). pose_at() interpolates the pose for
+any instant in the buffer (e.g. a camera frame's capture time).
+"""
+
+import bisect
+import math
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Optional, List
+
+# Realtime interface packet layout (CB3 3.x / e-Series, 1060 bytes)
+# Offsets are byte positions from the start of the packet (incl. size header)
+PACKET_SIZE = 1060
+OFFSET_CONTROLLER_TIME = 4      # double
+OFFSET_Q_ACTUAL = 252           # 6 doubles - joint positions (rad)
+OFFSET_QD_ACTUAL = 300          # 6 doubles - joint velocities (rad/s)
+OFFSET_TCP_POSE = 444           # 6 doubles - [X, Y, Z, RX, RY, RZ]
+OFFSET_TCP_SPEED = 492          # 6 doubles - TCP speed (m/s, rad/s)
+OFFSET_DIGITAL_INPUTS = 684     # double - digital input bits (tool inputs at bits 16, 17)
+OFFSET_ROBOT_MODE = 756         # double
+OFFSET_SAFETY_MODE = 812        # double
+OFFSET_SPEED_SCALING = 940      # double
+OFFSET_PROGRAM_STATE = 1052     # double
+
+# Safety modes reported at OFFSET_SAFETY_MODE
+SAFETY_MODE_NORMAL = 1
+SAFETY_MODE_REDUCED = 2
+SAFETY_MODE_PROTECTIVE_STOP = 3
+SAFETY_MODE_SAFEGUARD_STOP = 5
+SAFETY_MODE_EMERGENCY_STOPS = (6, 7)
+
+# Program states reported at OFFSET_PROGRAM_STATE
+PROGRAM_STATE_STOPPED = 1
+PROGRAM_STATE_PLAYING = 2
+
+# Outcomes returned by RobotStateReader.wait_for_motion
+MOTION_REACHED = 'reached'
+MOTION_STOPPED = 'stopped'
+MOTION_PROGRAM_STOPPED = 'program_stopped'
+MOTION_PROTECTIVE_STOP = 'protective_stop'
+MOTION_TIMEOUT = 'timeout'
+MOTION_CANCELLED = 'cancelled'
+
+def _rotvec_to_quat(rotvec) -> tuple:
+    angle = math.sqrt(sum(v * v for v in rotvec))
+    if angle < 1e-12:
+        return (1.0, 0.0, 0.0, 0.0)
+    scale = math.sin(angle / 2) / angle
+    return (math.cos(angle / 2), rotvec[0] * scale, rotvec[1] * scale, rotvec[2] * scale)
+
+
+def _quat_to_rotvec(q, reference=None) -> list:
+    w, x, y, z = q
+    if w < 0:
+        w, x, y, z = -w, -x, -y, -z
+    sin_half = math.sqrt(x * x + y * y + z * z)
+    if sin_half < 1e-12:
+        return [0.0, 0.0, 0.0]
+    angle = 2 * math.atan2(sin_half, w)
+    rotvec = [x / sin_half * angle, y / sin_half * angle, z / sin_half * angle]
+    if reference is not None and sum(a * b for a, b in zip(rotvec, reference)) < 0:
+        # Same rotation, the representation the robot reports (near 180 deg it flips)
+        scale = 1 - 2 * math.pi / angle
+        rotvec = [v * scale for v in rotvec]
+    return rotvec
+
+
+def _quat_multiply(a, b) -> tuple:
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw)
+
+
+def _slerp(q0, q1, alpha: float) -> tuple:
+    dot = sum(a * b for a, b in zip(q0, q1))
+    if dot < 0:
+        q1, dot = tuple(-v for v in q1), -dot
+    if dot > 0.9995:
+        q = [a + (b - a) * alpha for a, b in zip(q0, q1)]
+    else:
+        theta = math.acos(dot)
+        w0 = math.sin((1 - alpha) * theta) / math.sin(theta)
+        w1 = math.sin(alpha * theta) / math.sin(theta)
+        q = [w0 * a + w1 * b for a, b in zip(q0, q1)]
+    norm = math.sqrt(sum(v * v for v in q))
+    return tuple(v / norm for v in q)
+
+
+def interpolate_pose(pose_a: list, pose_b: list, alpha: float) -> list:
+    """Pose between two TCP poses: linear position, slerp orientation (alpha 0..1)"""
+    position = [a + (b - a) * alpha for a, b in zip(pose_a[:3], pose_b[:3])]
+    q = _slerp(_rotvec_to_quat(pose_a[3:6]), _rotvec_to_quat(pose_b[3:6]), alpha)
+    return position + _quat_to_rotvec(q, pose_a[3:6])
+
+
+def extrapolate_pose(pose: list, tcp_speed: list, dt: float) -> list:
+    """Pose dt seconds later at constant TCP speed (m/s, rad/s in base frame)"""
+    position = [p + v * dt for p, v in zip(pose[:3], tcp_speed[:3])]
+    turn = _rotvec_to_quat([w * dt for w in tcp_speed[3:6]])
+    q = _quat_multiply(turn, _rotvec_to_quat(pose[3:6]))
+    return position + _quat_to_rotvec(q, pose[3:6])
+
+
+class _ClockOffset:
+    """Sliding-window minimum of (receive time - controller time)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._count = 0
+        self._candidates = deque()  # (index, offset), offsets increasing
+
+    def reset(self):
+        self._count = 0
+        self._candidates.clear()
+
+    def update(self, received_at: float, controller_time: float) -> float:
+        offset = received_at - controller_time
+        self._count += 1
+        while self._candidates and self._candidates[-1][1] >= offset:
+            self._candidates.pop()
+        self._candidates.append((self._count, offset))
+        if self._candidates[0][0] <= self._count - self.window:
+            self._candidates.popleft()
+        return self._candidates[0][1]
+
+
+_SIX_DOUBLES = struct.Struct('>6d')
+_DOUBLE = struct.Struct('>d')
+_HEADER = struct.Struct('>i')
+
+
+def parse_state_packet(data, received_at: float) -> Optional[dict]:
+    """
+    Parse one realtime packet into a state dict
+    Args:
+        data: Complete packet bytes (including the 4-byte size header)
+        received_at: time.monotonic() timestamp when the packet arrived
+    Returns:
+        State dict, or None if the packet is too short
+    """
+    if len(data) < PACKET_SIZE:
+        return None
+
+    return {
+        'timestamp': received_at,
+        'controller_time': _DOUBLE.unpack_from(data, OFFSET_CONTROLLER_TIME)[0],
+        'pose': list(_SIX_DOUBLES.unpack_from(data, OFFSET_TCP_POSE)),
+        'tcp_speed': list(_SIX_DOUBLES.unpack_from(data, OFFSET_TCP_SPEED)),
+        'joints': list(_SIX_DOUBLES.unpack_from(data, OFFSET_Q_ACTUAL)),
+        'joint_speeds': list(_SIX_DOUBLES.unpack_from(data, OFFSET_QD_ACTUAL)),
+        'digital_inputs': int(_DOUBLE.unpack_from(data, OFFSET_DIGITAL_INPUTS)[0]),
+        'robot_mode': int(_DOUBLE.unpack_from(data, OFFSET_ROBOT_MODE)[0]),
+        'safety_mode': int(_DOUBLE.unpack_from(data, OFFSET_SAFETY_MODE)[0]),
+        'speed_scaling': _DOUBLE.unpack_from(data, OFFSET_SPEED_SCALING)[0],
+        'program_state': int(_DOUBLE.unpack_from(data, OFFSET_PROGRAM_STATE)[0]),
+    }
+
+
+def estimate_move_duration(distance: float, velocity: float, acceleration: float) -> float:
+    """
+    Duration of a trapezoidal (or triangular) velocity profile
+    Args:
+        distance: Path length (m, or rad for joint moves)
+        velocity: Cruise velocity (m/s or rad/s)
+        acceleration: Acceleration = deceleration (m/s^2 or rad/s^2)
+    Returns:
+        Move time in seconds
+    """
+    if distance <= 0:
+        return 0.0
+    if velocity <= 0 or acceleration <= 0:
+        return math.inf
+    ramp_distance = velocity ** 2 / acceleration  # accelerate + decelerate
+    if distance >= ramp_distance:
+        return distance / velocity + velocity / acceleration
+    return 2.0 * math.sqrt(distance / acceleration)
+
+
+def is_safety_stop(state: dict) -> bool:
+    """True if the robot is in a protective, safeguard or emergency stop"""
+    mode = state['safety_mode']
+    return (mode in (SAFETY_MODE_PROTECTIVE_STOP, SAFETY_MODE_SAFEGUARD_STOP)
+            or mode in SAFETY_MODE_EMERGENCY_STOPS)
+
+
+def tcp_speed_norm(state: dict) -> float:
+    """Linear TCP speed in m/s"""
+    vx, vy, vz = state['tcp_speed'][:3]
+    return math.sqrt(vx * vx + vy * vy + vz * vz)
+
+
+class RobotStateReader:
+    """Keeps one realtime connection open and parses the 125 Hz state stream"""
+
+    def __init__(self, robot_ip: str, port: int = 30003, history_size: int = 1250):
+        self.robot_ip = robot_ip
+        self.port = port
+
+        # Latest state slot + ring buffer (history_size=1250 is ~10s at 125 Hz)
+        self._lock = threading.Lock()
+        self._new_state = threading.Condition(self._lock)
+        self._latest = None
+        self._history = deque(maxlen=history_size)
+        self._clock = _ClockOffset(history_size)
+
+        # Connection handling
+        self.running = False
+        self.connected = False
+        self.connect_timeout = 2.0
+        self.reconnect_delay = 0.5
+        self._socket = None
+        self._thread = None
+
+        # Statistics
+        self.packets_received = 0
+        self.reconnects = 0
+
+    def start(self):
+        """Start the background reader thread (no-op if already running)"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread and close the connection"""
+        self.running = False
+        sock = self._socket
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        with self._new_state:
+            self._new_state.notify_all()
+
+    def _run(self):
+        buffer = bytearray(4096)
+        view = memoryview(buffer)
+        first_attempt = True
+
+        while self.running:
+            try:
+                sock = socket.create_connection((self.robot_ip, self.port),
+                                                timeout=self.connect_timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(1.0)
+                self._socket = sock
+                self.connected = True
+                if not first_attempt:
+                    self.reconnects += 1
+                    print(f"✅ Robot state stream reconnected ({self.robot_ip}:{self.port})")
+                first_attempt = False
+                self._clock.reset()  # The controller may have restarted
+
+                while self.running:
+                    self._recv_exact(sock, view, 4)
+                    size = _HEADER.unpack_from(buffer, 0)[0]
+                    if size <= 4 or size > len(buffer):
+                        raise ConnectionError(f"invalid packet size {size}")
+                    self._recv_exact(sock, view[4:], size - 4)
+
+                    state = parse_state_packet(view[:size], time.monotonic())
+                    if state is None:
+                        continue
+                    state['measured_at'] = state['controller_time'] + self._clock.update(
+                        state['timestamp'], state['controller_time'])
+
+                    with self._new_state:
+                        self._latest = state
+                        self._history.append(state)
+                        self.packets_received += 1
+                        self._new_state.notify_all()
+
+            except Exception as e:
+                if self.running:
+                    if self.connected or first_attempt:
+                        print(f"⚠️ Robot state stream error: {e} - reconnecting...")
+                    first_attempt = False
+            finally:
+                self.connected = False
+                if self._socket:
+                    try:
+                        self._socket.close()
+                    except OSError:
+                        pass
+                    self._socket = None
+
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+    @staticmethod
+    def _recv_exact(sock, view, n: int):
+        received = 0
+        while received < n:
+            count = sock.recv_into(view[received:n], n - received)
+            if count == 0:
+                raise ConnectionError("connection closed by robot")
+            received += count
+
+    def latest(self) -> Optional[dict]:
+        """Return the most recent state dict (or None before the first packet)"""
+        with self._lock:
+            return self._latest
+
+    def get_pose(self, max_age: float = 0.1) -> Optional[list]:
+        """
+        Return the latest TCP pose [X, Y, Z, RX, RY, RZ]
+        Args:
+            max_age: Maximum state age in seconds (None = accept any age)
+        Returns:
+            Pose list, or None if no state is available or it is stale
+        """
+        with self._lock:
+            state = self._latest
+        if state is None:
+            return None
+        if max_age is not None and time.monotonic() - state['timestamp'] > max_age:
+            return None
+        return list(state['pose'])
+
+    def state_age(self) -> Optional[float]:
+        """Seconds since the latest packet arrived (None before the first packet)"""
+        with self._lock:
+            state = self._latest
+        if state is None:
+            return None
+        return time.monotonic() - state['timestamp']
+
+    def wait_for_state(self, timeout: float = 2.0) -> bool:
+        """Block until at least one packet has been received"""
+        deadline = time.monotonic() + timeout
+        with self._new_state:
+            while self._latest is None and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._new_state.wait(remaining)
+            return self._latest is not None
+
+    def get_history(self, since: float = None) -> List[dict]:
+        """
+        Return buffered states (oldest first)
+        Args:
+            since: Only return states received after this monotonic timestamp
+        """
+        with self._lock:
+            if since is None:
+                return list(self._history)
+            return [s for s in self._history if s['timestamp'] > since]
+
+    def _bracket(self, timestamp: float) -> tuple:
+        """(history, index of the first state measured at/after timestamp)"""
+        with self._lock:
+            history = list(self._history)
+        times = [s['measured_at'] for s in history]
+        return history, bisect.bisect_left(times, timestamp)
+
+    def state_at(self, timestamp: float, max_gap: float = 0.05) -> Optional[dict]:
+        """
+        Return the buffered state measured closest to `timestamp`
+        Args:
+            timestamp: Monotonic time (e.g. a camera frame's capture time)
+            max_gap: Maximum allowed distance to the nearest state in seconds
+        Returns:
+            State dict, or None if the history does not cover the timestamp
+        """
+        history, idx = self._bracket(timestamp)
+        if not history:
+            return None
+        candidates = [history[i] for i in (idx - 1, idx) if 0 <= i < len(history)]
+        nearest = min(candidates, key=lambda s: abs(s['measured_at'] - timestamp))
+        return nearest if abs(nearest['measured_at'] - timestamp) <= max_gap else None
+
+    def pose_at(self, timestamp: float, max_extrapolation: float = 0.05) -> Optional[list]:
+        """
+        TCP pose at a monotonic timestamp, interpolated between the two
+        buffered states around it
+        Args:
+            timestamp: Monotonic time (e.g. a camera frame's capture time)
+            max_extrapolation: Newer than the latest state by up to this many
+                               seconds: extrapolate with the TCP speed
+        Returns:
+            [X, Y, Z, RX, RY, RZ], or None if the history does not cover it
+        """
+        history, idx = self._bracket(timestamp)
+        if not history or idx == 0 and history[0]['measured_at'] > timestamp:
+            return None
+        if idx >= len(history):
+            latest = history[-1]
+            dt = timestamp - latest['measured_at']
+            if dt > max_extrapolation:
+                return None
+            return extrapolate_pose(latest['pose'], latest['tcp_speed'], dt)
+        after = history[idx]
+        if after['measured_at'] == timestamp or idx == 0:
+            return list(after['pose'])
+        before = history[idx - 1]
+        span = after['measured_at'] - before['measured_at']
+        alpha = (timestamp - before['measured_at']) / span if span > 0 else 1.0
+        return interpolate_pose(before['pose'], after['pose'], alpha)
+
+    def wait_for(self, predicate, timeout: float) -> Optional[dict]:
+        """
+        Block until predicate(state) returns True for a newly received state
+        Args:
+            predicate: Called once per new packet with the state dict, in
+                       arrival order - packets that arrived while the caller
+                       was not scheduled are replayed from the history
+            timeout: Maximum wait in seconds
+        Returns:
+            The state that satisfied the predicate, or None on timeout
+        """
+        return self._wait_from(predicate, timeout)[0]
+
+    def _wait_from(self, predicate, timeout: float, since: Optional[int] = None):
+        """
+        wait_for() starting after packet number since (None = packets from now on)
+        Returns:
+            (state or None, number of the last packet passed to predicate) - pass
+            the number back in as since to continue with the next packet
+        """
+        deadline = time.monotonic() + timeout
+        with self._new_state:
+            seen = self.packets_received if since is None else since
+            while self.running:
+                if self.packets_received != seen:
+                    pending = min(self.packets_received - seen, len(self._history))
+                    first = self.packets_received - pending
+                    seen = self.packets_received
+                    for offset in range(pending):
+                        state = self._history[len(self._history) - pending + offset]
+                        if predicate(state):
+                            return state, first + offset + 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, seen
+                self._new_state.wait(remaining)
+        return None, seen
+
+    def wait_for_motion(self, target: Optional[list] = None, tolerance: float = 0.005,
+                        timeout: float = 5.0, stopped_samples: int = 5,
+                        speed_epsilon: float = 0.001, start_grace: float = 0.3,
+                        cancel_event: Optional[threading.Event] = None):
+        """
+        Wait for a commanded move to finish, waking on streamed state
+        Args:
+            target: Target position [X, Y, Z] in meters (None = no target check)
+            tolerance: Distance to target counted as reached (m)
+            timeout: Maximum wait in seconds
+            stopped_samples: Consecutive zero-speed packets counted as stopped
+            speed_epsilon: TCP speed (m/s) treated as zero
+            start_grace: Time allowed for motion to begin before zero speed
+                         counts as stopped
+            cancel_event: Returns MOTION_CANCELLED on the next packet once set
+        Returns:
+            (outcome, state) - outcome is one of MOTION_REACHED, MOTION_STOPPED,
+            MOTION_PROGRAM_STOPPED, MOTION_PROTECTIVE_STOP, MOTION_CANCELLED
+            or MOTION_TIMEOUT
+        """
+        started = time.monotonic()
+        tracker = {'outcome': MOTION_TIMEOUT, 'moving': False, 'playing': False, 'still': 0}
+
+        def _check(state):
+            if cancel_event is not None and cancel_event.is_set():
+                tracker['outcome'] = MOTION_CANCELLED
+                return True
+            if is_safety_stop(state):
+                tracker['outcome'] = MOTION_PROTECTIVE_STOP
+                return True
+            if target is not None:
+                pose = state['pose']
+                error = math.sqrt(sum((pose[i] - target[i]) ** 2 for i in range(3)))
+                if error <= tolerance:
+                    tracker['outcome'] = MOTION_REACHED
+                    return True
+
+            if state['program_state'] == PROGRAM_STATE_PLAYING:
+                tracker['playing'] = True
+            elif tracker['playing'] and state['program_state'] == PROGRAM_STATE_STOPPED:
+                tracker['outcome'] = MOTION_PROGRAM_STOPPED
+                return True
+
+            if tcp_speed_norm(state) > speed_epsilon:
+                tracker['moving'] = True
+                tracker['still'] = 0
+            elif tracker['moving'] or time.monotonic() - started > start_grace:
+                tracker['still'] += 1
+                if tracker['still'] >= stopped_samples:
+                    tracker['outcome'] = MOTION_STOPPED
+                    return True
+            return False
+
+        state = self.wait_for(_check, timeout)
+        if state is None:
+            return MOTION_TIMEOUT, self.latest()
+        return tracker['outcome'], state
+
+    def wait_for_program(self, waypoints: list, tolerance: float = 0.005,
+                         timeout: float = 10.0, start_timeout: float = 1.0,
+                         cancel_event: Optional[threading.Event] = None,
+                         on_waypoint=None):
+        """
+        Follow a multi-waypoint program (see motion_program.py) on the state stream
+        Args:
+            waypoints: [(position [X, Y, Z], blend_radius, label), ...] in program order
+            tolerance: Distance counted as passing a waypoint, on top of its blend radius (m)
+            timeout: Maximum wait in seconds
+            start_timeout: Program must be playing within this time
+            cancel_event: Returns MOTION_CANCELLED on the next packet once set
+            on_waypoint: Called with (index, label, state) as each waypoint is passed
+        Returns:
+            (outcome, state, passed) - outcome is MOTION_REACHED once the program
+            finished with every waypoint passed; passed is the number of waypoints reached
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        tracker = {'outcome': None, 'playing': False, 'passed': 0}
+
+        def _check(state):
+            # Runs under the state lock - only bookkeeping here, no callbacks
+            if cancel_event is not None and cancel_event.is_set():
+                tracker['outcome'] = MOTION_CANCELLED
+                return True
+            if is_safety_stop(state):
+                tracker['outcome'] = MOTION_PROTECTIVE_STOP
+                return True
+
+            pose = state['pose']
+            passed = tracker['passed']
+            while tracker['passed'] < len(waypoints):
+                position, radius, label = waypoints[tracker['passed']]
+                error = math.sqrt(sum((pose[i] - position[i]) ** 2 for i in range(3)))
+                if error > radius + tolerance:
+                    break
+                tracker['passed'] += 1
+
+            if state['program_state'] == PROGRAM_STATE_PLAYING:
+                tracker['playing'] = True
+            elif tracker['playing'] or time.monotonic() - started > start_timeout:
+                # Program finished (or never started)
+                done = tracker['passed'] == len(waypoints)
+                tracker['outcome'] = MOTION_REACHED if done else MOTION_PROGRAM_STOPPED
+                return True
+            # Return to the caller to report newly passed waypoints
+            return on_waypoint is not None and tracker['passed'] > passed
+
+        reported = 0
+        seen = None
+        while True:
+            # Continue after the last packet checked, so the rest of a batch is not skipped
+            state, seen = self._wait_from(_check, max(0.0, deadline - time.monotonic()), seen)
+            if state is None:
+                return MOTION_TIMEOUT, self.latest(), tracker['passed']
+            # Outside the lock, so the callback may read the reader
+            while on_waypoint and reported < tracker['passed']:
+                on_waypoint(reported, waypoints[reported][2], state)
+                reported += 1
+            if tracker['outcome'] is not None:
+                return tracker['outcome'], state, tracker['passed']
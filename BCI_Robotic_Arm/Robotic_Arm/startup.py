@@ -0,0 +1,96 @@
+"""
+PARALLEL STARTUP
+================
+Runs independent setup steps (model load + warm-up, camera open, robot
+connect, gripper connect, BCI listener) on their own threads instead of
+one after the other, and reports how long each took.
+
+Steps are I/O bound (sockets, camera driver, model file) or release the
+GIL in native code (PyTorch / ONNX Runtime / OpenVINO), so startup takes
+about as long as the slowest step instead of the sum of all steps.
+
+A step is a callable returning True on success; an exception counts as
+a failure and is printed, the other steps still finish.
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+
+class StartupStep:
+    """One named setup step and its timing"""
+
+    def __init__(self, name: str, func: Callable[[], bool]):
+        self.name = name
+        self.func = func
+        self.ok = False
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def run(self):
+        self.started_at = time.monotonic()
+        try:
+            self.ok = bool(self.func())
+        except Exception as e:
+            self.error = e
+            self.ok = False
+            print(f"❌ Startup step '{self.name}' failed: {e}")
+        finally:
+            self.finished_at = time.monotonic()
+
+
+class ParallelStartup:
+    """Runs setup steps concurrently and keeps their timings for the report"""
+
+    def __init__(self):
+        self.steps = []
+        self.started_at = None
+        self.finished_at = None
+
+    def add(self, name: str, func: Callable[[], bool]) -> StartupStep:
+        step = StartupStep(name, func)
+        self.steps.append(step)
+        return step
+
+    def run(self, timeout: float = 120.0) -> Dict[str, bool]:
+        """
+        Run all steps and wait for them
+        Args:
+            timeout: Give up waiting after this long (a hung step counts as failed)
+        Returns:
+            Step name -> success
+        """
+        self.started_at = time.monotonic()
+        threads = []
+        for step in self.steps:
+            thread = threading.Thread(target=step.run, name=f"startup-{step.name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        deadline = self.started_at + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self.finished_at = time.monotonic()
+        return {step.name: step.ok for step in self.steps}
+
+    def report(self) -> str:
+        """One line per step (start offset, duration, result) plus wall vs. serial time"""
+        lines = []
+        for step in self.steps:
+            if step.finished_at is None:
+                status = "⏳ still running"
+            else:
+                status = "✅" if step.ok else "❌"
+            offset = (step.started_at - self.started_at) if step.started_at else 0.0
+            lines.append(f"   {step.name:<10} +{offset:5.2f}s  {step.duration:6.2f}s  {status}")
+        wall = (self.finished_at or time.monotonic()) - self.started_at
+        serial = sum(step.duration for step in self.steps)
+        lines.append(f"   total      {wall:6.2f}s  (one after another: {serial:.2f}s)")
+        return "\n".join(lines)
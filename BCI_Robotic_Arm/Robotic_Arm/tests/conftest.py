@@ -0,0 +1,68 @@
+"""Shared fixtures: the Robotic_Arm modules import each other by plain name"""
+
+import importlib
+import socket
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROBOTIC_ARM = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROBOTIC_ARM))
+sys.path.append(str(ROBOTIC_ARM / "Gripper"))
+
+
+def _stub_module(name: str, **attributes):
+    """Stand-in for a site-specific module that is not checked in (config.py, Gripper/cobot.py)"""
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+
+class _NoGripper:
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("Robotiq gripper driver (Gripper/cobot.py) not available")
+
+
+# The controller reads every setting with getattr(config, NAME, default)
+_stub_module('config')
+_stub_module('cobot', GripperController=_NoGripper)
+
+from robot_state import RobotStateReader  # noqa: E402
+from urscript_channel import URScriptChannel  # noqa: E402
+from ur_simulator import URSimulator  # noqa: E402
+
+START_POSE = [0.5, 0.4, 0.3, 0.0, 3.14159, 0.0]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def simulator():
+    """UR simulator on free local ports"""
+    sim = URSimulator(script_port=_free_port(), realtime_port=_free_port(),
+                      start_pose=list(START_POSE), gripper_time=0.1, seed=0, verbose=False)
+    sim.start()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def sim_link(simulator):
+    """(simulator, state reader, command channel) connected to the simulator"""
+    reader = RobotStateReader('127.0.0.1', port=simulator.realtime_port)
+    channel = URScriptChannel('127.0.0.1', port=simulator.script_port)
+    reader.start()
+    channel.start()
+    assert reader.wait_for_state(timeout=3.0)
+    yield simulator, reader, channel
+    channel.stop()
+    reader.stop()
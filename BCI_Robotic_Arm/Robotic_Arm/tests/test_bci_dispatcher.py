@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from bci_dispatcher import AUTO_PRIORITY, CommandDispatcher, parse_command
+
+
+class FakeRobot:
+    """Just the attributes the dispatcher reads, plus a stop counter"""
+
+    def __init__(self):
+        self.abort_event = threading.Event()
+        self.is_moving = False
+        self.active_sequence = None
+        self.search_in_progress = False
+        self.stops = 0
+        self.searches_ended = 0
+
+    def stop_motion(self):
+        self.stops += 1
+        self.abort_event.set()
+        self.search_in_progress = False
+
+    def end_search(self):
+        self.searches_ended += 1
+        self.search_in_progress = False
+        return True
+
+
+def _command(text):
+    return {'command': text, 'received_at': time.monotonic()}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('pick', ('pick', None)),
+    ('  HOME ', ('home', None)),
+    ('select: Cup', ('select', 'cup')),
+    ('select red  cup', ('select', 'red  cup')),
+    ('dance', None),
+    ('', None),
+])
+def test_parse_command(text, expected):
+    assert parse_command(text) == expected
+
+
+def test_duplicates_coalesce_and_urgent_intents_come_first():
+    dispatcher = CommandDispatcher(FakeRobot())
+    for text in ('select cup', 'pick', 'pick', 'home'):
+        assert dispatcher.submit(_command(text))
+    assert not dispatcher.submit(_command('dance'))
+    assert dispatcher.coalesced == 1
+    assert dispatcher.unknown == 1
+    order = []
+    intent = dispatcher.next_intent()
+    while intent:
+        order.append(intent['intent'])
+        intent = dispatcher.next_intent()
+    assert order == ['home', 'pick', 'select']
+
+
+def test_stop_runs_immediately_and_clears_pending():
+    robot = FakeRobot()
+    stopped = []
+    dispatcher = CommandDispatcher(robot, on_stop=lambda: stopped.append(True))
+    dispatcher.submit(_command('pick'))
+    dispatcher.submit(_command('stop'))
+    assert robot.stops == 1 and stopped == [True]
+    assert dispatcher.pending() == 0
+
+
+def test_idle_auto_activity_is_not_preempted():
+    robot = FakeRobot()
+    dispatcher = CommandDispatcher(robot)
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)
+    dispatcher.submit(_command('pick'))
+    assert robot.stops == 0 and dispatcher.preemptions == 0
+
+
+def test_moving_activity_is_preempted():
+    robot = FakeRobot()
+    dispatcher = CommandDispatcher(robot)
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)
+    robot.active_sequence = 'pick'
+    dispatcher.submit(_command('home'))
+    assert robot.stops == 1 and dispatcher.preemptions == 1
+
+
+def test_servo_counts_as_motion():
+    robot = FakeRobot()
+    servo_active = [True]
+    dispatcher = CommandDispatcher(robot, motion_active=lambda: servo_active[0])
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)
+    dispatcher.submit(_command('place'))
+    assert robot.stops == 1
+
+
+def test_search_is_left_to_begin():
+    robot = FakeRobot()
+    robot.is_moving = robot.search_in_progress = True
+    dispatcher = CommandDispatcher(robot)
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)
+    dispatcher.submit(_command('pick'))
+    assert robot.stops == 0
+
+    dispatcher.begin(dispatcher.next_intent())
+    assert robot.searches_ended == 1  # The search is ended once the pick runs
+    assert robot.stops == 0
+    assert not robot.abort_event.is_set()
+
+
+def test_reaction_is_measured_only_once_motion_starts():
+    robot = FakeRobot()
+    measured = []
+    dispatcher = CommandDispatcher(robot)
+    dispatcher._measure_reaction = lambda intent, received_at, moving: measured.append(intent)
+    dispatcher.submit(_command('pick'))
+    intent = dispatcher.next_intent()
+    dispatcher.begin(intent)
+    assert measured == [] and len(dispatcher.dispatch_ms['pick']) == 1
+
+    dispatcher.motion_started(intent)
+    assert measured == ['pick']
+
+
+def test_begin_activity_clears_a_stale_abort():
+    robot = FakeRobot()
+    dispatcher = CommandDispatcher(robot)
+    dispatcher.submit(_command('stop'))
+    assert robot.abort_event.is_set()
+    dispatcher.begin_activity("key 'h'", AUTO_PRIORITY)
+    assert not robot.abort_event.is_set()
+
+
+def test_resuming_the_same_activity_keeps_its_abort():
+    robot = FakeRobot()
+    dispatcher = CommandDispatcher(robot)
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)
+    dispatcher.end()
+    robot.abort_event.set()  # e.g. end_search() cancelling the background search
+    dispatcher.begin_activity('auto', AUTO_PRIORITY)  # Next frame
+    assert robot.abort_event.is_set()
+
+    dispatcher.begin_activity("key 'h'", AUTO_PRIORITY)
+    assert not robot.abort_event.is_set()
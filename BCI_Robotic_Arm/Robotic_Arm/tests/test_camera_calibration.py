@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from camera_calibration import (CameraCalibration, fit_calibration, matrix_to_rotvec,
+                                nominal_camera_matrix, rotvec_to_matrix)
+
+IMAGE_SIZE = (640, 480)
+OBJECT_MM = np.array([520.0, 380.0])
+
+
+def _tool_down(yaw: float) -> list:
+    """Tool Z pointing at the table, turned by yaw about the tool axis"""
+    return matrix_to_rotvec(rotvec_to_matrix([0.0, math.pi, 0.0])
+                            @ rotvec_to_matrix([0.0, 0.0, yaw])).tolist()
+
+
+def _truth() -> CameraCalibration:
+    matrix = nominal_camera_matrix(*IMAGE_SIZE, horizontal_fov_deg=65.0)
+    return CameraCalibration(matrix, IMAGE_SIZE, tcp_to_camera_translation=(0.03, -0.01, 0.05),
+                             tcp_to_camera_rotvec=(0.02, -0.01, math.pi / 2))
+
+
+def test_rotvec_to_matrix_is_a_rotation():
+    rotation = rotvec_to_matrix([0.3, -0.2, 0.1])
+    assert rotation @ rotation.T == pytest.approx(np.eye(3))
+    assert np.linalg.det(rotation) == pytest.approx(1.0)
+    assert rotvec_to_matrix([0.0, 0.0, math.pi / 2]) @ [1.0, 0.0, 0.0] == \
+        pytest.approx([0.0, 1.0, 0.0])
+
+
+@pytest.mark.parametrize('rotvec', [[0.0, 0.0, 0.0], [0.3, -0.2, 0.1], [0.0, math.pi, 0.0],
+                                    [1.2, 0.4, -2.0]])
+def test_rotvec_matrix_round_trip(rotvec):
+    assert rotvec_to_matrix(matrix_to_rotvec(rotvec_to_matrix(rotvec))) == \
+        pytest.approx(rotvec_to_matrix(rotvec))
+
+
+@pytest.mark.parametrize('orientation', [[0.0, math.pi, 0.0], [0.1, 3.0, -0.05]])
+def test_pixels_to_table_inverts_table_to_pixels(orientation):
+    calibration = _truth()
+    pose = [0.5, 0.4, 0.35, *orientation]
+    points = np.array([[500.0, 380.0], [560.0, 420.0], [450.0, 300.0]])
+    pixels = calibration.table_to_pixels(points, pose)
+    assert calibration.pixels_to_table(pixels, pose) == pytest.approx(points, abs=1e-6)
+
+
+def test_negative_focal_is_folded_into_the_rotation():
+    matrix = nominal_camera_matrix(*IMAGE_SIZE)
+    flipped = matrix.copy()
+    flipped[:2, :2] *= -1
+    pose = [0.5, 0.4, 0.3, *_tool_down(0.0)]
+    pixel = [[400.0, 200.0]]
+    a = CameraCalibration(matrix, IMAGE_SIZE, tcp_to_camera_rotvec=(0.0, 0.0, math.pi))
+    b = CameraCalibration(flipped, IMAGE_SIZE)
+    assert b.camera_matrix[0, 0] > 0
+    assert b.pixels_to_table(pixel, pose) == pytest.approx(a.pixels_to_table(pixel, pose))
+
+
+def test_fit_calibration_recovers_the_camera_mount():
+    truth = _truth()
+    samples = []
+    for z in (0.25, 0.32, 0.4):
+        for yaw in (-0.4, 0.0, 0.4):
+            for dx, dy in ((0.0, 0.0), (0.03, -0.02)):
+                pose = [OBJECT_MM[0] / 1000 + dx, OBJECT_MM[1] / 1000 + dy, z, *_tool_down(yaw)]
+                samples.append({'pixel': truth.table_to_pixels([OBJECT_MM], pose)[0].tolist(),
+                                'pose': pose})
+
+    fitted = fit_calibration(samples, IMAGE_SIZE)
+    assert fitted is not None
+    assert fitted.residual_rms_mm < 0.5
+    assert fitted.object_xy_mm == pytest.approx(tuple(OBJECT_MM), abs=1.0)
+    assert fitted.camera_matrix[0, 0] > 0
+
+    pose = [0.45, 0.35, 0.3, *_tool_down(0.2)]
+    pixels = [[100.0, 80.0], [320.0, 240.0], [600.0, 420.0]]
+    assert fitted.pixels_to_table(pixels, pose) == \
+        pytest.approx(truth.pixels_to_table(pixels, pose), abs=2.0)
+
+
+def test_fit_calibration_needs_five_samples():
+    assert fit_calibration([{'pixel': (0, 0), 'pose': [0.0] * 6}] * 4, IMAGE_SIZE) is None
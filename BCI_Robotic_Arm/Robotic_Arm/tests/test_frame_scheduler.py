@@ -0,0 +1,76 @@
+import pytest
+
+import frame_scheduler
+from frame_scheduler import AdaptiveFrameScheduler
+
+LEVELS = [{'model': 'm', 'imgsz': 640}, {'model': 'm', 'imgsz': 320},
+          {'model': 'n', 'imgsz': 640}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(frame_scheduler.time, 'monotonic', clock)
+    return clock
+
+
+def test_should_run_follows_the_mode_period(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, periods={'idle': 0.25})
+    assert scheduler.should_run()
+    clock.now += 0.1
+    assert not scheduler.should_run()
+    clock.now += 0.2
+    assert scheduler.should_run()
+    assert scheduler.loop_period == pytest.approx(0.3)
+    assert (scheduler.frames_run, scheduler.frames_skipped) == (2, 1)
+
+
+def test_switches_down_at_once_when_over_budget(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, periods={'idle': 0.25}, alpha=1.0)
+    assert scheduler.record(0.3) == LEVELS[1]  # 0.3 s vs 0.2 s budget; 320 px ~ 0.075 s
+
+
+def test_unmeasured_level_is_estimated_from_the_same_model(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, periods={'idle': 1.0}, alpha=1.0)
+    scheduler.record(0.4)
+    assert scheduler.level == 0
+    assert scheduler.estimate(1) == pytest.approx(0.1)
+    assert scheduler.estimate(2) == pytest.approx(0.4)  # Other model: assume current cost
+
+
+def test_switches_up_only_after_dwell_and_margin(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, periods={'idle': 0.25, 'transport': 1.0},
+                                       alpha=1.0, dwell=1.0)
+    scheduler.record(0.3)
+    assert scheduler.level == 1
+    scheduler.record(0.07)
+
+    # Slower mode: level 0 (0.3 s) fits 0.75 * 0.8 s, but not before the dwell time
+    clock.now += 0.5
+    assert scheduler.set_mode('transport') is None
+    clock.now += 0.6
+    assert scheduler.record(0.07) == LEVELS[0]
+    assert scheduler.switches == 2
+
+
+def test_command_mode_keeps_the_level(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, alpha=1.0)
+    scheduler.record(0.3)
+    level = scheduler.level
+    assert scheduler.set_mode('command') is None
+    assert scheduler.should_run()
+    assert scheduler.level == level
+
+
+def test_unavailable_levels_are_skipped(clock):
+    scheduler = AdaptiveFrameScheduler(LEVELS, periods={'idle': 0.25}, alpha=1.0,
+                                       available=lambda level: level['imgsz'] == 640)
+    assert scheduler.record(0.3) == LEVELS[2]
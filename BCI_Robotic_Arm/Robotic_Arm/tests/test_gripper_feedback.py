@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from gripper_feedback import (GRIP_CAUGHT, GRIP_DROPPED, GRIP_MOVING, GRIP_REACHED,
+                              TOOL_INPUT_0, TOOL_INPUT_1, GripperFeedback,
+                              decode_tool_inputs, encode_tool_inputs)
+
+
+@pytest.mark.parametrize('status', [GRIP_MOVING, GRIP_REACHED, GRIP_CAUGHT, GRIP_DROPPED])
+def test_tool_input_round_trip(status):
+    assert decode_tool_inputs(encode_tool_inputs(status)) == status
+
+
+def test_tool_input_wiring():
+    # Status outputs on tool inputs 0/1: 10 reached, 01 caught, 11 dropped
+    assert decode_tool_inputs(1 << TOOL_INPUT_0) == GRIP_REACHED
+    assert decode_tool_inputs(1 << TOOL_INPUT_1) == GRIP_CAUGHT
+    assert decode_tool_inputs((1 << TOOL_INPUT_0) | (1 << TOOL_INPUT_1)) == GRIP_DROPPED
+    # Other digital inputs do not matter
+    assert decode_tool_inputs(0b1011) == GRIP_MOVING
+
+
+class StatusGripper:
+    def __init__(self, states):
+        self.states = list(states)
+
+    def get_grip_state(self):
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+def test_controller_feedback_waits_for_motion_to_finish():
+    gripper = StatusGripper([GRIP_REACHED, GRIP_MOVING, GRIP_MOVING, GRIP_CAUGHT])
+    feedback = GripperFeedback(gripper, state_reader=None, poll_interval=0.001)
+    assert feedback.source == 'controller'
+    # The stale 'reached' from the previous motion is ignored during the grace period
+    assert feedback.wait(time.monotonic(), timeout=1.0) == GRIP_CAUGHT
+
+
+def test_no_status_method_disables_feedback():
+    feedback = GripperFeedback(object(), state_reader=None)
+    assert feedback.source is None
+    assert feedback.wait(0.0, timeout=0.1) is None
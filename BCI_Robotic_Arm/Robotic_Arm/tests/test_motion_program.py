@@ -0,0 +1,72 @@
+import pytest
+
+from motion_program import MAX_BLEND_FRACTION, MotionProgram
+from robot_state import MOTION_REACHED
+
+from conftest import START_POSE
+
+ORIENTATION = START_POSE[3:]
+
+
+def _pose(x, y, z):
+    return [x, y, z, *ORIENTATION]
+
+
+def test_blend_radius_is_clamped_to_adjacent_segments():
+    program = MotionProgram('pick')
+    program.movel(_pose(0.5, 0.4, 0.3), 1.2, 0.25, 0.05, 'safe')
+    program.movel(_pose(0.5, 0.4, 0.28), 1.2, 0.25, 0.05, 'approach')  # 2 cm segments
+    program.movel(_pose(0.5, 0.4, 0.26), 1.2, 0.05, 0.05, 'pick')
+    radii = program.blend_radii(_pose(0.5, 0.4, 0.5))
+    assert radii[0] == pytest.approx(MAX_BLEND_FRACTION * 0.02)
+    assert radii[1] == pytest.approx(MAX_BLEND_FRACTION * 0.02)
+    assert radii[2] == 0.0  # Last waypoint: stop there
+
+
+def test_no_blend_before_an_inline_action():
+    program = MotionProgram('pick')
+    program.movel(_pose(0.5, 0.4, 0.3), 1.2, 0.25, 0.02)
+    program.movel(_pose(0.5, 0.4, 0.1), 1.2, 0.25, 0.02, 'pick height')
+    program.script('rq_close()', 0.5)
+    program.movel(_pose(0.5, 0.4, 0.3), 1.2, 0.25, 0.02)
+    program.movel(_pose(0.6, 0.4, 0.3), 1.2, 0.25, 0.02)
+    assert program.blend_radii(None) == pytest.approx([0.02, 0.0, 0.02, 0.0])
+    assert program.action_time == 0.5
+
+
+def test_render_and_targets():
+    program = MotionProgram('place')
+    program.movel(_pose(0.5, 0.4, 0.3), 1.2, 0.25, 0.0, 'above')
+    program.sleep(0.2)
+    script = program.render()
+    assert script.startswith('def place():\n')
+    assert 'movel(p[0.50000, 0.40000, 0.30000, 0.00000, 3.14159, 0.00000], a=1.2, v=0.25, r=0.0000)' in script
+    assert '  sleep(0.200)\n' in script
+    assert script.endswith('end\n')
+    assert program.waypoint_targets() == [([0.5, 0.4, 0.3], 0.0, 'above')]
+
+
+def test_estimated_duration_adds_segments_and_actions():
+    program = MotionProgram('move')
+    program.movel(_pose(1.5, 0.0, 0.0), 1.0, 0.5)
+    program.sleep(1.0)
+    # 1 m at 0.5 m/s, 1 m/s^2 = 2.5 s, plus the sleep
+    assert program.estimated_duration(_pose(0.5, 0.0, 0.0)) == pytest.approx(3.5)
+
+
+def test_blended_program_passes_every_waypoint(sim_link):
+    sim, reader, channel = sim_link
+    program = MotionProgram('pick')
+    for z, label in ((0.25, 'approach'), (0.2, 'pick')):
+        program.movel([0.5, 0.4, z, *ORIENTATION], 1.2, 0.25, 0.01, label)
+    program.script('rq_close()', sim.gripper_time)
+    program.movel([0.5, 0.4, 0.3, *ORIENTATION], 1.2, 0.25, 0.0, 'lift')
+
+    start = reader.latest()['pose']
+    passed_labels = []
+    channel.send(program.render(start), wait_sent=True, timeout=1.0)
+    outcome, state, passed = reader.wait_for_program(
+        program.waypoint_targets(start), tolerance=0.002, timeout=5.0,
+        on_waypoint=lambda index, label, state: passed_labels.append(label))
+    assert outcome == MOTION_REACHED
+    assert passed_labels == ['approach', 'pick', 'lift']
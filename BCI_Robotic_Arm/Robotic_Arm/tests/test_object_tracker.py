@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from object_tracker import ObjectTracker, iou_matrix
+
+
+def _texture(seed=0):
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur((rng.random((240, 320)) * 255).astype(np.uint8), (5, 5), 0)
+
+
+def _detection(bbox, cls='cup'):
+    return {'class': cls, 'confidence': 0.9, 'bbox': bbox}
+
+
+def test_iou_matrix():
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10]])
+    ious = iou_matrix(boxes, boxes)
+    assert ious[0, 0] == pytest.approx(1.0)
+    assert ious[0, 1] == pytest.approx(50 / 150)
+    assert iou_matrix(boxes, np.empty((0, 4))).shape == (2, 0)
+
+
+def test_points_are_seeded_inside_the_box():
+    tracker = ObjectTracker()
+    tracker.update(_texture(), [_detection((100, 80, 180, 160))])
+    points = tracker.tracks[0]['points'].reshape(-1, 2)
+    assert len(points) > tracker.min_points
+    assert points[:, 0].min() >= 100 and points[:, 0].max() < 180
+    assert points[:, 1].min() >= 80 and points[:, 1].max() < 160
+
+
+def test_track_follows_motion_and_keeps_ids():
+    tracker = ObjectTracker()
+    frame = _texture()
+    track_id = tracker.update(frame, [_detection((100, 80, 180, 160))], frame_seq=1)[0]['track_id']
+    tracked = tracker.track(np.roll(frame, 4, axis=1), frame_seq=2)
+    assert tracked[0]['bbox'] == (104, 80, 184, 160)
+    assert tracked[0]['track_id'] == track_id and tracked[0]['tracked']
+
+    redetected = tracker.update(frame, [_detection((106, 82, 186, 162))], frame_seq=3)
+    assert redetected[0]['track_id'] == track_id
+
+
+def test_frame_gap_forces_a_detection():
+    tracker = ObjectTracker(max_frame_gap=3)
+    frame = _texture()
+    tracker.update(frame, [_detection((100, 80, 180, 160))], frame_seq=10)
+    assert tracker.track(frame, frame_seq=20) == []
+    assert tracker.needs_detection(0.5)
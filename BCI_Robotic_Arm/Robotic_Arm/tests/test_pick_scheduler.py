@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import pytest
+
+from pick_scheduler import EXACT_LIMIT, PickScheduler, plan_order, route_length
+
+
+def _objects(count, seed=0):
+    rng = random.Random(seed)
+    bins = [(0.0, 400.0), (600.0, 400.0), (300.0, -200.0)]
+    return [{'id': i, 'pick_mm': (rng.uniform(0, 600), rng.uniform(0, 600)),
+             'bin_mm': bins[i % len(bins)]} for i in range(count)]
+
+
+def _brute_force(start, objects):
+    return min(route_length(start, order) for order in itertools.permutations(objects))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_exact_order_is_optimal(seed):
+    objects = _objects(6, seed)
+    start = (300.0, 300.0)
+    planned = plan_order(start, objects)
+    assert sorted(o['id'] for o in planned) == list(range(6))
+    assert route_length(start, planned) == pytest.approx(_brute_force(start, objects))
+
+
+def test_heuristic_beats_detection_order_for_many_objects():
+    objects = _objects(EXACT_LIMIT + 3, seed=1)
+    start = (0.0, 0.0)
+    planned = plan_order(start, objects)
+    assert sorted(o['id'] for o in planned) == [o['id'] for o in objects]
+    assert route_length(start, planned) <= route_length(start, objects)
+
+
+def test_trivial_plans():
+    assert plan_order((0, 0), []) == []
+    one = _objects(1)
+    assert plan_order((0, 0), one) == one
+
+
+def test_scheduler_replans_only_when_the_object_set_changes():
+    scheduler = PickScheduler()
+    objects = _objects(4)
+    first = scheduler.update((0, 0), objects)
+    assert scheduler.replans == 1
+
+    # Same ids, refined positions: the order is kept and positions refreshed
+    moved = [dict(o, pick_mm=(o['pick_mm'][0] + 1, o['pick_mm'][1])) for o in objects]
+    second = scheduler.update((500, 500), moved)
+    assert scheduler.replans == 1
+    assert [o['id'] for o in second] == [o['id'] for o in first]
+    assert second[0]['pick_mm'][0] == pytest.approx(first[0]['pick_mm'][0] + 1)
+
+    scheduler.update((0, 0), objects[1:])
+    assert scheduler.replans == 2
+    assert scheduler.next((0, 0), []) is None
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from pipeline import DropOldestQueue, PipelineStage
+
+
+def test_full_queue_drops_the_oldest_item():
+    queue = DropOldestQueue(maxsize=2)
+    for item in range(4):
+        queue.put(item)
+    assert queue.dropped == 2
+    assert len(queue) == 2
+    assert [queue.get_nowait(), queue.get_nowait(), queue.get_nowait()] == [2, 3, None]
+
+
+def test_get_waits_for_an_item_or_times_out():
+    queue = DropOldestQueue()
+    assert queue.get(timeout=0.01) is None
+    threading.Timer(0.02, queue.put, args=('frame',)).start()
+    assert queue.get(timeout=1.0) == 'frame'
+
+
+def test_stage_pushes_results_to_every_output():
+    source, left, right = DropOldestQueue(), DropOldestQueue(), DropOldestQueue()
+    stage = PipelineStage('double', lambda item: item * 2, source, outputs=[left, right])
+    source.put(21)
+    assert stage.run_once(timeout=0.1)
+    assert left.get_nowait() == 42 and right.get_nowait() == 42
+    assert not stage.run_once(timeout=0.01)  # Nothing queued
+
+
+def test_stage_survives_errors():
+    source = DropOldestQueue()
+    stage = PipelineStage('broken', lambda item: 1 / item, source)
+    source.put(0)
+    started = time.monotonic()
+    assert not stage.run_once(timeout=0.1)
+    assert stage.stats.errors == 1
+    assert time.monotonic() - started < 1.0
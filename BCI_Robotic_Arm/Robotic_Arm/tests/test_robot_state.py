@@ -0,0 +1,145 @@
+import math
+import struct
+import threading
+import time
+
+import pytest
+
+from robot_state import (PACKET_SIZE, OFFSET_CONTROLLER_TIME, OFFSET_TCP_POSE,
+                         OFFSET_TCP_SPEED, OFFSET_DIGITAL_INPUTS, OFFSET_SAFETY_MODE,
+                         OFFSET_PROGRAM_STATE, OFFSET_SPEED_SCALING, MOTION_REACHED,
+                         PROGRAM_STATE_PLAYING, PROGRAM_STATE_STOPPED, SAFETY_MODE_NORMAL,
+                         SAFETY_MODE_PROTECTIVE_STOP, RobotStateReader, estimate_move_duration,
+                         extrapolate_pose, interpolate_pose, is_safety_stop, parse_state_packet)
+
+
+def _packet(pose, speed=(0.0,) * 6, controller_time=1.5, inputs=0, safety=1, program=1):
+    packet = bytearray(PACKET_SIZE)
+    struct.pack_into('>i', packet, 0, PACKET_SIZE)
+    struct.pack_into('>d', packet, OFFSET_CONTROLLER_TIME, controller_time)
+    struct.pack_into('>6d', packet, OFFSET_TCP_POSE, *pose)
+    struct.pack_into('>6d', packet, OFFSET_TCP_SPEED, *speed)
+    struct.pack_into('>d', packet, OFFSET_DIGITAL_INPUTS, float(inputs))
+    struct.pack_into('>d', packet, OFFSET_SAFETY_MODE, float(safety))
+    struct.pack_into('>d', packet, OFFSET_SPEED_SCALING, 0.5)
+    struct.pack_into('>d', packet, OFFSET_PROGRAM_STATE, float(program))
+    return bytes(packet)
+
+
+def _state(t, x, speed=0.0, rz=0.0):
+    return {'timestamp': t, 'measured_at': t, 'pose': [x, 0.0, 0.3, 0.0, 0.0, rz],
+            'tcp_speed': [speed, 0.0, 0.0, 0.0, 0.0, 0.0]}
+
+
+def test_parse_state_packet_reads_documented_offsets():
+    pose = [0.1, -0.2, 0.3, 1.0, -2.0, 0.5]
+    speed = [0.01, 0.02, 0.03, 0.0, 0.0, 0.1]
+    state = parse_state_packet(_packet(pose, speed, controller_time=12.25, inputs=1 << 16,
+                                       safety=SAFETY_MODE_PROTECTIVE_STOP,
+                                       program=PROGRAM_STATE_PLAYING), received_at=7.0)
+    assert state['timestamp'] == 7.0
+    assert state['controller_time'] == 12.25
+    assert state['pose'] == pose
+    assert state['tcp_speed'] == speed
+    assert state['digital_inputs'] == 1 << 16
+    assert state['safety_mode'] == SAFETY_MODE_PROTECTIVE_STOP
+    assert state['speed_scaling'] == 0.5
+    assert state['program_state'] == PROGRAM_STATE_PLAYING
+    assert is_safety_stop(state)
+
+
+def test_parse_state_packet_rejects_short_packets():
+    assert parse_state_packet(_packet([0.0] * 6)[:PACKET_SIZE - 1], 0.0) is None
+
+
+def test_interpolate_pose_slerps_orientation():
+    a = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    b = [1.0, 2.0, 0.0, 0.0, 0.0, math.pi / 2]
+    mid = interpolate_pose(a, b, 0.5)
+    assert mid[:3] == pytest.approx([0.5, 1.0, 0.0])
+    assert mid[3:] == pytest.approx([0.0, 0.0, math.pi / 4])
+    assert interpolate_pose(a, b, 1.0) == pytest.approx(b)
+
+
+def test_interpolate_pose_keeps_rotvec_representation_near_180_degrees():
+    # Same rotation, opposite representations: the result must stay on pose_a's side
+    a = [0.0, 0.0, 0.0, 0.0, 3.1, 0.0]
+    b = [0.0, 0.0, 0.0, 0.0, -(2 * math.pi - 3.12), 0.0]
+    mid = interpolate_pose(a, b, 0.5)
+    assert mid[4] == pytest.approx(3.11, abs=1e-6)
+
+
+def test_extrapolate_pose_uses_tcp_speed():
+    pose = [0.0, 0.0, 0.2, 0.0, 0.0, 0.0]
+    moved = extrapolate_pose(pose, [0.1, 0.0, -0.05, 0.0, 0.0, 1.0], 0.5)
+    assert moved == pytest.approx([0.05, 0.0, 0.175, 0.0, 0.0, 0.5])
+
+
+def test_estimate_move_duration_profiles():
+    # Trapezoid: 1 m at 0.5 m/s, 1 m/s^2 -> 2 s cruise + 0.5 s ramps
+    assert estimate_move_duration(1.0, 0.5, 1.0) == pytest.approx(2.5)
+    # Triangle: never reaches cruise speed
+    assert estimate_move_duration(0.01, 0.5, 1.0) == pytest.approx(0.2)
+    assert estimate_move_duration(0.0, 0.5, 1.0) == 0.0
+    assert estimate_move_duration(1.0, 0.0, 1.0) == math.inf
+
+
+def test_pose_at_interpolates_between_buffered_states():
+    reader = RobotStateReader('127.0.0.1')
+    reader._history.extend([_state(10.0, 0.0), _state(10.008, 0.008, speed=1.0)])
+    assert reader.pose_at(10.004)[0] == pytest.approx(0.004)
+    assert reader.pose_at(9.0) is None
+    # Past the newest state: extrapolated with the TCP speed, within the limit only
+    assert reader.pose_at(10.018)[0] == pytest.approx(0.018)
+    assert reader.pose_at(10.2) is None
+
+
+def _publish_batch(reader, states, delay=0.05):
+    """Deliver states in one locked batch, as if they landed before the waiter woke up"""
+    def _publish():
+        time.sleep(delay)
+        with reader._new_state:
+            for state in states:
+                reader._latest = state
+                reader._history.append(state)
+                reader.packets_received += 1
+            reader._new_state.notify_all()
+
+    threading.Thread(target=_publish, daemon=True).start()
+
+
+def test_wait_for_sees_every_state_not_just_the_newest():
+    reader = RobotStateReader('127.0.0.1')
+    reader.running = True
+    seen = []
+    _publish_batch(reader, [_state(1.0 + i * 0.008, 0.0, speed=speed)
+                            for i, speed in enumerate((0.0, 0.2, 0.0))])
+
+    def _moving(state):
+        seen.append(state['timestamp'])
+        return state['tcp_speed'][0] > 0.1
+
+    state = reader.wait_for(_moving, timeout=2.0)
+    assert state is not None and state['timestamp'] == pytest.approx(1.008)
+    assert seen == pytest.approx([1.0, 1.008])
+
+
+def test_wait_for_program_reports_every_waypoint_of_a_batch():
+    reader = RobotStateReader('127.0.0.1')
+    reader.running = True
+    batch = []
+    for i, (x, program) in enumerate(((0.1, PROGRAM_STATE_PLAYING), (0.2, PROGRAM_STATE_PLAYING),
+                                      (0.25, PROGRAM_STATE_STOPPED))):
+        state = _state(1.0 + i * 0.008, x)
+        state.update(program_state=program, safety_mode=SAFETY_MODE_NORMAL)
+        batch.append(state)
+    _publish_batch(reader, batch)
+
+    passed_labels = []
+    waypoints = [([0.1, 0.0, 0.3], 0.0, 'a'), ([0.2, 0.0, 0.3], 0.0, 'b')]
+    outcome, _, passed = reader.wait_for_program(
+        waypoints, tolerance=0.001, timeout=2.0,
+        on_waypoint=lambda index, label, state: passed_labels.append(label))
+    assert outcome == MOTION_REACHED
+    assert passed == 2
+    assert passed_labels == ['a', 'b']
@@ -0,0 +1,86 @@
+"""Control path against the local UR simulator (no hardware)"""
+
+import math
+import threading
+
+import complete_pick_and_place_system as system
+from robot_state import (MOTION_REACHED, MOTION_STOPPED, MOTION_PROGRAM_STOPPED,
+                         MOTION_PROTECTIVE_STOP, RobotStateReader, tcp_speed_norm)
+from ur_simulator import parse_call
+from urscript_channel import URScriptChannel
+
+from conftest import START_POSE
+
+ORIENTATION = START_POSE[3:]
+
+
+def _movel(x, y, z, v=0.25, a=1.2):
+    return f"movel(p[{x}, {y}, {z}, {', '.join(map(str, ORIENTATION))}], a={a}, v={v})\n"
+
+
+def _distance(pose, target):
+    return math.sqrt(sum((pose[i] - target[i]) ** 2 for i in range(3)))
+
+
+def test_parse_call():
+    assert parse_call("movel(p[0.1, 0.2, 0.3, 0, 3.14, 0], a=1.2, v=0.25)") == \
+        ('movel', [[0.1, 0.2, 0.3, 0.0, 3.14, 0.0]], {'a': 1.2, 'v': 0.25})
+    assert parse_call("textmsg(\"a, b\")") == ('textmsg', ['a, b'], {})
+    assert parse_call("x = 1") is None
+
+
+def test_movel_reaches_the_target(sim_link):
+    sim, reader, channel = sim_link
+    target = [0.55, 0.38, 0.28]
+    assert channel.send(_movel(*target), wait_sent=True, timeout=1.0)
+    outcome, state = reader.wait_for_motion(target=target, tolerance=0.001, timeout=5.0)
+    assert outcome == MOTION_REACHED
+    assert _distance(state['pose'], target) <= 0.001
+    assert _distance(sim.pose(), target) <= 0.001
+
+
+def test_stopl_halts_the_arm(sim_link):
+    sim, reader, channel = sim_link
+    target = [0.5, 0.4, 0.0]  # 0.3 m at 0.1 m/s: ~3 s
+    channel.send(_movel(*target, v=0.1), wait_sent=True, timeout=1.0)
+    assert reader.wait_for(lambda s: tcp_speed_norm(s) > 0.05, timeout=2.0) is not None
+
+    assert channel.send_urgent("stopl(2.0)\n")
+    outcome, state = reader.wait_for_motion(timeout=2.0)
+    assert outcome in (MOTION_STOPPED, MOTION_PROGRAM_STOPPED)
+    resting = reader.wait_for(lambda s: tcp_speed_norm(s) < 1e-4, timeout=1.0)
+    assert resting is not None
+    assert _distance(resting['pose'], target) > 0.1
+    assert resting['pose'][2] < START_POSE[2]
+
+
+def test_protective_stop_is_reported(sim_link):
+    sim, reader, channel = sim_link
+    channel.send(_movel(0.5, 0.4, 0.1, v=0.1), wait_sent=True, timeout=1.0)
+    assert reader.wait_for(lambda s: tcp_speed_norm(s) > 0.05, timeout=2.0) is not None
+    sim.trigger_protective_stop()
+    outcome, _ = reader.wait_for_motion(target=[0.5, 0.4, 0.1], timeout=2.0)
+    assert outcome == MOTION_PROTECTIVE_STOP
+
+
+def test_move_to_pose_and_stop_motion(simulator):
+    robot = system.EnhancedRobotController('127.0.0.1', gripper_enabled=False)
+    robot.state_reader = RobotStateReader('127.0.0.1', port=simulator.realtime_port)
+    robot.command_channel = URScriptChannel('127.0.0.1', port=simulator.script_port)
+    robot.orientation = list(ORIENTATION)  # Pure translations: timed by distance alone
+    try:
+        assert robot.connect(gripper=False)
+        target = [0.55, 0.42, 0.25]
+        assert robot.move_to_pose(*target, wait=True)
+        assert _distance(robot.get_robot_pose(), target) <= robot.position_tolerance
+
+        # A long slow move, stopped from another thread while it runs
+        robot.velocity = 0.05
+        timer = threading.Timer(0.5, robot.stop_motion)
+        timer.start()
+        assert not robot.move_to_pose(0.55, 0.42, 0.05, wait=True)
+        timer.join()
+        resting = robot.state_reader.wait_for(lambda s: tcp_speed_norm(s) < 1e-4, timeout=1.0)
+        assert resting is not None and resting['pose'][2] > 0.15
+    finally:
+        robot.disconnect()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from world_model import STALE, WorldModel
+
+
+def _det(x, y, cls='cup', confidence=0.8):
+    return {'class': cls, 'target_mm': (x, y), 'confidence': confidence}
+
+
+def test_nearby_detections_merge_into_one_hypothesis():
+    world = WorldModel(merge_radius_mm=40.0)
+    first = world.update([_det(100, 100)])[0]['object_id']
+    second = world.update([_det(110, 100)])[0]['object_id']
+    assert first == second
+    obj = world.objects()[0]
+    assert obj['observations'] == 2
+    assert obj['position_mm'] == pytest.approx((105.0, 100.0))
+
+
+def test_other_class_or_far_detection_is_a_new_object():
+    world = WorldModel(merge_radius_mm=40.0)
+    world.update([_det(100, 100)])
+    world.update([_det(105, 100, cls='can'), _det(300, 100)])
+    assert len(world) == 3
+
+
+def test_misses_in_view_mark_stale_and_detection_revives():
+    world = WorldModel(stale_misses=3)
+    world.update([_det(100, 100)])
+    everything_visible = lambda points: np.ones(len(points), dtype=bool)
+    for _ in range(3):
+        world.update([], in_view=everything_visible)
+    assert len(world) == 0
+    assert world.objects(state=STALE)[0]['misses'] == 3
+
+    world.update([_det(102, 100)])
+    assert len(world) == 1
+
+
+def test_misses_out_of_view_do_not_count():
+    world = WorldModel(stale_misses=1)
+    world.update([_det(100, 100)])
+    world.update([], in_view=lambda points: np.zeros(len(points), dtype=bool))
+    assert len(world) == 1
+
+
+def test_mark_picked_and_nearest_query_across_grid_cells():
+    world = WorldModel(cell_mm=50.0)
+    near = world.update([_det(149, 0)])[0]['object_id']
+    world.update([_det(400, 0)])
+    assert world.nearest((151, 0), max_distance_mm=10)['id'] == near
+    assert world.nearest((0, 0), classes=['can']) is None
+
+    world.mark_picked(position_mm=(140, 0), class_name='cup')
+    assert [obj['position_mm'][0] for obj in world.objects()] == [400.0]
@@ -0,0 +1,677 @@
+"""
+UR CONTROLLER SIMULATOR
+=======================
+Local stand-in for a UR arm so the control path can be run, benchmarked
+and regression-tested without hardware.
+
+- port 30002 accepts URScript (single lines or def ... end programs)
+  and interprets movel / movej / movep / speedl / stopl / stopj / sleep /
+  textmsg and gripper calls (any function with 'grip' in its name, or rq_*);
+  the grip state is reported on tool digital inputs 0/1 like a DH
+  gripper in IO mode (see gripper_feedback.py)
+- port 30003 streams 1060-byte realtime packets at 125 Hz in the layout
+  robot_state.py parses (TCP pose at byte 444)
+- moves follow trapezoidal velocity profiles; a new program replaces the
+  running one, like on the real controller
+- speedl ramps to the commanded TCP speed, holds it for t seconds and
+  then decelerates to rest unless a new command replaced it
+- network latency, jitter and random protective stops are configurable
+
+Simplifications: there is no kinematic model. movej targets must be
+poses (p[...]) and are interpolated in Cartesian space with a duration
+from the joint-space speed limits (travel / 0.5 m reach); joint angles
+are not reported. Blend radii are accepted and ignored.
+
+Usage:
+    python ur_simulator.py --latency-ms 2 --jitter-ms 1 --stop-probability 0.05
+then point config.ROBOT_IP at 127.0.0.1.
+"""
+
+import argparse
+import math
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from robot_state import (PACKET_SIZE, OFFSET_CONTROLLER_TIME, OFFSET_Q_ACTUAL,
+                         OFFSET_TCP_POSE, OFFSET_TCP_SPEED, OFFSET_DIGITAL_INPUTS,
+                         OFFSET_ROBOT_MODE, OFFSET_SAFETY_MODE, OFFSET_SPEED_SCALING,
+                         OFFSET_PROGRAM_STATE, SAFETY_MODE_NORMAL,
+                         SAFETY_MODE_PROTECTIVE_STOP, PROGRAM_STATE_STOPPED,
+                         PROGRAM_STATE_PLAYING, estimate_move_duration)
+from gripper_feedback import (GRIP_MOVING, GRIP_REACHED, GRIP_CAUGHT, GRIP_DROPPED,
+                              encode_tool_inputs)
+
+ROBOT_MODE_RUNNING = 7
+JOINT_REACH = 0.5  # m of TCP travel per rad of joint motion (movej timing)
+
+_CALL = re.compile(r'^\s*([A-Za-z_]\w*)\s*\((.*)\)\s*$')
+
+
+def _split_args(text: str) -> list:
+    """Split a call's argument text on top-level commas"""
+    args, depth, current, quote = [], 0, [], None
+    for ch in text:
+        if quote:
+            current.append(ch)
+            if ch == quote:
+                quote = None
+            continue
+        if ch in '"\'':
+            quote = ch
+        elif ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            args.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if ''.join(current).strip():
+        args.append(''.join(current).strip())
+    return args
+
+
+def _parse_value(text: str):
+    text = text.strip()
+    if text[:1] in '"\'':
+        return text[1:-1]
+    if text.startswith('p['):
+        text = text[1:]
+    if text.startswith('['):
+        return [float(v) for v in text[1:-1].split(',') if v.strip()]
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_call(statement: str) -> Optional[tuple]:
+    """
+    Parse 'name(arg, key=value, ...)'
+    Returns:
+        (name, positional_args, keyword_args) or None if not a function call
+    """
+    match = _CALL.match(statement)
+    if not match:
+        return None
+    name, body = match.groups()
+    positional, keywords = [], {}
+    for arg in _split_args(body):
+        key, sep, value = arg.partition('=')
+        if sep and re.fullmatch(r'[A-Za-z_]\w*', key.strip()):
+            keywords[key.strip()] = _parse_value(value)
+        else:
+            positional.append(_parse_value(arg))
+    return name, positional, keywords
+
+
+def _trapezoid(distance: float, velocity: float, acceleration: float) -> tuple:
+    """(duration, ramp_time, peak_velocity) of a rest-to-rest move"""
+    if distance <= 0:
+        return 0.0, 0.0, 0.0
+    duration = estimate_move_duration(distance, velocity, acceleration)
+    if distance >= velocity ** 2 / acceleration:
+        return duration, velocity / acceleration, velocity
+    peak = math.sqrt(distance * acceleration)
+    return duration, peak / acceleration, peak
+
+
+class _Segment:
+    """One straight-line motion: position along the path as a function of time"""
+
+    def __init__(self, start, end, t0: float, length: float, velocity: float,
+                 acceleration: float, initial_speed: float = 0.0):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.delta = np.asarray(end, dtype=np.float64) - self.start
+        self.t0 = t0
+        self.length = length
+        self.acceleration = acceleration
+        self.initial_speed = initial_speed
+        if initial_speed > 0:
+            # Deceleration to rest (stopl / stopj)
+            self.duration = initial_speed / acceleration
+            self.ramp, self.peak = 0.0, initial_speed
+        else:
+            self.duration, self.ramp, self.peak = _trapezoid(length, velocity, acceleration)
+
+    @classmethod
+    def hold(cls, pose, t0: float) -> "_Segment":
+        return cls(pose, pose, t0, 0.0, 1.0, 1.0)
+
+    @property
+    def end_time(self) -> float:
+        return self.t0 + self.duration
+
+    def _progress(self, t: float) -> tuple:
+        """(path position, path speed) at time t"""
+        t = t - self.t0
+        a = self.acceleration
+        if self.length <= 0 or t >= self.duration:
+            return self.length, 0.0
+        if t <= 0:
+            return 0.0, self.initial_speed
+        if self.initial_speed > 0:
+            return self.initial_speed * t - 0.5 * a * t * t, self.initial_speed - a * t
+        if t < self.ramp:
+            return 0.5 * a * t * t, a * t
+        remaining = self.duration - t
+        if remaining < self.ramp:
+            return self.length - 0.5 * a * remaining * remaining, a * remaining
+        return 0.5 * a * self.ramp ** 2 + self.peak * (t - self.ramp), self.peak
+
+    def state_at(self, t: float) -> tuple:
+        """(pose, tcp_speed) at time t"""
+        if self.length <= 0:
+            return self.start.copy(), np.zeros(6)
+        s, speed = self._progress(t)
+        direction = self.delta / self.length
+        return self.start + direction * s, direction * speed
+
+
+class _VelocitySegment:
+    """speedl: ramp from the current TCP speed to a target speed, keep it for
+    `duration` seconds, then decelerate to rest (the function returned)"""
+
+    def __init__(self, start, initial_speed, target_speed, t0: float,
+                 acceleration: float, duration: float):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.v0 = np.asarray(initial_speed, dtype=np.float64)
+        self.v1 = np.asarray(target_speed, dtype=np.float64)
+        self.t0 = t0
+        self.acceleration = acceleration
+        self.hold = duration
+        change = float(np.linalg.norm(self.v1[:3] - self.v0[:3]))
+        self.ramp = change / acceleration if change > 0 else 0.0
+        self.v_end, _ = self._commanded(duration) if math.isfinite(duration) else (self.v1, None)
+        self.stop_time = float(np.linalg.norm(self.v_end[:3])) / acceleration
+        self.duration = duration + self.stop_time
+
+    @property
+    def end_time(self) -> float:
+        return self.t0 + self.duration
+
+    def _commanded(self, t: float) -> tuple:
+        """(speed, displacement) while the speed command is active"""
+        if self.ramp > 0 and t < self.ramp:
+            dv = self.v1 - self.v0
+            return self.v0 + dv * (t / self.ramp), self.v0 * t + dv * (t * t / (2 * self.ramp))
+        ramp_distance = (self.v0 + self.v1) * (self.ramp / 2)
+        return self.v1.copy(), ramp_distance + self.v1 * (t - self.ramp)
+
+    def state_at(self, t: float) -> tuple:
+        """(pose, tcp_speed) at time t"""
+        t = max(t - self.t0, 0.0)
+        if t <= self.hold:
+            speed, moved = self._commanded(t)
+            return self.start + moved, speed
+        _, moved = self._commanded(self.hold)
+        s = min(t - self.hold, self.stop_time)
+        if self.stop_time <= 0:
+            return self.start + moved, np.zeros(6)
+        fraction = s / self.stop_time
+        moved = moved + self.v_end * (s - s * fraction / 2)
+        return self.start + moved, self.v_end * (1.0 - fraction)
+
+
+class URSimulator:
+    """
+    Simulated UR controller serving the URScript and realtime ports
+    Args:
+        host: Interface to listen on
+        script_port: URScript port (30002 on a real controller)
+        realtime_port: Realtime state port (30003)
+        start_pose: Initial TCP pose [X, Y, Z, RX, RY, RZ]
+        latency: One-way network latency (s), applied to scripts and state
+        jitter: Extra random delay (s), uniform in [0, jitter]
+        stop_probability: Chance that a move ends in a protective stop
+        stop_recovery: Time (s) until a protective stop clears by itself
+        speed_scaling: Speed slider (0-1], scales velocities like the pendant
+        gripper_time: Duration of a gripper open/close (s)
+        object_present: Report an object in the gripper after closing
+        seed: Random seed for jitter and protective stops
+    """
+
+    def __init__(self, host: str = '127.0.0.1', script_port: int = 30002,
+                 realtime_port: int = 30003, start_pose: list = None,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 stop_probability: float = 0.0, stop_recovery: float = 2.0,
+                 speed_scaling: float = 1.0, gripper_time: float = 0.6,
+                 object_present: bool = True, seed: Optional[int] = None,
+                 verbose: bool = True):
+        self.host = host
+        self.script_port = script_port
+        self.realtime_port = realtime_port
+        self.latency = latency
+        self.jitter = jitter
+        self.stop_probability = stop_probability
+        self.stop_recovery = stop_recovery
+        self.speed_scaling = speed_scaling
+        self.gripper_time = gripper_time
+        self.object_present = object_present
+        self.verbose = verbose
+        self._random = random.Random(seed)
+
+        start_pose = start_pose or [0.7289, 0.5731, 0.1988, -2.8246, -1.3081, -0.0257]
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._started_at = time.monotonic()
+        self._segment = _Segment.hold(start_pose, self._started_at)
+        self._safety_mode = SAFETY_MODE_NORMAL
+        self._stop_until = 0.0
+        self._stop_at = None  # Pending protective stop time of the current move
+        self._program_generation = 0
+        self._program_running = False
+        self._gripper_closed = False
+        self._gripper_done_at = 0.0
+        self._object_dropped = False
+
+        self.running = False
+        self._servers = []
+        self._threads = []
+
+        # Statistics
+        self.scripts_received = 0
+        self.moves_executed = 0
+        self.protective_stops = 0
+        self.packets_sent = 0
+
+    # ------------------------------------------------------------------ servers
+
+    def start(self):
+        """Open both ports and start serving (no-op if already running)"""
+        if self.running:
+            return
+        self.running = True
+        for port, handler in ((self.script_port, self._serve_script),
+                              (self.realtime_port, self._serve_realtime)):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((self.host, port))
+            server.listen(8)
+            server.settimeout(0.5)
+            self._servers.append(server)
+            thread = threading.Thread(target=self._accept_loop, args=(server, handler), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._log(f"🤖 UR simulator on {self.host} (script {self.script_port}, "
+                  f"realtime {self.realtime_port})")
+
+    def stop(self):
+        """Close the ports and abort the running program"""
+        self.running = False
+        with self._wakeup:
+            self._program_generation += 1
+            self._wakeup.notify_all()
+        for server in self._servers:
+            server.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._servers = []
+        self._threads = []
+
+    def _accept_loop(self, server, handler):
+        while self.running:
+            try:
+                conn, addr = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=handler, args=(conn, addr), daemon=True).start()
+
+    def _network_delay(self) -> float:
+        return self.latency + (self._random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+
+    def _serve_script(self, conn, addr):
+        buffer = b''
+        block = []
+        depth = 0
+        conn.settimeout(0.5)
+        try:
+            while self.running:
+                try:
+                    chunk = conn.recv(4096)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    break
+                buffer += chunk
+                while b'\n' in buffer:
+                    raw, buffer = buffer.split(b'\n', 1)
+                    line = raw.decode('utf-8', errors='replace').strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    # Collect def/sec ... end blocks into one program
+                    if depth == 0 and not re.match(r'^(def|sec)\s', line):
+                        self._deliver([line], secondary=False)
+                        continue
+                    block.append(line)
+                    if line.endswith(':'):
+                        depth += 1
+                    elif line == 'end':
+                        depth -= 1
+                    if depth == 0:
+                        self._deliver(block, secondary=block[0].startswith('sec'))
+                        block = []
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _deliver(self, lines: list, secondary: bool):
+        delay = self._network_delay()
+        if delay > 0:
+            time.sleep(delay)  # Per connection, so ordering is preserved
+        self.scripts_received += 1
+        if lines[0].endswith(':'):
+            lines = [l for l in lines[1:] if l != 'end']
+        if secondary:
+            threading.Thread(target=self._run_statements, args=(lines, None), daemon=True).start()
+            return
+        with self._wakeup:
+            # A new program replaces the running one
+            self._program_generation += 1
+            generation = self._program_generation
+            self._wakeup.notify_all()
+        threading.Thread(target=self._run_program, args=(lines, generation), daemon=True).start()
+
+    def _serve_realtime(self, conn, addr):
+        period = 1.0 / 125
+        next_tick = time.monotonic()
+        packet = bytearray(PACKET_SIZE)
+        try:
+            while self.running:
+                next_tick += period
+                sleep = next_tick - time.monotonic()
+                if sleep > 0:
+                    time.sleep(sleep)
+                else:
+                    next_tick = time.monotonic()  # Fell behind - don't burst
+                if self.jitter:
+                    time.sleep(self._random.uniform(0.0, self.jitter))
+                # The packet leaves now but describes the robot `latency` ago
+                self._build_packet(packet, time.monotonic() - self.latency)
+                conn.sendall(packet)
+                self.packets_sent += 1
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ state
+
+    def state_at(self, t: float) -> dict:
+        """Simulated robot state at monotonic time t"""
+        with self._lock:
+            self._check_protective_stop(t)
+            pose, speed = self._segment.state_at(t)
+            if t < self._gripper_done_at:
+                grip = GRIP_MOVING
+            elif not (self._gripper_closed and self.object_present):
+                grip = GRIP_REACHED
+            else:
+                grip = GRIP_DROPPED if self._object_dropped else GRIP_CAUGHT
+            if self._safety_mode != SAFETY_MODE_NORMAL and t >= self._stop_until:
+                self._safety_mode = SAFETY_MODE_NORMAL
+            return {
+                'pose': pose,
+                'tcp_speed': speed,
+                'digital_inputs': encode_tool_inputs(grip),
+                'safety_mode': self._safety_mode,
+                'program_state': PROGRAM_STATE_PLAYING if self._program_running else PROGRAM_STATE_STOPPED,
+            }
+
+    def _build_packet(self, packet: bytearray, t: float):
+        state = self.state_at(t)
+        struct.pack_into('>i', packet, 0, PACKET_SIZE)
+        struct.pack_into('>d', packet, OFFSET_CONTROLLER_TIME, t - self._started_at)
+        struct.pack_into('>6d', packet, OFFSET_Q_ACTUAL, *([0.0] * 6))
+        struct.pack_into('>6d', packet, OFFSET_TCP_POSE, *state['pose'])
+        struct.pack_into('>6d', packet, OFFSET_TCP_SPEED, *state['tcp_speed'])
+        struct.pack_into('>d', packet, OFFSET_DIGITAL_INPUTS, float(state['digital_inputs']))
+        struct.pack_into('>d', packet, OFFSET_ROBOT_MODE, float(ROBOT_MODE_RUNNING))
+        struct.pack_into('>d', packet, OFFSET_SAFETY_MODE, float(state['safety_mode']))
+        struct.pack_into('>d', packet, OFFSET_SPEED_SCALING, self.speed_scaling)
+        struct.pack_into('>d', packet, OFFSET_PROGRAM_STATE, float(state['program_state']))
+
+    def _check_protective_stop(self, t: float):
+        # Called with the lock held
+        if self._stop_at is None or t < self._stop_at:
+            return
+        pose, _ = self._segment.state_at(self._stop_at)
+        self._segment = _Segment.hold(pose, self._stop_at)
+        self._stop_at = None
+        self._safety_mode = SAFETY_MODE_PROTECTIVE_STOP
+        self._stop_until = t + self.stop_recovery
+        self._program_generation += 1  # Program is aborted
+        self._program_running = False
+        self.protective_stops += 1
+        self._wakeup.notify_all()
+        self._log(f"💥 Protective stop at X={pose[0]:.3f}m, Y={pose[1]:.3f}m, Z={pose[2]:.3f}m")
+
+    def trigger_protective_stop(self):
+        """Force a protective stop now"""
+        with self._lock:
+            self._stop_at = time.monotonic()
+            self._check_protective_stop(self._stop_at)
+
+    def drop_object(self):
+        """Let the gripped object slip out (grip state -> dropped)"""
+        with self._lock:
+            self._object_dropped = self._gripper_closed and self.object_present
+
+    def pose(self) -> list:
+        return self.state_at(time.monotonic())['pose'].tolist()
+
+    # ------------------------------------------------------------------ programs
+
+    def _run_program(self, lines: list, generation: int):
+        with self._lock:
+            if generation != self._program_generation:
+                return
+            self._program_running = True
+        try:
+            self._run_statements(lines, generation)
+        finally:
+            with self._lock:
+                if generation == self._program_generation:
+                    self._program_running = False
+                    self._stop_at = None
+
+    def _current(self, generation: Optional[int]) -> bool:
+        return self.running and (generation is None or generation == self._program_generation)
+
+    def _wait_until(self, deadline: float, generation: Optional[int]) -> bool:
+        """Sleep until deadline; False if the program was replaced or aborted"""
+        with self._wakeup:
+            while self._current(generation):
+                now = time.monotonic()
+                self._check_protective_stop(now)
+                if not self._current(generation):
+                    break
+                if now >= deadline:
+                    return True
+                wait = deadline - now
+                if self._stop_at is not None:
+                    wait = min(wait, max(self._stop_at - now, 0.0))
+                self._wakeup.wait(min(wait, 0.05))
+        return False
+
+    def _run_statements(self, lines: list, generation: Optional[int]):
+        for line in lines:
+            if not self._current(generation):
+                return
+            call = parse_call(line)
+            if call is None:
+                continue  # Assignments, control flow: not interpreted
+            name, args, kwargs = call
+            if name in ('movel', 'movej', 'movep'):
+                self._move(name, args, kwargs, generation)
+            elif name in ('stopl', 'stopj'):
+                self._stop(name, args, kwargs, generation)
+            elif name == 'speedl':
+                self._speed(args, kwargs, generation)
+            elif name == 'sleep':
+                self._wait_until(time.monotonic() + float(args[0]), generation)
+            elif name == 'textmsg':
+                self._log(f"💬 textmsg: {' '.join(str(a) for a in args)}")
+            elif 'grip' in name.lower() or name.startswith('rq_'):
+                self._gripper(name, args, generation)
+
+    def _move(self, name: str, args: list, kwargs: dict, generation: Optional[int]):
+        target = args[0] if args else kwargs.get('pose')
+        if not isinstance(target, list) or len(target) != 6:
+            self._log(f"⚠️ {name}: only pose targets p[...] are simulated")
+            return
+        linear = name != 'movej'
+        acceleration = float(kwargs.get('a', args[1] if len(args) > 1 else (1.2 if linear else 1.4)))
+        velocity = float(kwargs.get('v', args[2] if len(args) > 2 else (0.25 if linear else 1.05)))
+        scale = self.speed_scaling
+
+        with self._wakeup:
+            now = time.monotonic()
+            self._check_protective_stop(now)
+            if self._safety_mode != SAFETY_MODE_NORMAL:
+                self._log(f"⚠️ {name} ignored - robot in protective stop")
+                self._program_generation += 1
+                self._program_running = False
+                return
+            start, _ = self._segment.state_at(now)
+            target = np.asarray(target, dtype=np.float64)
+            position = np.linalg.norm(target[:3] - start[:3])
+            rotation = np.linalg.norm(target[3:] - start[3:])
+            if linear:
+                # Orientation-only moves are timed as if the TCP travelled 0.1 m per rad
+                length = max(position, rotation * 0.1)
+            else:
+                length = max(position / JOINT_REACH, rotation)
+            segment = _Segment(start, target, now, length, velocity * scale,
+                               acceleration * scale * scale)
+            self._segment = segment
+            self._stop_at = None
+            if self.stop_probability and self._random.random() < self.stop_probability:
+                self._stop_at = now + self._random.uniform(0.2, 0.8) * segment.duration
+            self.moves_executed += 1
+            self._wakeup.notify_all()
+        self._wait_until(segment.end_time, generation)
+
+    def _speed(self, args: list, kwargs: dict, generation: Optional[int]):
+        speed = args[0] if args else kwargs.get('xd')
+        if not isinstance(speed, list) or len(speed) != 6:
+            self._log("⚠️ speedl: expected a 6-element speed vector")
+            return
+        acceleration = float(kwargs.get('a', args[1] if len(args) > 1 else 0.5))
+        duration = float(kwargs.get('t', args[2] if len(args) > 2 else math.inf))
+        scale = self.speed_scaling
+
+        with self._wakeup:
+            now = time.monotonic()
+            self._check_protective_stop(now)
+            if self._safety_mode != SAFETY_MODE_NORMAL:
+                self._log("⚠️ speedl ignored - robot in protective stop")
+                self._program_generation += 1
+                self._program_running = False
+                return
+            pose, current = self._segment.state_at(now)
+            segment = _VelocitySegment(pose, current, np.asarray(speed, dtype=np.float64) * scale,
+                                       now, acceleration * scale * scale, duration)
+            self._segment = segment
+            self._stop_at = None
+            self._wakeup.notify_all()
+        # The function returns after t; the arm then stops (program end)
+        self._wait_until(now + duration, generation)
+
+    def _stop(self, name: str, args: list, kwargs: dict, generation: Optional[int]):
+        deceleration = float(kwargs.get('a', args[0] if args else 1.2))
+        with self._wakeup:
+            now = time.monotonic()
+            pose, speed = self._segment.state_at(now)
+            self._stop_at = None
+            if name == 'stopj':
+                deceleration *= JOINT_REACH
+            linear_speed = float(np.linalg.norm(speed[:3]))
+            if linear_speed < 1e-6:
+                self._segment = _Segment.hold(pose, now)
+                return
+            duration = linear_speed / deceleration
+            end = pose + speed * (duration / 2)  # Distance under linear deceleration
+            self._segment = _Segment(pose, end, now, linear_speed * duration / 2,
+                                     linear_speed, deceleration, initial_speed=linear_speed)
+            self._wakeup.notify_all()
+            end_time = self._segment.end_time
+        self._wait_until(end_time, generation)
+
+    def _gripper(self, name: str, args: list, generation: Optional[int]):
+        lowered = name.lower()
+        if 'open' in lowered or 'release' in lowered:
+            closed = False
+        elif 'close' in lowered or 'grasp' in lowered:
+            closed = True
+        elif args and isinstance(args[-1], float) and 'pos' in lowered:
+            closed = args[-1] > 50  # Position command, 0 = open
+        else:
+            return  # Activation, force, speed... - nothing to simulate
+        with self._lock:
+            self._gripper_closed = closed
+            self._object_dropped = False
+            self._gripper_done_at = time.monotonic() + self.gripper_time
+            done_at = self._gripper_done_at
+        self._log(f"🤏 Gripper {'closing' if closed else 'opening'} ({name})")
+        self._wait_until(done_at, generation)
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(f"[sim] {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local UR controller simulator (ports 30002/30003)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--script-port', type=int, default=30002)
+    parser.add_argument('--realtime-port', type=int, default=30003)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="One-way network latency")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Extra random delay (0..jitter)")
+    parser.add_argument('--stop-probability', type=float, default=0.0,
+                        help="Chance that a move ends in a protective stop")
+    parser.add_argument('--stop-recovery', type=float, default=2.0,
+                        help="Seconds until a protective stop clears")
+    parser.add_argument('--speed-scaling', type=float, default=1.0)
+    parser.add_argument('--gripper-time', type=float, default=0.6)
+    parser.add_argument('--no-object', action='store_true',
+                        help="Gripper closes on nothing (no object detected)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    sim = URSimulator(host=args.host, script_port=args.script_port,
+                      realtime_port=args.realtime_port,
+                      latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                      stop_probability=args.stop_probability, stop_recovery=args.stop_recovery,
+                      speed_scaling=args.speed_scaling, gripper_time=args.gripper_time,
+                      object_present=not args.no_object, seed=args.seed, verbose=not args.quiet)
+    sim.start()
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5.0)
+            pose = sim.pose()
+            print(f"[sim] TCP X={pose[0]:.3f}m Y={pose[1]:.3f}m Z={pose[2]:.3f}m  "
+                  f"scripts={sim.scripts_received} moves={sim.moves_executed} "
+                  f"stops={sim.protective_stops} packets={sim.packets_sent}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
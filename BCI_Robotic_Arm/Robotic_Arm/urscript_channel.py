@@ -0,0 +1,228 @@
+"""
+URSCRIPT COMMAND CHANNEL
+========================
+Long-lived connection to the URScript port (30002) shared by everything
+that talks to the same robot.
+
+Commands are put on a bounded send queue and written by one writer thread,
+so a motion command costs one socket write instead of a TCP handshake.
+- send() blocks only while the queue is full (back-pressure)
+- send_nowait() never blocks and reports False when the queue is full
+- the connection is re-established automatically after errors
+- data the controller pushes back on the port is drained and discarded
+"""
+
+import queue
+import socket
+import threading
+import time
+from typing import Dict, Tuple
+
+_channels: Dict[Tuple[str, int], "URScriptChannel"] = {}
+_channels_lock = threading.Lock()
+
+
+def get_channel(host: str, port: int = 30002) -> "URScriptChannel":
+    """Return the shared (started) command channel for host:port"""
+    with _channels_lock:
+        channel = _channels.get((host, port))
+        if channel is None:
+            channel = URScriptChannel(host, port)
+            _channels[(host, port)] = channel
+        channel.start()
+        return channel
+
+
+class URScriptChannel:
+    """Persistent URScript connection with a bounded send queue"""
+
+    def __init__(self, host: str, port: int = 30002, queue_size: int = 32):
+        self.host = host
+        self.port = port
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self.running = False
+        self.connected = False
+        self.connect_timeout = 2.0
+        self.reconnect_delay = 0.5
+        self.max_send_attempts = 2
+        self._socket = None
+        self._socket_lock = threading.Lock()
+        self._writer = None
+
+        # Statistics
+        self.commands_sent = 0
+        self.commands_failed = 0
+        self.reconnects = 0
+
+    def start(self):
+        """Start the writer thread (no-op if already running)"""
+        if self.running:
+            return
+        self.running = True
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def stop(self, flush_timeout: float = 1.0):
+        """Flush pending commands (best effort) and close the connection"""
+        if not self.running:
+            return
+        self.flush(timeout=flush_timeout)
+        self.running = False
+        try:
+            self._queue.put_nowait(None)  # Wake the writer
+        except queue.Full:
+            pass
+        if self._writer and self._writer is not threading.current_thread():
+            self._writer.join(timeout=2.0)
+        self._writer = None
+        self._close()
+        with _channels_lock:
+            if _channels.get((self.host, self.port)) is self:
+                del _channels[(self.host, self.port)]
+
+    def send(self, script: str, block: bool = True, timeout: float = None,
+             wait_sent: bool = False) -> bool:
+        """
+        Queue a URScript command for sending
+        Args:
+            script: URScript text (newline-terminated)
+            block: Wait for queue space when the queue is full
+            timeout: Maximum time to wait for queue space (and for the write
+                     when wait_sent=True)
+            wait_sent: Return only after the command was written to the socket
+        Returns:
+            True if the command was queued (or written, with wait_sent=True)
+        """
+        if not self.running:
+            self.start()
+
+        item = {'script': script.encode('utf-8'), 'done': threading.Event(), 'ok': False}
+        try:
+            self._queue.put(item, block=block, timeout=timeout)
+        except queue.Full:
+            print(f"⚠️ URScript send queue full ({self._queue.maxsize} pending) - command dropped")
+            return False
+
+        if not wait_sent:
+            return True
+        if not item['done'].wait(timeout):
+            return False
+        return item['ok']
+
+    def send_nowait(self, script: str) -> bool:
+        """Queue a command without blocking (False if the queue is full)"""
+        return self.send(script, block=False)
+
+    def send_urgent(self, script: str) -> bool:
+        """
+        Discard all queued commands and send `script` next (e.g. stopl)
+        Returns:
+            True once the command was written
+        """
+        discarded = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item['done'].set()
+                discarded += 1
+            self._queue.task_done()
+        if discarded:
+            print(f"⚠️ Discarded {discarded} queued URScript command(s)")
+        return self.send(script, timeout=1.0, wait_sent=True)
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """Wait until all queued commands have been written"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def pending(self) -> int:
+        """Number of commands waiting to be written"""
+        return self._queue.qsize()
+
+    def _write_loop(self):
+        while self.running:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    continue
+                for _ in range(self.max_send_attempts):
+                    sock = self._ensure_connected()
+                    if sock is None:
+                        break
+                    try:
+                        sock.sendall(item['script'])
+                        item['ok'] = True
+                        self.commands_sent += 1
+                        break
+                    except OSError as e:
+                        print(f"⚠️ URScript channel write failed: {e} - reconnecting...")
+                        self._close()
+                if not item['ok']:
+                    self.commands_failed += 1
+                    print(f"❌ Command failed: could not reach {self.host}:{self.port}")
+                item['done'].set()
+            finally:
+                self._queue.task_done()
+
+    def _ensure_connected(self):
+        with self._socket_lock:
+            if self._socket is not None:
+                return self._socket
+        try:
+            sock = socket.create_connection((self.host, self.port),
+                                            timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(None)
+        except OSError as e:
+            print(f"⚠️ URScript channel connect to {self.host}:{self.port} failed: {e}")
+            time.sleep(self.reconnect_delay)
+            return None
+
+        with self._socket_lock:
+            if self.commands_sent or self.commands_failed:
+                self.reconnects += 1
+            self._socket = sock
+            self.connected = True
+        threading.Thread(target=self._drain_loop, args=(sock,), daemon=True).start()
+        return sock
+
+    def _drain_loop(self, sock):
+        # The controller streams primary-interface messages back on this port;
+        # they must be read or the socket buffers fill up and writes stall
+        try:
+            while self.running:
+                if not sock.recv(4096):
+                    break
+        except OSError:
+            pass
+        with self._socket_lock:
+            if self._socket is sock:
+                self._socket = None
+                self.connected = False
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _close(self):
+        with self._socket_lock:
+            sock = self._socket
+            self._socket = None
+            self.connected = False
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
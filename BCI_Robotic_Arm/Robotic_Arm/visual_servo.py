@@ -0,0 +1,169 @@
+"""
+VISUAL SERVOING
+===============
+Closed-loop centering in velocity mode instead of up to 10 blocking
+"move 60% of the way, stop, re-detect" steps.
+
+Every detection is turned into a table-frame target (pixel -> mm with the
+pose at the frame's capture time). The error to the CURRENT TCP position
+is streamed as a speedl command:
+
+    v = gain * error       clamped to max_speed, Z / rotation = 0
+
+- deadband: once the error is below deadband_px (converted with the
+  table scale at the current height) for settle_frames frames, the arm
+  is stopped and the object counts as centered
+- a watchdog thread sends stopl when no detection arrived for the
+  watchdog time (object lost, detector stalled). The watchdog follows the
+  measured detection period: max(watchdog_timeout, watchdog_periods *
+  period), the period being the slower of period_source() (the frame
+  scheduler's loop period) and the measured time between updates - a
+  CPU-only yolov8m run can take longer than the fixed 0.3 s floor
+- every speedl carries t = watchdog + command_margin: if the PC stops
+  sending, the controller ramps the arm down by itself (after the
+  watchdog would have)
+
+Every speedl goes to port 30002 as a new one-line program, so the
+controller replaces the running program on each update (10-20 Hz). speedl
+accelerates from the current TCP speed, so motion stays continuous, but
+each replacement costs a program restart on the controller. That is fine
+for centering at these rates; a faster loop should use a persistent
+servo program fed over RTDE registers instead.
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from robot_state import tcp_speed_norm
+
+
+class VisualServo:
+    """Streams speedl commands proportional to the detection offset"""
+
+    def __init__(self, robot, vision, gain: float = 2.0, deadband_px: float = 25.0,
+                 max_speed: float = 0.08, acceleration: float = 0.5,
+                 command_margin: float = 0.1, watchdog_timeout: float = 0.3,
+                 watchdog_periods: float = 3.0, settle_frames: int = 3,
+                 max_duration: float = 10.0,
+                 period_source: Optional[Callable[[], Optional[float]]] = None):
+        self.robot = robot
+        self.vision = vision
+        self.gain = gain  # 1/s: m/s of TCP speed per m of error
+        self.deadband_px = deadband_px
+        self.max_speed = max_speed  # m/s
+        self.acceleration = acceleration  # m/s^2
+        self.command_margin = command_margin  # speedl t = watchdog + margin (controller-side)
+        self.watchdog_timeout = watchdog_timeout  # Floor (s)
+        self.watchdog_periods = watchdog_periods  # Detection periods without an update
+        self.period_source = period_source  # () -> detection loop period (s) or None
+        self.update_period = None  # EMA of the time between updates while active
+        self.settle_frames = settle_frames
+        self.max_duration = max_duration  # Give up centering after this long
+
+        self.active = False
+        self.started_at = None
+        self.last_error_px = None
+        self.commands_sent = 0
+        self._in_deadband = 0
+        self._last_update = 0.0
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+    def watchdog_time(self) -> float:
+        """Seconds without a detection before the watchdog stops the arm"""
+        periods = [self.update_period]
+        if self.period_source:
+            periods.append(self.period_source())
+        period = max((p for p in periods if p), default=0.0)
+        return max(self.watchdog_timeout, self.watchdog_periods * period)
+
+    @property
+    def command_lifetime(self) -> float:
+        """speedl t: outlives the watchdog, so stopping is decided on the PC side"""
+        return self.watchdog_time() + self.command_margin
+
+    def _start(self):
+        self.active = True
+        self.started_at = time.monotonic()
+        self._in_deadband = 0
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watchdog_loop, daemon=True)
+            self._watchdog.start()
+
+    def _watchdog_loop(self):
+        while self.active:
+            time.sleep(0.02)
+            timeout = self.watchdog_time()
+            with self._lock:
+                stale = self.active and time.monotonic() - self._last_update > timeout
+            if stale:
+                print(f"⚠️ Servo watchdog: no detection for {timeout * 1000:.0f}ms - stopping")
+                self.stop()
+
+    def stop(self, wait: bool = False):
+        """Stop streaming and bring the arm to rest (stopl)"""
+        with self._lock:
+            was_active = self.active
+            self.active = False
+        if was_active:
+            self.robot.command_channel.send_urgent(f"stopl({self.acceleration})\n")
+        if wait:
+            self.robot.state_reader.wait_for(lambda s: tcp_speed_norm(s) < 0.002, 1.0)
+
+    def timed_out(self) -> bool:
+        return self.active and time.monotonic() - self.started_at > self.max_duration
+
+    def update(self, detection: dict, robot_xy_mm: Tuple[float, float],
+               tcp_pose: Optional[list]) -> bool:
+        """
+        Feed one detection and send the next velocity command
+        Args:
+            detection: Detection to center (detect_objects() format)
+            robot_xy_mm: TCP position (mm) when the frame was captured
+            tcp_pose: TCP pose when the frame was captured
+        Returns:
+            True once the object is centered and the arm has stopped
+        """
+        target = self.vision.pixels_to_robot_coords([detection['center_px']],
+                                                    robot_xy_mm, tcp_pose)[0]
+        current = self.robot.get_robot_pose() or tcp_pose
+        if current is None:
+            return False
+        error_m = (target - np.array([current[0], current[1]]) * 1000) / 1000
+        error_px = float(np.linalg.norm(error_m)) * 1000 / self.vision.scale_at(current)
+        self.last_error_px = error_px
+
+        now = time.monotonic()
+        with self._lock:
+            if self.active:
+                interval = now - self._last_update
+                self.update_period = interval if self.update_period is None else \
+                    self.update_period + 0.2 * (interval - self.update_period)
+            self._last_update = now
+        if not self.active:
+            self._start()
+
+        if error_px < self.deadband_px:
+            self._in_deadband += 1
+            if self._in_deadband >= self.settle_frames:
+                self.stop(wait=True)
+                print(f"   🎯 Servo converged in {time.monotonic() - self.started_at:.2f}s "
+                      f"({error_px:.0f}px, {self.commands_sent} commands)")
+                return True
+            velocity = np.zeros(2)
+        else:
+            self._in_deadband = 0
+            velocity = self.gain * error_m
+            speed = float(np.linalg.norm(velocity))
+            if speed > self.max_speed:
+                velocity *= self.max_speed / speed
+
+        command = (f"speedl([{velocity[0]:.5f}, {velocity[1]:.5f}, 0, 0, 0, 0], "
+                   f"a={self.acceleration}, t={self.command_lifetime})\n")
+        # Every command replaces the previous one - never wait for the socket
+        if self.robot.command_channel.send_nowait(command):
+            self.commands_sent += 1
+        return False
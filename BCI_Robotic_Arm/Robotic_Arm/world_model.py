@@ -0,0 +1,207 @@
+"""
+WORLD MODEL
+===========
+Table-frame memory of detected objects, fused over frames and robot poses.
+
+Every frame's detections (with 'target_mm' from
+VisionSystem.localize_detections) update a set of object hypotheses:
+- a detection within merge_radius_mm of a live hypothesis of the same
+  class is merged into it (running mean of the position), otherwise it
+  starts a new hypothesis
+- live hypotheses inside the camera view that were NOT detected collect a
+  miss; stale_misses misses in a row mark them stale (area re-observed
+  empty), a new detection there revives them
+- picked objects are removed
+
+Hypotheses are indexed in a uniform grid of cell_mm cells, so merging and
+neighbourhood queries only look at nearby cells instead of every object.
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+ACTIVE = 'active'
+STALE = 'stale'
+
+
+class WorldModel:
+    """Object hypotheses in table coordinates (mm) with a grid spatial index"""
+
+    def __init__(self, merge_radius_mm: float = 40.0, cell_mm: float = 50.0,
+                 stale_misses: int = 5, position_window: int = 20):
+        self.merge_radius_mm = merge_radius_mm
+        self.cell_mm = cell_mm
+        self.stale_misses = stale_misses
+        self.position_window = position_window  # Max weight of the old mean (outlier damping)
+
+        self._lock = threading.Lock()
+        self._objects = {}  # id -> hypothesis dict
+        self._grid = defaultdict(set)  # (ix, iy) -> ids
+        self._next_id = 1
+
+    # ------------------------------------------------------------------
+    # Spatial index
+    # ------------------------------------------------------------------
+    def _cell(self, position_mm) -> Tuple[int, int]:
+        return (int(math.floor(position_mm[0] / self.cell_mm)),
+                int(math.floor(position_mm[1] / self.cell_mm)))
+
+    def _ids_near(self, position_mm, radius_mm: float) -> set:
+        ix, iy = self._cell(position_mm)
+        reach = int(math.ceil(radius_mm / self.cell_mm))
+        ids = set()
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                ids |= self._grid.get((ix + dx, iy + dy), set())
+        return ids
+
+    def _move(self, obj: dict, position_mm):
+        old_cell, new_cell = self._cell(obj['position_mm']), self._cell(position_mm)
+        obj['position_mm'] = (float(position_mm[0]), float(position_mm[1]))
+        if old_cell != new_cell:
+            self._grid[old_cell].discard(obj['id'])
+            if not self._grid[old_cell]:
+                del self._grid[old_cell]
+            self._grid[new_cell].add(obj['id'])
+
+    def _remove(self, object_id: int):
+        obj = self._objects.pop(object_id, None)
+        if obj:
+            cell = self._cell(obj['position_mm'])
+            self._grid[cell].discard(object_id)
+            if not self._grid[cell]:
+                del self._grid[cell]
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def update(self, detections: list, timestamp: Optional[float] = None,
+               in_view: Optional[Callable] = None) -> list:
+        """
+        Fuse one frame's detections
+        Args:
+            detections: Detections with 'target_mm' (table coordinates, mm)
+            timestamp: Frame capture time (default: now)
+            in_view: in_view(points_mm (N, 2)) -> bool array of points the camera
+                     saw in this frame; enables stale marking
+        Returns:
+            The detections with 'object_id' added
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            matched = set()
+            for det in detections:
+                position = det['target_mm']
+                best, best_distance = None, self.merge_radius_mm
+                for object_id in self._ids_near(position, self.merge_radius_mm):
+                    obj = self._objects[object_id]
+                    if object_id in matched or obj['class'] != det['class']:
+                        continue
+                    distance = math.hypot(obj['position_mm'][0] - position[0],
+                                          obj['position_mm'][1] - position[1])
+                    if distance <= best_distance:
+                        best, best_distance = obj, distance
+                if best is None:
+                    best = {'id': self._next_id, 'class': det['class'],
+                            'position_mm': (float(position[0]), float(position[1])),
+                            'confidence': det.get('confidence', 0.0), 'observations': 0,
+                            'misses': 0, 'state': ACTIVE, 'first_seen': timestamp}
+                    self._next_id += 1
+                    self._objects[best['id']] = best
+                    self._grid[self._cell(position)].add(best['id'])
+                else:
+                    weight = min(best['observations'], self.position_window)
+                    mean = [(best['position_mm'][i] * weight + position[i]) / (weight + 1)
+                            for i in range(2)]
+                    self._move(best, mean)
+                    best['confidence'] = max(best['confidence'], det.get('confidence', 0.0))
+                best['observations'] += 1
+                best['misses'] = 0
+                best['state'] = ACTIVE
+                best['last_seen'] = timestamp
+                matched.add(best['id'])
+                det['object_id'] = best['id']
+
+            # Negative evidence: in view but not detected
+            if in_view is not None:
+                unmatched = [obj for obj in self._objects.values()
+                             if obj['id'] not in matched and obj['state'] == ACTIVE]
+                if unmatched:
+                    visible = in_view(np.array([obj['position_mm'] for obj in unmatched]))
+                    for obj, seen in zip(unmatched, visible):
+                        if seen:
+                            obj['misses'] += 1
+                            if obj['misses'] >= self.stale_misses:
+                                obj['state'] = STALE
+        return detections
+
+    def mark_picked(self, object_id: Optional[int] = None, position_mm=None,
+                    class_name: Optional[str] = None):
+        """Forget a picked object, by id or as the nearest hypothesis to position_mm"""
+        with self._lock:
+            if object_id is None and position_mm is not None:
+                nearest = self._nearest(position_mm, [class_name] if class_name else None,
+                                        self.merge_radius_mm * 2, states=(ACTIVE, STALE))
+                object_id = nearest['id'] if nearest else None
+            if object_id is not None:
+                self._remove(object_id)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._grid.clear()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _nearest(self, position_mm, classes: Optional[Iterable[str]], max_distance_mm: float,
+                 states=(ACTIVE,), exclude: Optional[Callable] = None) -> Optional[dict]:
+        if math.isinf(max_distance_mm):
+            candidates = self._objects.keys()
+        else:
+            candidates = self._ids_near(position_mm, max_distance_mm)
+        best, best_distance = None, max_distance_mm
+        for object_id in candidates:
+            obj = self._objects[object_id]
+            if obj['state'] not in states or (classes is not None and obj['class'] not in classes):
+                continue
+            if exclude is not None and exclude(obj):
+                continue
+            distance = math.hypot(obj['position_mm'][0] - position_mm[0],
+                                  obj['position_mm'][1] - position_mm[1])
+            if distance <= best_distance:
+                best, best_distance = obj, distance
+        return best
+
+    def nearest(self, position_mm, classes: Optional[Iterable[str]] = None,
+                max_distance_mm: float = math.inf,
+                exclude: Optional[Callable] = None) -> Optional[dict]:
+        """
+        Closest active hypothesis
+        Args:
+            position_mm: Reference position (x, y) in mm
+            classes: Only these class names (None = all)
+            max_distance_mm: Search radius
+            exclude: exclude(hypothesis) -> True to skip it
+        Returns:
+            Copy of the hypothesis dict, or None
+        """
+        with self._lock:
+            obj = self._nearest(position_mm, set(classes) if classes is not None else None,
+                                max_distance_mm, exclude=exclude)
+            return dict(obj) if obj else None
+
+    def objects(self, state: Optional[str] = ACTIVE) -> list:
+        """Copies of all hypotheses in a state (None = every state)"""
+        with self._lock:
+            return [dict(obj) for obj in self._objects.values()
+                    if state is None or obj['state'] == state]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for obj in self._objects.values() if obj['state'] == ACTIVE)